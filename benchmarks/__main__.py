@@ -0,0 +1,67 @@
+"""
+Benchmarks the scrapers' parsers on the fixture pages and the stock diff
+and alert rendering on synthetic states. Run from the repository root:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --compare baseline.json
+
+Exits with status 1 if --compare finds a regression.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import tempfile
+from benchmarks.bench_parsers import BACKENDS, bench_parsers
+from benchmarks.bench_stock import SIZES, bench_stock
+from benchmarks.harness import compare, load_results, save_results
+from matcha_notifier.unknown_brands import unknown_brands
+
+
+async def run_benchmarks(args: argparse.Namespace) -> dict:
+    results = {}
+    if args.suite in ('all', 'parse'):
+        results.update(await bench_parsers(args.repeat, args.backends))
+    if args.suite in ('all', 'stock'):
+        results.update(await bench_stock(args.repeat, args.sizes))
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--suite', choices=['all', 'parse', 'stock'], default='all')
+    parser.add_argument('--repeat', type=int, default=20, help='runs per benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--backends', nargs='+', default=BACKENDS)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', metavar='BASELINE')
+    parser.add_argument(
+        '--threshold', type=float, default=1.2,
+        help='slowdown or memory growth over the baseline that counts as a regression'
+    )
+    args = parser.parse_args()
+
+    # Parse logging would swamp the results and slow the parses down
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Unknown brands seen in the fixtures aren't recorded for real
+        unknown_brands.brands_file = f'{tmp}/unknown_brands.txt'
+        results = asyncio.run(run_benchmarks(args))
+
+    print(f'{"benchmark":<64} {"median ms":>10} {"peak KiB":>10}')
+    for name, result in results.items():
+        print(f'{name:<64} {result["median_ms"]:>10.3f} {result["peak_kib"]:>10.1f}')
+
+    save_results(results, args.output)
+    print(f'Saved results to {args.output}')
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), results, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print(f'No regressions against {args.compare}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import json
+from benchmarks.harness import measure
+from matcha_notifier.html_parser import get_parser
+from pathlib import Path
+from source_clients import *
+from source_clients.sazen_scraper import parse_catalog, parse_product_page
+from typing import Dict, List
+
+FIXTURES = Path('tests/fixtures')
+BACKENDS = ['html.parser', 'lxml', 'selectolax']
+
+# Catalog page fixtures parsed by each scraper's parse_products
+CATALOG_FIXTURES = {
+    IppodoScraper: ['ippodo_fixture.html'],
+    MarukyuKoyamaenScraper: ['marukyu_koyamaen_fixture.html'],
+    NakamuraTokichiScraper: [
+        'nakamura_tokichi_fixture_page_1.html',
+        'nakamura_tokichi_fixture_page_2.html',
+    ],
+    SteepingRoomScraper: ['steeping_room_fixture.html'],
+}
+
+# products.json fixtures parsed by the Shopify scrapers' fast path
+PRODUCTS_JSON_FIXTURES = {
+    IppodoScraper: 'ippodo_products_fixture.json',
+    NakamuraTokichiScraper: 'nakamura_tokichi_products_fixture.json',
+    SteepingRoomScraper: 'steeping_room_products_fixture.json',
+}
+
+async def bench_parsers(repeat: int, backends: List[str] = BACKENDS) -> Dict[str, Dict]:
+    """
+    Time every scraper's parse of its fixture pages on each installed
+    parser backend, and of its products.json fixture.
+    """
+    results = {}
+    for backend in backends:
+        for scraper_class, fixtures in CATALOG_FIXTURES.items():
+            scraper = scraper_class(None)
+            scraper.html_parser = get_parser(backend, scraper_class.SELECTORS)
+            if scraper.html_parser.name != backend:     # Not installed
+                continue
+
+            for fixture in fixtures:
+                text = (FIXTURES / fixture).read_text()
+                results[f'parse/{backend}/{fixture}'] = await measure(
+                    lambda text=text: scraper.parse_products(text), repeat=repeat
+                )
+
+        # Sazen's parse_products fetches product pages, so its parse
+        # functions are timed on their own
+        if get_parser(backend, SazenScraper.SELECTORS).name != backend:
+            continue
+        catalog = (FIXTURES / 'sazen_fixture.html').read_text()
+        results[f'parse/{backend}/sazen_fixture.html'] = await measure(
+            lambda: parse_catalog(backend, catalog, 'https://www.sazentea.com'),
+            repeat=repeat
+        )
+        for path in sorted(FIXTURES.glob('sazen_matcha_*_page_fixture.html')):
+            text = path.read_text()
+            results[f'parse/{backend}/{path.name}'] = await measure(
+                lambda text=text: parse_product_page(backend, text), repeat=repeat
+            )
+
+    for scraper_class, fixture in PRODUCTS_JSON_FIXTURES.items():
+        scraper = scraper_class(None)
+        products = json.loads((FIXTURES / fixture).read_text())['products']
+        results[f'parse/json/{fixture}'] = await measure(
+            lambda: scraper.parse_products_json(products), repeat=repeat
+        )
+
+    return results
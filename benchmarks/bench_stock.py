@@ -0,0 +1,101 @@
+from benchmarks.harness import measure
+from matcha_notifier.enums import Brand, StockStatus, Website
+from matcha_notifier.models import Item, ItemStock, StockEvent
+from matcha_notifier.restock_notifier import RestockNotifier
+from matcha_notifier.state_store import StateStore
+from matcha_notifier.stock_data import StockData
+from typing import Dict, List, Tuple
+
+SIZES = [100, 1_000, 10_000, 100_000]
+AS_OF = 1749722400.0    # 2025-06-12 03:00:00 in Los Angeles
+
+class NullStateStore(StateStore):
+    """
+    Keeps the benchmarks away from the real state files.
+    """
+    async def load(self) -> Dict:
+        return {}
+
+    async def save(self, state: Dict, events: List[StockEvent]) -> None:
+        pass
+
+def make_states(size: int) -> Tuple[Dict, Dict]:
+    """
+    Build a stock state of size items spread over every website, and a poll
+    of it where 10% of the items changed stock status, 1% are new and 1%
+    are gone.
+    """
+    websites = list(Website)
+    brands = list(Brand)
+    state: Dict[Website, Dict[str, ItemStock]] = {website: {} for website in websites}
+    polled: Dict[Website, Dict[str, ItemStock]] = {website: {} for website in websites}
+    for i in range(size):
+        website = websites[i % len(websites)]
+        item_id = f'item-{i}'
+        item_stock = ItemStock(
+            item=Item(id=item_id, brand=brands[i % len(brands)], name=f'Matcha {i} - 30g'),
+            url=f'https://example.com/products/matcha-{i}',
+            stock_status=StockStatus.INSTOCK if i % 2 else StockStatus.OUT_OF_STOCK,
+            as_of=AS_OF
+        )
+        if i % 100 != 1:    # 1% are new in the poll
+            state[website][item_id] = item_stock
+        if i % 100 == 0:    # 1% are gone from the poll
+            continue
+
+        if i % 10 == 5:     # 10% changed stock status
+            item_stock = ItemStock(
+                item=item_stock.item,
+                url=item_stock.url,
+                stock_status=(
+                    StockStatus.OUT_OF_STOCK
+                    if item_stock.stock_status == StockStatus.INSTOCK
+                    else StockStatus.INSTOCK
+                ),
+                as_of=AS_OF + 60
+            )
+        polled[website][item_id] = item_stock
+
+    return state, polled
+
+def make_instock_items(size: int) -> Dict[Website, Dict[str, ItemStock]]:
+    state, _ = make_states(size)
+    return {
+        website: {
+            item_id: item_stock for item_id, item_stock in items.items()
+            if item_stock.stock_status == StockStatus.INSTOCK
+        }
+        for website, items in state.items()
+    }
+
+async def bench_stock(repeat: int, sizes: List[int] = SIZES) -> Dict[str, Dict]:
+    """
+    Time diffing polls against the stock state and rendering alerts, on
+    synthetic states of each size.
+    """
+    results = {}
+    stock_data = StockData(NullStateStore())
+    notifier = RestockNotifier(None, None)
+    for size in sizes:
+        # Big states take a while per run, so they're run fewer times
+        runs = max(3, min(repeat, repeat * 1_000 // size))
+        state, polled = make_states(size)
+
+        results[f'stock/diff/{size}'] = await measure(
+            lambda: stock_data.diff(polled, state), repeat=runs
+        )
+        # get_stock_changes updates the state in place, so each run gets a
+        # fresh copy
+        results[f'stock/get_stock_changes/{size}'] = await measure(
+            lambda state: stock_data.get_stock_changes(polled, state),
+            setup=lambda: {website: dict(items) for website, items in state.items()},
+            repeat=runs
+        )
+
+        instock_items = make_instock_items(size)
+        results[f'stock/chunk_lines/{size}'] = await measure(
+            lambda: notifier._chunk_lines_by_limit(instock_items, 'Restocks'),
+            repeat=runs
+        )
+
+    return results
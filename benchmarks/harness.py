@@ -0,0 +1,130 @@
+import gc
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+async def measure(
+    run: Callable[..., Any],
+    setup: Optional[Callable[[], Any]] = None,
+    repeat: int = 5
+) -> Dict[str, float]:
+    """
+    Time run, which may be a coroutine function, repeat times. If setup is
+    given, it's called untimed before each run and its result passed to
+    run. Latency is in milliseconds. Memory is measured on one more run
+    with tracemalloc: the peak above what was allocated before it, and the
+    memory and number of blocks still allocated after it.
+    """
+    async def call() -> Any:
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        result = run(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return time.perf_counter() - start, result
+
+    # Warm up caches, e.g. compiled selectors and parsers
+    await call()
+
+    times = []
+    gc.collect()
+    gc.disable()     # Collections would land in random runs
+    try:
+        for _ in range(repeat):
+            elapsed, _ = await call()
+            times.append(elapsed * 1000)
+    finally:
+        gc.enable()
+
+    args = (setup(),) if setup else ()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = run(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, 'filename')
+        if stat.count_diff > 0
+    )
+    del result
+
+    return {
+        'repeat': repeat,
+        'min_ms': min(times),
+        'median_ms': statistics.median(times),
+        'mean_ms': statistics.mean(times),
+        'max_ms': max(times),
+        'peak_kib': (peak - base) / 1024,
+        'retained_kib': (current - base) / 1024,
+        'retained_blocks': blocks,
+    }
+
+def environment() -> Dict[str, str]:
+    """
+    Describe where the benchmarks ran, so results from different machines
+    or commits aren't compared by mistake.
+    """
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ''
+
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+def save_results(results: Dict[str, Dict], path: str) -> None:
+    with open(path, 'w') as f:
+        json.dump(
+            {'environment': environment(), 'results': results}, f, indent=2
+        )
+
+def load_results(path: str) -> Dict[str, Dict]:
+    with open(path) as f:
+        return json.load(f)['results']
+
+def compare(
+    baseline: Dict[str, Dict], results: Dict[str, Dict], threshold: float
+) -> List[str]:
+    """
+    Find benchmarks whose median latency or peak memory grew by more than
+    threshold (e.g. 1.2 for 20%) over the baseline. Benchmarks missing from
+    either run are skipped.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+
+        for key in ('median_ms', 'peak_kib'):
+            # Tiny values are mostly noise
+            floor = 0.05 if key == 'median_ms' else 4
+            if result[key] > max(base[key], floor) * threshold:
+                regressions.append(
+                    f'{name}: {key} {base[key]:.2f} -> {result[key]:.2f} '
+                    f'({result[key] / max(base[key], floor):.2f}x)'
+                )
+    return regressions
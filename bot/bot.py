@@ -6,6 +6,7 @@ import traceback
 from discord import Forbidden, Member
 from discord.utils import get as discord_get
 from matcha_notifier.run import run
+from matcha_notifier.stock_data import StockData
 from textwrap import dedent
 from yaml import safe_load
 
@@ -22,6 +23,7 @@ class MatchaBot(discord.Bot):
         self._run_task: asyncio.Task = None
         self._run_started = False
         self._synced = False
+        self.stock_data: StockData = None   # Set once run() loads the state
 
     async def _sync_commands_once(self) -> None:
         if not self._synced:
@@ -1,10 +1,12 @@
 import logging
+import os
 import traceback
+from datetime import datetime, timezone
 from discord import ApplicationContext, Option
 from discord.ext.commands import Bot
 from matcha_notifier.enums import Website
+from matcha_notifier.loop_monitor import loop_monitor
 from matcha_notifier.restock_notifier import RestockNotifier
-from matcha_notifier.stock_data import StockData
 
 
 logger = logging.getLogger(__name__)
@@ -29,11 +31,14 @@ async def get_website_instock_items(
 ) -> None:
     await ctx.respond(f'FETCHING IN STOCK ITEMS FOR {website.upper()}')
     
-    sd = StockData()
+    sd = ctx.bot.stock_data
+    if sd is None:
+        await ctx.respond('Stock data is still loading. Please try again shortly.')
+        return
+
     site = Website(website)
     try:
-        state = await sd.load_state()
-        instock_items = sd.get_website_instock_items(site, state)
+        instock_items = sd.get_website_instock_items(site)
         if not instock_items:
             await ctx.respond(f'No items in stock for {website}.')
 
@@ -47,8 +52,13 @@ async def get_website_instock_items(
 async def get_all_instock_items(ctx: ApplicationContext) -> None:
     await ctx.respond('FETCHING ALL IN STOCK ITEMS')
     
+    sd = ctx.bot.stock_data
+    if sd is None:
+        await ctx.respond('Stock data is still loading. Please try again shortly.')
+        return
+
     try:
-        all_instock_items = await StockData().get_all_instock_items()
+        all_instock_items = sd.get_all_instock_items()
         if not all_instock_items:
             await ctx.respond(f'No items in stock.')
 
@@ -62,6 +72,38 @@ async def get_all_instock_items(ctx: ApplicationContext) -> None:
         logger.error(f'Error fetching all in stock items: {e}')
         await ctx.respond('Error fetching all in stock items. Please try again later.')
 
+async def get_loop_lag(ctx: ApplicationContext) -> None:
+    """
+    Show the event loop's lag and its recent stalls. Only the bot owner,
+    DISCORD_OWNER_ID, may use it.
+    """
+    if str(ctx.author.id) != os.getenv('DISCORD_OWNER_ID'):
+        await ctx.respond('Only the bot owner can use this command.', ephemeral=True)
+        return
+
+    summary = loop_monitor.summary()
+    if not summary['samples']:
+        await ctx.respond('The loop lag monitor isn\'t running.', ephemeral=True)
+        return
+
+    lines = [
+        f'Lag over the last {summary["samples"]} samples: '
+        f'median {summary["median"] * 1000:.1f}ms, '
+        f'p99 {summary["p99"] * 1000:.1f}ms, max {summary["max"] * 1000:.1f}ms',
+        f'Stalls over {loop_monitor.threshold * 1000:.0f}ms: {summary["stalls"]}',
+    ]
+    for stall in reversed(loop_monitor.recent_stalls()):
+        started = datetime.fromtimestamp(stall.started, timezone.utc)
+        lines.append(
+            f'{started:%Y-%m-%d %H:%M:%S} UTC, {stall.duration * 1000:.0f}ms in {stall.task}'
+        )
+        # The innermost frames are where the loop was stuck
+        stack = stall.stack.strip().splitlines()[-4:]
+        if stack:
+            lines.extend(f'  {line.strip()}' for line in stack)
+
+    text = '\n'.join(lines)[:1900]
+    await ctx.respond(f'```{text}```', ephemeral=True)
 
 def register_commands(bot: Bot) -> None:
     bot.slash_command(name='subscribe-website', description='Subscribe to alerts for a website')(subscribe_website)
@@ -69,3 +111,4 @@ def register_commands(bot: Bot) -> None:
     bot.slash_command(name='subscribe-blend', description='Subscribe to alerts for a blend')(subscribe_blend)
     bot.slash_command(name='get-website-instock-items', description='Get all items in stock for a website')(get_website_instock_items)
     bot.slash_command(name='get-all-instock-items', description='Get all items in stock')(get_all_instock_items)
+    bot.slash_command(name='loop-lag', description='Show event loop lag and recent stalls (owner only)')(get_loop_lag)
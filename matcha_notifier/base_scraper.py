@@ -1,25 +1,78 @@
-import aiofiles
+import asyncio
+import hashlib
+import json
 import logging
+import random
+import time
 from abc import ABC, abstractmethod
-from aiohttp import ClientError, ClientSession, ClientTimeout
+from aiohttp import (
+    ClientConnectionError, ClientError, ClientPayloadError, ClientResponse,
+    ClientResponseError, ClientSession, ClientTimeout
+)
 from asyncio import CancelledError
-from datetime import datetime
-from matcha_notifier.enums import Brand
-from matcha_notifier.models import ItemStock
-from pathlib import Path
-from typing import Dict, Set
-from zoneinfo import ZoneInfo
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from matcha_notifier.brand_matcher import brand_matcher
+from matcha_notifier.circuit_breaker import CircuitOpenError, circuit_breakers
+from matcha_notifier.enums import Brand, StockStatus
+from matcha_notifier.html_parser import get_parser
+from matcha_notifier.http_client import get_timeout, warm_up
+from matcha_notifier.metrics import (
+    fetch_bytes, fetch_errors, fetch_seconds, parse_seconds
+)
+from matcha_notifier.models import Item, ItemStock
+from matcha_notifier.parse_pool import parse_pool
+from matcha_notifier.rate_limiter import rate_limiter
+from matcha_notifier.unknown_brands import unknown_brands
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from yaml import safe_load
 
 
 logger = logging.getLogger(__name__)
 
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+# Returned by fetch_url when a conditional request finds the page unchanged
+NOT_MODIFIED = object()
+
+# Response statuses worth retrying: rate limited or the server is struggling
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 class BaseScraper(ABC):
+    # Named CSS selectors used by the website's parse functions. They're
+    # compiled once by the website's parser backend.
+    SELECTORS: Dict[str, str] = {}
+
     def __init__(self):
-        if not hasattr(self, 'catalog_url'):
-            raise AttributeError(
-                'Subclasses must define \'self.catalog_url\' in __init__.'
-            )
-        self.unknown_brands_file = 'unknown_brands.txt'
+        for attr in ('catalog_url', 'website'):
+            if not hasattr(self, attr):
+                raise AttributeError(
+                    f'Subclasses must define \'self.{attr}\' in __init__.'
+                )
+        # The parser backend is set per website by {WEBSITE}_HTML_PARSER
+        self.html_parser = get_parser(
+            config.get(
+                f'{self.website.name}_HTML_PARSER',
+                config.get('DEFAULT_HTML_PARSER', 'html.parser')
+            ),
+            self.SELECTORS
+        )
+        # Per-URL ETag/Last-Modified validators and body hashes used by
+        # conditional fetches, and the items last parsed from each page
+        self.validators: Dict[str, Dict[str, str]] = {}
+        self.body_hashes: Dict[str, str] = {}
+        # Validators and body hashes of fetched pages that haven't been
+        # parsed yet. They're only kept once the page's items are stored, so
+        # a failed parse doesn't make the page look unchanged next time.
+        self.pending_fetches: Dict[str, Tuple[Dict[str, str], str]] = {}
+        self.page_items: Dict[str, Dict[str, ItemStock]] = {}
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Request timeout, set per website by {WEBSITE}_HTTP_TIMEOUT
+        self.timeout = get_timeout(self.website)
+        # The website's label in metrics
+        self.site = self.website.name.lower()
     
     @abstractmethod
     async def scrape(self) -> Dict[str, ItemStock]:
@@ -28,47 +81,309 @@ class BaseScraper(ABC):
         """
         pass
     
+    async def parse_in_pool(self, parse_func: Callable, *args) -> Any:
+        """
+        Run a module-level parse function in the parse pool. It's called
+        with the name of the website's parser backend, then args, and should
+        return plain item records for to_item_stock().
+        """
+        start = time.perf_counter()
+        try:
+            return await parse_pool.run(parse_func, self.html_parser.name, *args)
+        finally:
+            parse_seconds.observe(time.perf_counter() - start, site=self.site)
+
+    def to_item_stock(self, record: Dict[str, str], brand: Brand) -> ItemStock:
+        """
+        Build an ItemStock from an item record with 'id', 'name', 'url' and
+        'stock_status' keys.
+        """
+        return ItemStock(
+            item=Item(
+                id=record['id'],
+                brand=brand,
+                name=record['name'],
+            ),
+            url=record['url'],
+            as_of=self.get_as_of(),
+            stock_status=StockStatus(record['stock_status'])
+        )
+
     async def fetch_url(
         self,
         url: str,
         session: ClientSession,
-        timeout: ClientTimeout = ClientTimeout(total=10)
-    ) -> str:
+        timeout: Optional[ClientTimeout] = None,
+        conditional: bool = False
+    ) -> Union[str, object]:
         """
-        Fetch the content of a URL with the specified timeout.
+        Fetch the content of a URL with the specified timeout, or the
+        website's. If conditional is set, the URL's last ETag/Last-Modified
+        validators are sent and NOT_MODIFIED is returned when the server
+        answers 304 or the body is the same as the last fetch, so callers
+        can reuse page_items[url]. Callers store the parsed page with
+        store_page_items.
         """
-        timeout = ClientTimeout(total=10)
-        try:
-            async with session.get(url, timeout=timeout) as resp:
-                if len(resp.history) > 0:   # Log warning if redirected
-                    logger.warning(
-                        f'Redirected from {url} to {resp.url}'
-                    )
+        timeout = timeout or self.timeout
+        headers = self._conditional_headers(url) if conditional else {}
 
-                resp.raise_for_status()  # Raise an error for bad responses
-                logger.info(
-                    f'Fetched URL: {url} with status {resp.status}'
+        async def read(resp: ClientResponse) -> Union[str, object]:
+            if len(resp.history) > 0:   # Log warning if redirected
+                logger.warning(
+                    f'Redirected from {url} to {resp.url}'
                 )
-                text = await resp.text()
-        except CancelledError:
-            logger.error(f'Request to {url} timed out')
+
+            if conditional and resp.status == 304:
+                logger.info(f'URL not modified: {url}')
+                return NOT_MODIFIED
+
+            resp.raise_for_status()  # Raise an error for bad responses
+            logger.info(
+                f'Fetched URL: {url} with status {resp.status}'
+            )
+            body = await resp.read()
+            fetch_bytes.inc(len(body), site=self.site)
+            if conditional and self._is_unchanged(url, resp, body):
+                logger.info(f'URL content unchanged: {url}')
+                return NOT_MODIFIED
+
+            return await resp.text()
+
+        try:
+            return await self.get_with_retries(url, session, timeout, headers, read)
+        except CircuitOpenError as e:
+            logger.debug(f'Skipped {url}: {e}')
             return ''
+        except CancelledError:
+            # Let StockScheduler.stop() cancel the poll. Request timeouts
+            # arrive as asyncio.TimeoutError from get_with_retries.
+            raise
         except ClientError as e:
             logger.error(f'Error fetching {url}: {e}')
             return ''
         except Exception as e:
             logger.error(f'Unexpected error fetching {url}: {e}')
             return ''
-        
-        return text
     
-    def get_as_of(self) -> str:
+    async def fetch_json(
+        self, url: str, session: ClientSession, conditional: bool = False
+    ) -> Any:
         """
-        Get the current timestamp in a specific format
+        Fetch and decode a JSON document. Returns None if the request fails
+        or the body isn't JSON, and NOT_MODIFIED as fetch_url does when
+        conditional is set.
         """
-        now = datetime.now(ZoneInfo('America/Los_Angeles'))
-        formatted_time = now.strftime('%Y-%m-%d %H:%M:%S,') + f'{int(now.microsecond / 1000):03d}'
-        return formatted_time
+        headers = self._conditional_headers(url) if conditional else {}
+        headers['Accept'] = 'application/json'
+
+        async def read(resp: ClientResponse) -> Any:
+            if conditional and resp.status == 304:
+                logger.info(f'URL not modified: {url}')
+                return NOT_MODIFIED
+
+            resp.raise_for_status()
+            logger.info(
+                f'Fetched URL: {url} with status {resp.status}'
+            )
+            body = await resp.read()
+            fetch_bytes.inc(len(body), site=self.site)
+            if conditional and self._is_unchanged(url, resp, body):
+                logger.info(f'URL content unchanged: {url}')
+                return NOT_MODIFIED
+
+            data = json.loads(body)
+            if conditional:
+                self.commit_fetch(url)
+            return data
+
+        try:
+            return await self.get_with_retries(
+                url, session, self.timeout, headers, read
+            )
+        except CircuitOpenError as e:
+            logger.debug(f'Skipped {url}: {e}')
+            return None
+        except CancelledError:
+            raise
+        except ClientError as e:
+            logger.error(f'Error fetching {url}: {e}')
+            return None
+        except ValueError as e:
+            self.pending_fetches.pop(url, None)
+            logger.warning(f'Invalid JSON from {url}: {e}')
+            return None
+        except Exception as e:
+            logger.error(f'Unexpected error fetching {url}: {e}')
+            return None
+
+    async def get_with_retries(
+        self,
+        url: str,
+        session: ClientSession,
+        timeout: ClientTimeout,
+        headers: Dict[str, str],
+        read: Callable[[ClientResponse], Awaitable[Any]]
+    ) -> Any:
+        """
+        GET a URL and return what read makes of the response. Transient
+        errors (connection errors, timeouts and RETRY_STATUSES responses)
+        are retried up to FETCH_RETRIES times, after the response's
+        Retry-After or an exponential backoff with jitter. Raises
+        CircuitOpenError without sending a request if the host's circuit is
+        open, or the last error once the retries run out.
+        """
+        host = urlsplit(url).netloc
+        if not circuit_breakers.allow(host):
+            fetch_errors.inc(site=self.site, type=CircuitOpenError.__name__)
+            raise CircuitOpenError(f'circuit open for {host}')
+
+        attempt = 0
+        try:
+            while True:
+                try:
+                    await rate_limiter.acquire(url)
+                    start = time.perf_counter()
+                    try:
+                        async with session.get(
+                            url, timeout=timeout, headers=headers
+                        ) as resp:
+                            if resp.status in RETRY_STATUSES:
+                                resp.raise_for_status()
+                            # The host answered, even if read rejects the response
+                            circuit_breakers.record_success(host)
+                            return await read(resp)
+                    finally:
+                        fetch_seconds.observe(
+                            time.perf_counter() - start, site=self.site
+                        )
+                except (
+                    ClientConnectionError, ClientPayloadError, ClientResponseError,
+                    asyncio.TimeoutError
+                ) as e:
+                    fetch_errors.inc(site=self.site, type=type(e).__name__)
+                    delay = self.retry_delay(e, attempt)
+                    if delay is None:
+                        if is_transient(e):
+                            circuit_breakers.record_failure(host)
+                        raise
+
+                    attempt += 1
+                    logger.warning(
+                        f'Retrying {url} in {delay:.1f}s after error: {e!r}'
+                    )
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    fetch_errors.inc(site=self.site, type=type(e).__name__)
+                    raise
+        finally:
+            # Free a half-open probe that ended without a success or failure
+            # recorded, e.g. after a redirect loop or cancellation
+            circuit_breakers.release(host)
+
+    def retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Get how long to wait before retrying a failed request, or None if it
+        shouldn't be retried. Retry-After is honoured up to RETRY_MAX_DELAY;
+        a longer one gives up instead.
+        """
+        if not is_transient(error) or attempt >= config.get('FETCH_RETRIES', 2):
+            return None
+
+        max_delay = config.get('RETRY_MAX_DELAY', 30)
+        if isinstance(error, ClientResponseError):
+            retry_after = parse_retry_after((error.headers or {}).get('Retry-After'))
+            if retry_after is not None:
+                return retry_after if retry_after <= max_delay else None
+
+        # Half the backoff plus up to as much again, so retries of requests
+        # that failed together spread out
+        backoff = min(config.get('RETRY_BACKOFF_BASE', 1) * 2 ** attempt, max_delay)
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build the If-None-Match/If-Modified-Since headers for a URL from the
+        validators of its last fetch.
+        """
+        headers = {}
+        validators = self.validators.get(url, {})
+        if 'ETag' in validators:
+            headers['If-None-Match'] = validators['ETag']
+        if 'Last-Modified' in validators:
+            headers['If-Modified-Since'] = validators['Last-Modified']
+        return headers
+
+    def _is_unchanged(self, url: str, resp, body: bytes) -> bool:
+        """
+        Return True if the body is the same as the last stored fetch of the
+        URL. Otherwise the response's validators and body hash are kept
+        pending until commit_fetch.
+        """
+        body_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+        if self.body_hashes.get(url) == body_hash:
+            return True
+
+        validators = {
+            k: resp.headers[k] for k in ('ETag', 'Last-Modified')
+            if k in resp.headers
+        }
+        self.pending_fetches[url] = (validators, body_hash)
+        return False
+
+    def commit_fetch(self, url: str) -> None:
+        """
+        Keep the validators and body hash of the URL's last fetch, so later
+        conditional fetches can report it unchanged.
+        """
+        if url in self.pending_fetches:
+            self.validators[url], self.body_hashes[url] = (
+                self.pending_fetches.pop(url)
+            )
+
+    def store_page_items(self, url: str, items: Dict[str, ItemStock]) -> None:
+        """
+        Store the items parsed from a conditionally fetched page.
+        """
+        self.page_items[url] = items
+        self.commit_fetch(url)
+
+    async def fetch_all(self, urls: List[str], session: ClientSession) -> List[str]:
+        """
+        Fetch URLs concurrently with at most MAX_CONCURRENT_REQUESTS_PER_HOST
+        requests in flight per host. Results are in the same order as urls.
+        """
+        return await asyncio.gather(
+            *(self.fetch_limited(url, session) for url in urls)
+        )
+
+    async def fetch_limited(
+        self, url: str, session: ClientSession, conditional: bool = False
+    ) -> Union[str, object]:
+        """
+        fetch_url, waiting while MAX_CONCURRENT_REQUESTS_PER_HOST requests
+        to the URL's host are already in flight.
+        """
+        host = urlsplit(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(
+                config.get('MAX_CONCURRENT_REQUESTS_PER_HOST', 4)
+            )
+
+        async with self.host_semaphores[host]:
+            return await self.fetch_url(url, session, conditional=conditional)
+
+    async def warm_up(self) -> None:
+        """
+        Open a connection to the catalog's host ahead of a poll.
+        """
+        await warm_up(self.session, self.catalog_url)
+
+    def get_as_of(self) -> float:
+        """
+        Get the current time as a timestamp. ItemStock formats it when it's
+        displayed or saved.
+        """
+        return datetime.now(timezone.utc).timestamp()
 
     def is_matcha_powder(self, name: str) -> bool:
         """
@@ -82,46 +397,53 @@ class BaseScraper(ABC):
         lower_name = name.lower()
         return not any(keyword in lower_name for keyword in excluded_keywords)
         
-    async def load_unknown_brands(self) -> Set[str]:
-        """
-        Load unknown brands from the unknown_brands.txt file.
-        """
-        if not Path(self.unknown_brands_file).exists():
-            return set()
-
-        async with aiofiles.open(self.unknown_brands_file, mode='r') as f:
-            content = await f.read()
-            return set(line.strip() for line in content.splitlines() if line.strip())
-
     async def log_unknown_brand(self, brand: str) -> None:
         """
-        Log an unknown matcha brand to the unknown_brands.txt file.
-        """
-        existing = await self.load_unknown_brands()
-        if brand not in existing:
-            async with aiofiles.open(self.unknown_brands_file, 'a') as f:
-                await f.write(f'{brand}\n')
-
-            logger.warning(f'Unknown brand logged: {brand}')
-
-    def get_all_brands(self) -> Set[str]:
-        """
-        Get all known brands from the unknown_brands.txt file.
+        Record an unknown matcha brand in the process-wide registry, which
+        is saved to unknown_brands.txt.
         """
-        return set(b.value for b in Brand)
+        await unknown_brands.record(brand)
 
     async def match_to_brand(self, brand: str) -> Brand:
         """
         Match the brand name to a known Brand enum. If no match is found,
         return Brand.UNKNOWN and log the brand to unknown_brands.txt.
         """
-        lower_brand = brand.lower()
-        all_brands = self.get_all_brands()
-        # Prioritize longer brand names to avoid partial matches
-        for brand_enum in sorted(all_brands, key=len, reverse=True):
-            if brand_enum.lower() in lower_brand:
-                return Brand(brand_enum)
-        
+        brand_enum = brand_matcher.match(brand)
+        if brand_enum is not None:
+            return brand_enum
+
         # If no match found, log the unknown brand
         await self.log_unknown_brand(brand)
         return Brand.UNKNOWN
+
+def is_transient(error: Exception) -> bool:
+    """
+    Return True if a request error is likely to go away on its own.
+    """
+    if isinstance(error, ClientResponseError):
+        return error.status in RETRY_STATUSES
+    return isinstance(
+        error, (ClientConnectionError, ClientPayloadError, asyncio.TimeoutError)
+    )
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, either seconds or an HTTP date, into
+    seconds from now. Returns None if it's missing or malformed.
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
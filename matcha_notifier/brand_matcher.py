@@ -0,0 +1,55 @@
+import logging
+import re
+from functools import lru_cache
+from matcha_notifier.enums import Brand
+from typing import Dict, Optional
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class BrandMatcher:
+    """
+    Finds the Brand named in a maker string. Every brand name and alias is
+    compiled into one case-insensitive regex, so a maker string is scanned
+    once however many brands there are. Where names overlap, the longest
+    match wins. Results are memoized per maker string.
+
+    aliases maps other spellings to a Brand value, e.g.
+    {'Yamamasa': 'Yamamasa Koyamaen'}. Words in a name may be separated by
+    spaces, hyphens or nothing.
+    """
+    def __init__(self, aliases: Optional[Dict[str, str]] = None, cache_size: int = 1024):
+        self.names: Dict[str, Brand] = {
+            b.value.lower(): b for b in Brand if b != Brand.UNKNOWN
+        }
+        for alias, value in (aliases or {}).items():
+            self.names[alias.lower()] = Brand(value)
+
+        # One named group per name, longest first so the alternation
+        # prefers the longer name at the same position
+        self.groups: Dict[str, Brand] = {}
+        alternatives = []
+        for i, name in enumerate(sorted(self.names, key=len, reverse=True)):
+            self.groups[f'b{i}'] = self.names[name]
+            words = r'[\s-]*'.join(re.escape(word) for word in name.split())
+            alternatives.append(f'(?P<b{i}>{words})')
+        self.pattern = re.compile('|'.join(alternatives), re.IGNORECASE)
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, maker: str) -> Optional[Brand]:
+        """
+        Get the brand named in maker, or None if there isn't one.
+        """
+        longest = max(
+            self.pattern.finditer(maker), key=lambda m: len(m.group()), default=None
+        )
+        return self.groups[longest.lastgroup] if longest else None
+
+brand_matcher = BrandMatcher(
+    aliases=config.get('BRAND_ALIASES', {}),
+    cache_size=config.get('BRAND_MATCH_CACHE_SIZE', 1024)
+)
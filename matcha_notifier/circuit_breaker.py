@@ -0,0 +1,123 @@
+import logging
+import time
+from matcha_notifier.enums import CircuitState
+from typing import Callable, Dict
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to a host whose circuit is open.
+    """
+
+class CircuitBreaker:
+    """
+    Stops requests to a host after failure_threshold fetches in a row have
+    failed. Once reset_timeout seconds have passed, one probe request is let
+    through (half-open): the circuit closes if it succeeds and opens again if
+    it fails. clock returns the current time in seconds.
+    """
+    def __init__(
+        self, host: str, failure_threshold: int, reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        Return True if a request to the host may be sent now.
+        """
+        if self.state == CircuitState.CLOSED:
+            return True
+
+        if self.state == CircuitState.OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            logger.info(f'Probing {self.host} after {self.reset_timeout:.0f}s')
+
+        # Half-open: only one probe at a time
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.CLOSED:
+            logger.info(f'Circuit closed for {self.host}')
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.failures >= self.failure_threshold
+        ):
+            if self.state != CircuitState.OPEN:
+                logger.warning(
+                    f'Circuit open for {self.host} after {self.failures} '
+                    f'failed fetches, pausing requests for {self.reset_timeout:.0f}s'
+                )
+            self.state = CircuitState.OPEN
+            self.opened_at = self.clock()
+
+    def release(self) -> None:
+        """
+        Give up a probe that ended without an answer either way, such as a
+        cancelled request.
+        """
+        self._probing = False
+
+class HostCircuitBreakers:
+    """
+    One circuit breaker per host, shared by every scraper. A host's circuit
+    opens after CIRCUIT_FAILURE_THRESHOLD failed fetches in a row and is
+    probed again after CIRCUIT_RESET_TIMEOUT seconds.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                host,
+                config.get('CIRCUIT_FAILURE_THRESHOLD', 5),
+                config.get('CIRCUIT_RESET_TIMEOUT', 300)
+            )
+        return self.breakers[host]
+
+    def allow(self, host: str) -> bool:
+        return not self.enabled or self.breaker(host).allow()
+
+    def is_closed(self, host: str) -> bool:
+        return not self.enabled or self.breaker(host).state == CircuitState.CLOSED
+
+    def record_success(self, host: str) -> None:
+        if self.enabled:
+            self.breaker(host).record_success()
+
+    def record_failure(self, host: str) -> None:
+        if self.enabled:
+            self.breaker(host).record_failure()
+
+    def release(self, host: str) -> None:
+        if self.enabled:
+            self.breaker(host).release()
+
+circuit_breakers = HostCircuitBreakers(config.get('CIRCUIT_BREAKER_ENABLED', True))
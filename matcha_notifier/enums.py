@@ -13,6 +13,16 @@ class Brand(Enum):
     YAMAMASA_KOYAMAEN ='Yamamasa Koyamaen'
     UNKNOWN = 'Unknown'
 
+class CircuitState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+class StockChange(Enum):
+    NEW = 'new'
+    RESTOCKED = 'restocked'
+    SOLD_OUT = 'soldout'
+
 class StockStatus(Enum):
     INSTOCK = 'instock'
     OUT_OF_STOCK = 'outofstock'
@@ -0,0 +1,221 @@
+import logging
+import re
+import soupsieve
+from abc import ABC, abstractmethod
+from bs4 import BeautifulSoup, SoupStrainer, element
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from selectolax.lexbor import LexborHTMLParser, LexborNode
+except ImportError:     # selectolax is optional
+    LexborHTMLParser = None
+
+try:
+    import lxml
+except ImportError:     # lxml is optional
+    lxml = None
+
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ParseOnly:
+    """
+    The elements of a page worth parsing, like bs4's SoupStrainer: a tag
+    name and attributes that must match. A class attribute matches if it's
+    one of the element's classes. Backends without a strainer parse the
+    whole page.
+    """
+    name: str
+    attrs: Dict[str, str] = field(default_factory=dict)
+
+    def matches(self, attrs: Dict[str, str]) -> bool:
+        for name, value in self.attrs.items():
+            if name == 'class':
+                if value not in attrs.get('class', '').split():
+                    return False
+            elif attrs.get(name) != value:
+                return False
+        return True
+
+class HTMLNode(ABC):
+    """
+    An element of a parsed page. Selectors are referred to by the names a
+    scraper declared them under, and are compiled once by the parser.
+    """
+    def __init__(self, parser: 'HTMLParser'):
+        self.parser = parser
+
+    @abstractmethod
+    def select(self, name: str) -> List['HTMLNode']:
+        """
+        Get the descendants matching the named selector, in document order.
+        """
+        pass
+
+    def select_one(self, name: str) -> Optional['HTMLNode']:
+        nodes = self.select(name)
+        return nodes[0] if nodes else None
+
+    @abstractmethod
+    def attr(self, name: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def text(self) -> str:
+        """
+        Get the text of the element and its descendants.
+        """
+        pass
+
+    def classes(self) -> List[str]:
+        return (self.attr('class') or '').split()
+
+class HTMLParser(ABC):
+    """
+    Parses pages with one parser backend, using selectors compiled from a
+    scraper's SELECTORS.
+    """
+    name = ''
+
+    def __init__(self, selectors: Dict[str, str]):
+        self.selectors = {
+            name: self.compile(selector) for name, selector in selectors.items()
+        }
+
+    @abstractmethod
+    def compile(self, selector: str) -> Any:
+        pass
+
+    @abstractmethod
+    def parse(self, text: str, only: Optional[ParseOnly] = None) -> HTMLNode:
+        """
+        Parse a page and return its root node. If only is given, backends
+        that support it parse just the matching elements. selectolax parses
+        the whole page regardless, so callers still select within the result.
+        """
+        pass
+
+class SoupNode(HTMLNode):
+    def __init__(self, parser: HTMLParser, tag: element.Tag):
+        super().__init__(parser)
+        self.tag = tag
+
+    def select(self, name: str) -> List[HTMLNode]:
+        return [
+            SoupNode(self.parser, tag)
+            for tag in self.parser.selectors[name].select(self.tag)
+        ]
+
+    def select_one(self, name: str) -> Optional[HTMLNode]:
+        tag = self.parser.selectors[name].select_one(self.tag)
+        return SoupNode(self.parser, tag) if tag is not None else None
+
+    def attr(self, name: str) -> Optional[str]:
+        value = self.tag.get(name)
+        if isinstance(value, list):     # bs4 splits multi-valued attributes
+            return ' '.join(value)
+        return value
+
+    def text(self) -> str:
+        return self.tag.get_text()
+
+class SoupParser(HTMLParser):
+    """
+    BeautifulSoup with soupsieve selectors, on the html.parser or lxml tree
+    builder.
+    """
+    def __init__(self, selectors: Dict[str, str], features: str = 'html.parser'):
+        self.name = features
+        self.features = features
+        super().__init__(selectors)
+
+    def compile(self, selector: str) -> soupsieve.SoupSieve:
+        return soupsieve.compile(selector)
+
+    def parse(self, text: str, only: Optional[ParseOnly] = None) -> HTMLNode:
+        parse_only = None
+        if only:
+            # Class attributes aren't split into classes yet when the
+            # strainer runs, so classes are matched with a regex
+            attrs = {
+                name: (
+                    re.compile(rf'(^|\s){re.escape(value)}(\s|$)')
+                    if name == 'class' else value
+                )
+                for name, value in only.attrs.items()
+            }
+            parse_only = SoupStrainer(only.name, attrs=attrs)
+        return SoupNode(
+            self, BeautifulSoup(text, self.features, parse_only=parse_only)
+        )
+
+class LexborNodeWrapper(HTMLNode):
+    def __init__(self, parser: HTMLParser, node: 'LexborNode'):
+        super().__init__(parser)
+        self.node = node
+
+    def select(self, name: str) -> List[HTMLNode]:
+        return [
+            LexborNodeWrapper(self.parser, node)
+            for node in self.node.css(self.parser.selectors[name])
+        ]
+
+    def select_one(self, name: str) -> Optional[HTMLNode]:
+        node = self.node.css_first(self.parser.selectors[name])
+        return LexborNodeWrapper(self.parser, node) if node is not None else None
+
+    def attr(self, name: str) -> Optional[str]:
+        return self.node.attributes.get(name)
+
+    def text(self) -> str:
+        return self.node.text(deep=True)
+
+class LexborParser(HTMLParser):
+    """
+    selectolax's lexbor engine, a C HTML parser and selector engine that's
+    much faster than BeautifulSoup.
+    """
+    name = 'selectolax'
+
+    def compile(self, selector: str) -> str:
+        # lexbor compiles and caches selectors itself; this only checks them
+        LexborHTMLParser('<html></html>').css(selector)
+        return selector
+
+    def parse(self, text: str, only: Optional[ParseOnly] = None) -> HTMLNode:
+        # lexbor has no SoupStrainer, and parses whole pages faster than
+        # they can be cut up reliably, so only is ignored
+        return LexborNodeWrapper(self, LexborHTMLParser(text).root)
+
+def create_parser(backend: str, selectors: Dict[str, str]) -> HTMLParser:
+    """
+    Create a parser for a backend name: 'html.parser', 'lxml' or
+    'selectolax'. Backends whose package isn't installed fall back to
+    html.parser.
+    """
+    if backend == 'selectolax':
+        if LexborHTMLParser is not None:
+            return LexborParser(selectors)
+        logger.warning('selectolax is not installed, using html.parser')
+    elif backend == 'lxml':
+        if lxml is not None:
+            return SoupParser(selectors, 'lxml')
+        logger.warning('lxml is not installed, using html.parser')
+    elif backend != 'html.parser':
+        raise ValueError(f'Unknown HTML parser backend: {backend}')
+
+    return SoupParser(selectors, 'html.parser')
+
+_parsers: Dict[Tuple, HTMLParser] = {}
+
+def get_parser(backend: str, selectors: Dict[str, str]) -> HTMLParser:
+    """
+    create_parser, but parsers are shared so each set of selectors is only
+    compiled once per process.
+    """
+    key = (backend, tuple(sorted(selectors.items())))
+    if key not in _parsers:
+        _parsers[key] = create_parser(backend, selectors)
+    return _parsers[key]
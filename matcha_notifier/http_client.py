@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+from matcha_notifier.circuit_breaker import circuit_breakers
+from matcha_notifier.enums import Website
+from matcha_notifier.rate_limiter import rate_limiter
+from urllib.parse import urlsplit
+from yaml import safe_load
+
+try:
+    import brotli
+except ImportError:     # Brotli is optional
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+def create_session() -> ClientSession:
+    """
+    Create the HTTP session shared by every scraper. Connections are pooled
+    and kept alive for HTTP_KEEPALIVE_TIMEOUT seconds, with at most
+    HTTP_CONNECTION_LIMIT open and MAX_CONCURRENT_REQUESTS_PER_HOST per
+    host, and DNS lookups are cached for HTTP_DNS_CACHE_TTL seconds.
+    """
+    connector = TCPConnector(
+        limit=config.get('HTTP_CONNECTION_LIMIT', 100),
+        limit_per_host=config.get('MAX_CONCURRENT_REQUESTS_PER_HOST', 4),
+        ttl_dns_cache=config.get('HTTP_DNS_CACHE_TTL', 300),
+        keepalive_timeout=config.get('HTTP_KEEPALIVE_TIMEOUT', 75)
+    )
+    return ClientSession(
+        connector=connector,
+        headers={'Accept-Encoding': accept_encoding()},
+        timeout=ClientTimeout(total=config.get('HTTP_TIMEOUT', 10))
+    )
+
+def accept_encoding() -> str:
+    """
+    Get the compressions aiohttp can decode: gzip and deflate, and brotli if
+    the Brotli package is installed.
+    """
+    return 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+def get_timeout(website: Website) -> ClientTimeout:
+    """
+    Get the request timeout for a website: {WEBSITE}_HTTP_TIMEOUT seconds,
+    or HTTP_TIMEOUT.
+    """
+    return ClientTimeout(total=config.get(
+        f'{website.name}_HTTP_TIMEOUT', config.get('HTTP_TIMEOUT', 10)
+    ))
+
+async def warm_up(session: ClientSession, url: str) -> None:
+    """
+    Send a HEAD request to url so a pooled connection to its host is open,
+    with DNS resolved and TLS negotiated, before the next fetch. Hosts whose
+    circuit isn't closed are left alone, and failures are ignored.
+    """
+    host = urlsplit(url).netloc
+    if not circuit_breakers.is_closed(host):
+        return
+
+    try:
+        await rate_limiter.acquire(url)
+        async with session.head(
+            url, timeout=ClientTimeout(total=5), allow_redirects=False
+        ):
+            logger.debug(f'Warmed up connection to {host}')
+    except (ClientError, asyncio.TimeoutError, OSError) as e:
+        logger.debug(f'Failed to warm up connection to {host}: {e}')
@@ -0,0 +1,186 @@
+import json
+import logging
+import quickjs
+import re
+from json.encoder import encode_basestring
+from typing import Any, List, Optional, Tuple
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+# Strings, comments, brackets and trailing commas in a JavaScript literal.
+# A lone quote is a string the converter can't handle, such as a template
+# string with a ${} substitution.
+_TOKENS = re.compile(r'''
+    "[^"\\]*(?:\\.[^"\\]*)*"
+    | `[^`\\$]*(?:(?:\\.|\$(?!\{))[^`\\$]*)*`
+    | '[^'\\]*(?:\\.[^'\\]*)*'
+    | [`']
+    | //[^\n]*
+    | /\*.*?\*/
+    | ,(?=\s*[}\]])
+    | [{}\[\]]
+''', re.VERBOSE | re.DOTALL)
+_ASSIGNMENT = re.compile(r'\s*=(?!=)')
+_ESCAPE = re.compile(
+    r'\\(u[0-9a-fA-F]{4}|u\{[0-9a-fA-F]+\}|x[0-9a-fA-F]{2}|.)', re.DOTALL
+)
+_JS_ESCAPES = {
+    'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'
+}
+
+class JSContextPool:
+    """
+    Keeps a few quickjs contexts for reuse instead of creating one per
+    evaluation. Each context is limited to JS_MEMORY_LIMIT bytes and
+    JS_TIME_LIMIT seconds of CPU time, and is dropped if an evaluation fails.
+    """
+    def __init__(self, size: int, memory_limit: int, time_limit: float):
+        self.size = size
+        self.memory_limit = memory_limit
+        self.time_limit = time_limit
+        self._idle: List[quickjs.Context] = []
+
+    def _new_context(self) -> quickjs.Context:
+        ctx = quickjs.Context()
+        ctx.set_memory_limit(self.memory_limit)
+        ctx.set_time_limit(self.time_limit)
+        return ctx
+
+    def evaluate_literal(self, literal: str) -> Any:
+        """
+        Evaluate a JavaScript expression and return its value decoded from
+        JSON. The expression is wrapped in a function so nothing is left in
+        the context's globals.
+        """
+        ctx = self._idle.pop() if self._idle else self._new_context()
+        try:
+            result = ctx.eval(f'(function () {{ return JSON.stringify({literal}); }})()')
+        except quickjs.JSException:
+            raise ValueError('Failed to evaluate JavaScript literal')
+
+        if len(self._idle) < self.size:
+            self._idle.append(ctx)
+        return json.loads(result)
+
+js_pool = JSContextPool(
+    size=config.get('JS_POOL_SIZE', 2),
+    memory_limit=config.get('JS_MEMORY_LIMIT', 32 * 1024 * 1024),
+    time_limit=config.get('JS_TIME_LIMIT', 1)
+)
+
+def extract_js_literal(text: str, name: str) -> Optional[Any]:
+    """
+    Find the object or array literal assigned to the JavaScript variable
+    name in text and decode it. The literal is converted to JSON directly,
+    and only evaluated with quickjs if it uses syntax the converter doesn't
+    handle. Returns None if the variable isn't found.
+    """
+    # str.find is much faster than a regex search over a whole page
+    assignment = None
+    i = text.find(name)
+    while i >= 0 and assignment is None:
+        assignment = _ASSIGNMENT.match(text, i + len(name))
+        i = text.find(name, i + 1)
+    if assignment is None:
+        return None
+
+    starts = [
+        i for i in (text.find('{', assignment.end()), text.find('[', assignment.end()))
+        if i >= 0
+    ]
+    if not starts:
+        return None
+
+    start = min(starts)
+    try:
+        json_text, _ = js_literal_to_json(text, start)
+        return json.loads(json_text)
+    except ValueError as e:
+        logger.info(f'Evaluating {name} with quickjs: {e}')
+
+    end = _find_literal_end(text, start)
+    return js_pool.evaluate_literal(text[start:end])
+
+def js_literal_to_json(text: str, start: int) -> Tuple[str, int]:
+    """
+    Convert the JavaScript object or array literal starting at text[start]
+    to JSON. Template and single-quoted strings are re-encoded, comments and
+    trailing commas are dropped, and everything else is copied as is.
+    Returns the JSON and the index just past the literal. Raises ValueError
+    for template substitutions or an unterminated literal.
+    """
+    out = []
+    depth = 0
+    last = start
+    for match in _TOKENS.finditer(text, start):
+        token = match.group()
+        out.append(text[last:match.start()])
+        last = match.end()
+        first = token[0]
+        if first == '"':
+            out.append(token)
+        elif first in '`\'':
+            if len(token) == 1:
+                raise ValueError('Unsupported string')
+            out.append(encode_basestring(_decode_js_string(token[1:-1])))
+        elif first in '{[':
+            depth += 1
+            out.append(token)
+        elif first in '}]':
+            depth -= 1
+            out.append(token)
+            if depth == 0:
+                return ''.join(out), last
+        # Comments and trailing commas are dropped
+
+    raise ValueError('Unterminated JavaScript literal')
+
+def _find_literal_end(text: str, start: int) -> int:
+    """
+    Find the index just past the literal starting at text[start] by
+    matching brackets outside of strings.
+    """
+    depth = 0
+    for match in _TOKENS.finditer(text, start):
+        first = match.group()[0]
+        if first in '{[':
+            depth += 1
+        elif first in '}]':
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return len(text)
+
+def _decode_js_string(body: str) -> str:
+    """
+    Decode the escapes in the body of a template or single-quoted string.
+    Raises ValueError for escapes the converter doesn't handle, such as
+    legacy octal escapes.
+    """
+    if '\\' not in body:
+        return body
+    decoded = _ESCAPE.sub(_decode_escape, body)
+    if '\\u' in body:
+        # Join surrogate pairs, e.g. '\\ud83c\\udf75'. Lone surrogates
+        # raise UnicodeDecodeError, a ValueError.
+        decoded = decoded.encode('utf-16-le', 'surrogatepass').decode('utf-16-le')
+    return decoded
+
+def _decode_escape(match: re.Match) -> str:
+    escape = match.group(1)
+    if escape[0] == 'u' and len(escape) > 1:
+        return chr(int(escape[1:].strip('{}'), 16))
+    if escape[0] == 'x' and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    if escape in 'ux' or escape in '123456789' or (
+        escape == '0' and match.string[match.end():match.end() + 1].isdigit()
+    ):
+        raise ValueError(f'Unsupported escape: \\{escape}')
+    if escape == '\n':     # Backslash-newline is a line continuation
+        return ''
+    return _JS_ESCAPES.get(escape, escape)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import statistics
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from matcha_notifier.metrics import loop_lag_seconds, loop_stalls
+from typing import Deque, Dict, List, Optional
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+@dataclass
+class LoopStall:
+    """
+    A stretch of time the event loop was blocked, with the task and stack
+    that were running when it was caught.
+    """
+    __slots__ = ('started', 'duration', 'task', 'stack')
+
+    started: float      # POSIX timestamp
+    duration: float
+    task: str
+    stack: str
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop runs a sleep of interval seconds. Lag
+    over threshold seconds is a stall: something ran without awaiting. A
+    watchdog thread notices stalls while they're happening and captures the
+    running task and the loop thread's stack, since by the time the loop is
+    free again the code that blocked it has moved on. Stalls are logged
+    and the last max_stalls are kept.
+    """
+    def __init__(
+        self, interval: float = 0.1, threshold: float = 0.25,
+        max_samples: int = 3000, max_stalls: int = 20, enabled: bool = True
+    ):
+        self.enabled = enabled
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.stalls: Deque[LoopStall] = deque(maxlen=max_stalls)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        # Set by the watchdog while a stall is in progress
+        self._caught: Optional[LoopStall] = None
+        self._sampler: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if not self.enabled or self._sampler is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._sampler = asyncio.create_task(self._sample(), name='loop_lag_monitor')
+        self._watchdog = threading.Thread(
+            target=self._watch, name='loop-lag-watchdog', daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._sampler is None:
+            return
+
+        self._stopped.set()
+        self._sampler.cancel()
+        await asyncio.gather(self._sampler, return_exceptions=True)
+        self._sampler = None
+        self._watchdog.join()
+        self._watchdog = None
+
+    async def _sample(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(now - start - self.interval, 0.0)
+            self.samples.append(lag)
+            loop_lag_seconds.observe(lag)
+            if lag > self.threshold or self._caught is not None:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float) -> None:
+        stall, self._caught = self._caught, None
+        if stall is None:
+            # Too short for the watchdog to catch
+            stall = LoopStall(time.time() - lag, 0.0, 'unknown', '')
+        stall.duration = lag
+        self.stalls.append(stall)
+        loop_stalls.inc()
+        logger.warning(
+            f'Event loop blocked for {lag:.3f}s while running {stall.task}'
+            + (f'\n{stall.stack}' if stall.stack else '')
+        )
+
+    def _watch(self) -> None:
+        """
+        Runs in the watchdog thread.
+        """
+        while not self._stopped.wait(self.threshold / 2):
+            behind = time.monotonic() - self._heartbeat - self.interval
+            if behind > self.threshold and self._caught is None:
+                self._caught = self._capture(behind)
+
+    def _capture(self, behind: float) -> LoopStall:
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            task_name = 'a callback'
+        else:
+            task_name = f'{task.get_name()} ({task.get_coro().__qualname__})'
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame, limit=12)) if frame else ''
+        return LoopStall(time.time() - behind, 0.0, task_name, stack)
+
+    def summary(self) -> Dict:
+        """
+        Get lag statistics over the recent samples, in seconds.
+        """
+        samples = sorted(self.samples)
+        if not samples:
+            return {'samples': 0}
+
+        return {
+            'samples': len(samples),
+            'last': self.samples[-1],
+            'median': statistics.median(samples),
+            'p99': samples[min(int(len(samples) * 0.99), len(samples) - 1)],
+            'max': samples[-1],
+            'stalls': len(self.stalls),
+        }
+
+    def recent_stalls(self, count: int = 5) -> List[LoopStall]:
+        return list(self.stalls)[-count:]
+
+loop_monitor = LoopLagMonitor(
+    interval=config.get('LOOP_MONITOR_INTERVAL', 0.1),
+    threshold=config.get('LOOP_STALL_THRESHOLD', 0.25),
+    max_stalls=config.get('LOOP_STALL_HISTORY', 20),
+    enabled=config.get('LOOP_MONITOR_ENABLED', True)
+)
@@ -0,0 +1,257 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+from aiohttp import web
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+# Seconds, from a fast parse to a slow fetch with retries
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+class Metric(ABC):
+    """
+    A metric with one value per combination of label values. Label values
+    are passed as keyword arguments, e.g. fetch_bytes.inc(120, site='sazen').
+    """
+    kind = ''
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if labels.keys() != set(self.labels):
+            raise ValueError(f'{self.name} takes labels {self.labels}, got {tuple(labels)}')
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [
+            f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)
+        ]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """
+        Get the metric's sample lines in the Prometheus text format.
+        """
+        pass
+
+    def render(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} {self.kind}',
+            *self.samples()
+        ]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f'{self.name}{self._label_text(key)} {_number(value)}'
+            for key, value in self.values.items()
+        ]
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. Set it, or give it a function that's
+    called when the metrics are rendered.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self._key(labels)] = value
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        self.function = function
+
+    def get(self, **labels: str) -> float:
+        if self.function is not None:
+            return self.function()
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            return [f'{self.name} {_number(self.function())}']
+        return [
+            f'{self.name}{self._label_text(key)} {_number(value)}'
+            for key, value in self.values.items()
+        ]
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: the count in each bucket (not cumulative, with
+        # one more for +Inf), the sum and the count
+        self.values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def count(self, **labels: str) -> int:
+        entry = self.values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(
+                    f'{self.name}_bucket{self._label_text(key, le)} {cumulative}'
+                )
+            lines.append(f'{self.name}_sum{self._label_text(key)} {_number(total)}')
+            lines.append(f'{self.name}_count{self._label_text(key)} {count}')
+        return lines
+
+class MetricsRegistry:
+    """
+    Holds every metric and renders them in the Prometheus text format.
+    """
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+registry = MetricsRegistry()
+
+fetch_seconds = registry.histogram(
+    'matcha_fetch_seconds', 'Time to fetch a URL, per request attempt.', ['site']
+)
+fetch_bytes = registry.counter(
+    'matcha_fetch_bytes_total', 'Response body bytes downloaded.', ['site']
+)
+fetch_errors = registry.counter(
+    'matcha_fetch_errors_total',
+    'Failed request attempts and requests skipped by an open circuit.',
+    ['site', 'type']
+)
+parse_seconds = registry.histogram(
+    'matcha_parse_seconds', 'Time to parse a page, including waiting for the parse pool.',
+    ['site']
+)
+poll_seconds = registry.histogram(
+    'matcha_poll_seconds', 'Time to poll a website, fetches and parses included.',
+    ['site']
+)
+poll_items = registry.gauge(
+    'matcha_poll_items', 'Items found by the last poll of a website.', ['site']
+)
+diff_seconds = registry.histogram(
+    'matcha_diff_seconds', 'Time to diff published polls against the stock state.'
+)
+notify_seconds = registry.histogram(
+    'matcha_notify_seconds', 'Time to send a restock alert to Discord.', ['result']
+)
+poll_queue_depth = registry.gauge(
+    'matcha_poll_queue_depth', 'Published polls waiting to be diffed.'
+)
+loop_lag_seconds = registry.histogram(
+    'matcha_loop_lag_seconds', 'How late the event loop ran a timed wake-up.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+loop_stalls = registry.counter(
+    'matcha_loop_stalls_total', 'Times the event loop was blocked past LOOP_STALL_THRESHOLD.'
+)
+
+def create_metrics_app() -> web.Application:
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(
+            text=registry.render(),
+            content_type='text/plain',
+            headers={'X-Content-Type-Options': 'nosniff'}
+        )
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    return app
+
+async def start_metrics_server() -> Optional[web.AppRunner]:
+    """
+    Serve the metrics at http://METRICS_HOST:METRICS_PORT/metrics, only on
+    localhost by default. Returns None if METRICS_ENABLED is off.
+    """
+    if not config.get('METRICS_ENABLED', False):
+        return None
+
+    runner = web.AppRunner(create_metrics_app(), access_log=None)
+    await runner.setup()
+    host = config.get('METRICS_HOST', '127.0.0.1')
+    port = config.get('METRICS_PORT', 9108)
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f'Serving metrics on http://{host}:{port}/metrics')
+    return runner
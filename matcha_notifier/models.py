@@ -1,17 +1,32 @@
+import sys
 from dataclasses import dataclass
-from matcha_notifier.enums import Brand, StockStatus
-from typing import Dict
+from datetime import datetime
+from functools import lru_cache
+from matcha_notifier.enums import Brand, StockChange, StockStatus, Website
+from typing import Dict, Union
+from zoneinfo import ZoneInfo
 
 
-@dataclass
+AS_OF_TIMEZONE = ZoneInfo('America/Los_Angeles')
+AS_OF_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+
+@dataclass(frozen=True)
 class Item:
     """
     Represents an item with its details.
     """
+    __slots__ = ('id', 'brand', 'name')
+
     id: str
     brand: Brand
     name: str
-    
+
+    def __post_init__(self):
+        # The same IDs and names are seen on every poll, so they're interned
+        # to share one copy
+        object.__setattr__(self, 'id', sys.intern(self.id))
+        object.__setattr__(self, 'name', sys.intern(self.name))
+
     def to_dict(self) -> Dict:
         return {
             "id": self.id,
@@ -27,16 +42,38 @@ class Item:
             name=data["name"]
         )
 
-@dataclass
+@dataclass(frozen=True, init=False)
 class ItemStock:
     """
-    Represents the stock status of an item and its details.
+    Represents the stock status of an item and its details. The time it was
+    seen is kept as a POSIX timestamp and only formatted as an as_of string
+    when it's displayed or serialized.
     """
+    __slots__ = ('item', 'url', 'stock_status', 'timestamp')
+
     item: Item
     url: str
     stock_status: StockStatus
-    as_of: str
-    
+    timestamp: float
+
+    def __init__(
+        self,
+        item: Item,
+        url: str,
+        stock_status: StockStatus,
+        as_of: Union[str, float]
+    ):
+        if isinstance(as_of, str):
+            as_of = parse_as_of(as_of)
+        object.__setattr__(self, 'item', item)
+        object.__setattr__(self, 'url', sys.intern(url))
+        object.__setattr__(self, 'stock_status', stock_status)
+        object.__setattr__(self, 'timestamp', as_of)
+
+    @property
+    def as_of(self) -> str:
+        return format_as_of(self.timestamp)
+
     def to_dict(self) -> Dict:
         return {
             "item": self.item.to_dict(),
@@ -52,4 +89,34 @@ class ItemStock:
             url=data["url"],
             stock_status=StockStatus(data["stock_status"]),
             as_of=data["as_of"]
-        )
\ No newline at end of file
+        )
+
+@dataclass
+class StockEvent:
+    """
+    Represents a change in an item's stock on a website.
+    """
+    __slots__ = ('website', 'item_id', 'change', 'item_stock')
+
+    website: Website
+    item_id: str
+    change: StockChange
+    item_stock: ItemStock
+
+@lru_cache(maxsize=4096)
+def format_as_of(timestamp: float) -> str:
+    """
+    Format a timestamp as Los Angeles time with milliseconds, e.g.
+    '2025-06-12 03:00:00,000'. Unchanged items keep their timestamp, so
+    repeat saves hit the cache.
+    """
+    as_of = datetime.fromtimestamp(timestamp, AS_OF_TIMEZONE)
+    return as_of.strftime('%Y-%m-%d %H:%M:%S,') + f'{as_of.microsecond // 1000:03d}'
+
+def parse_as_of(as_of: str) -> float:
+    """
+    Parse an as_of string from format_as_of back to a timestamp.
+    """
+    return datetime.strptime(as_of, AS_OF_FORMAT).replace(
+        tzinfo=AS_OF_TIMEZONE
+    ).timestamp()
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Optional
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class ParsePool:
+    """
+    Runs CPU-bound page parsing off the event loop, so slow parses don't
+    delay the Discord gateway's heartbeats or slash commands.
+
+    kind is 'process' (a pool of worker processes), 'thread' or 'inline'.
+    Parse functions must be module-level and take and return picklable
+    values. Until start() is called, and for 'inline', they run directly on
+    the loop.
+    """
+    def __init__(self, kind: str = 'process', size: int = 2, timeout: float = 30):
+        if kind not in ('process', 'thread', 'inline'):
+            raise ValueError(f'Unknown PARSE_POOL_KIND: {kind}')
+
+        self.kind = kind
+        self.size = size
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+
+    def start(self) -> None:
+        if self._executor is not None or self.kind == 'inline':
+            return
+
+        if self.kind == 'process':
+            # Workers are spawned rather than forked from a process that
+            # already runs the bot's threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.size, thread_name_prefix='parse'
+            )
+        logger.info(f'Started {self.kind} parse pool with {self.size} workers')
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Run func(*args) in the pool. Raises asyncio.TimeoutError if it takes
+        longer than the pool's timeout.
+        """
+        if self._executor is None:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._executor, partial(func, *args)),
+                self.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(f'{func.__name__} timed out after {self.timeout}s')
+            raise
+        except BrokenProcessPool:
+            # A worker died, e.g. it ran out of memory. Replace the pool so
+            # later parses still run.
+            logger.error(f'Parse pool broke while running {func.__name__}, restarting it')
+            self.close()
+            self.start()
+            raise
+
+parse_pool = ParsePool(
+    kind=config.get('PARSE_POOL_KIND', 'process'),
+    size=config.get('PARSE_POOL_SIZE', 2),
+    timeout=config.get('PARSE_POOL_TIMEOUT', 30)
+)
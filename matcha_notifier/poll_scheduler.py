@@ -0,0 +1,136 @@
+import aiofiles
+import asyncio
+import json
+import logging
+import os
+import time
+from matcha_notifier.enums import StockChange, StockStatus, Website
+from matcha_notifier.models import StockEvent
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+HOURS_PER_WEEK = 7 * 24
+
+class PollScheduler:
+    """
+    Learns when each website tends to restock and picks poll intervals
+    from it. Restocks are counted per UTC hour of the week. A website is
+    polled more often in hours where it has restocked more than its
+    average, including the hours either side, and less often in hours
+    where it rarely does. Intervals stay between the website's
+    {WEBSITE}_MIN_POLL_INTERVAL and {WEBSITE}_MAX_POLL_INTERVAL, or
+    MIN_POLL_INTERVAL and MAX_POLL_INTERVAL. Websites without recorded
+    restocks are polled at their configured interval.
+
+    The counts are kept in schedule_file.
+    """
+    def __init__(self, schedule_file: str = 'poll_schedule.json', prior: float = 24):
+        self.schedule_file = schedule_file
+        # prior restocks' worth of evidence spread evenly over the week, so
+        # a few restocks only move the interval a little
+        self.prior = prior / HOURS_PER_WEEK
+        self.counts: Dict[Website, List[float]] = {}
+        # Websites whose items are already in the stock state. A website's
+        # first poll reports every item as new, which isn't a restock.
+        self.known: Set[Website] = set()
+        self._save_task: Optional[asyncio.Task] = None
+
+    async def load(self) -> None:
+        if not Path(self.schedule_file).exists():
+            return
+
+        try:
+            async with aiofiles.open(self.schedule_file, mode='r') as f:
+                data = json.loads(await f.read())
+            self.counts = {
+                Website(website): counts for website, counts in data.items()
+                if len(counts) == HOURS_PER_WEEK
+            }
+        except (OSError, ValueError) as e:
+            logger.error(f'Failed to load poll schedule {self.schedule_file}: {e}')
+
+    async def save(self) -> None:
+        temp_file = self.schedule_file + '.tmp'
+        async with aiofiles.open(temp_file, mode='w') as f:
+            await f.write(json.dumps(
+                {website.value: counts for website, counts in self.counts.items()}
+            ))
+
+        os.replace(temp_file, self.schedule_file)
+
+    def observe(self, events: List[StockEvent]) -> None:
+        """
+        Count the restocks in a batch of applied stock events. A batch
+        counts once per website however many items restocked.
+        """
+        restocked = {}
+        for event in events:
+            if event.website not in self.known:
+                continue
+            if (
+                event.change != StockChange.SOLD_OUT
+                and event.item_stock.stock_status == StockStatus.INSTOCK
+            ):
+                restocked[event.website] = event.item_stock.timestamp
+
+        self.known.update(event.website for event in events)
+        if not restocked:
+            return
+
+        for website, timestamp in restocked.items():
+            counts = self.counts.setdefault(website, [0] * HOURS_PER_WEEK)
+            counts[hour_of_week(timestamp)] += 1
+            logger.info(f'Recorded a restock on {website.value}')
+
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._save_soon())
+
+    async def _save_soon(self) -> None:
+        try:
+            await self.save()
+        except OSError as e:
+            logger.error(f'Failed to save poll schedule: {e}')
+
+    def next_interval(
+        self, website: Website, interval: float, now: Optional[float] = None
+    ) -> float:
+        """
+        Get how long to wait before polling website again, given its
+        configured interval.
+        """
+        counts = self.counts.get(website)
+        if not counts:
+            return interval
+
+        hour = hour_of_week(time.time() if now is None else now)
+        # Restocks often land a little early or late, so neighbouring hours
+        # count too
+        activity = (
+            0.25 * counts[hour - 1]
+            + 0.5 * counts[hour]
+            + 0.25 * counts[(hour + 1) % HOURS_PER_WEEK]
+            + self.prior
+        )
+        average = sum(counts) / HOURS_PER_WEEK + self.prior
+
+        min_interval = config.get(
+            f'{website.name}_MIN_POLL_INTERVAL', config.get('MIN_POLL_INTERVAL', 30)
+        )
+        max_interval = config.get(
+            f'{website.name}_MAX_POLL_INTERVAL', config.get('MAX_POLL_INTERVAL', 900)
+        )
+        return min(max(interval * average / activity, min_interval), max_interval)
+
+def hour_of_week(timestamp: float) -> int:
+    """
+    Get the UTC hour of the week, from 0 at midnight on Monday.
+    """
+    t = time.gmtime(timestamp)
+    return t.tm_wday * 24 + t.tm_hour
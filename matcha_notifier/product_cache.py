@@ -0,0 +1,85 @@
+import aiofiles
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class ProductCache:
+    """
+    Caches details parsed from product pages, keyed by product URL, so
+    product pages are only fetched for new products. Entries expire after
+    PRODUCT_CACHE_TTL seconds and the least recently used entries are
+    dropped past PRODUCT_CACHE_MAX_SIZE. The cache is saved to cache_file.
+    """
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self.ttl = config.get('PRODUCT_CACHE_TTL', 86400)
+        self.max_size = config.get('PRODUCT_CACHE_MAX_SIZE', 1000)
+        self.entries: OrderedDict = OrderedDict()
+        self._loaded = False
+        self._dirty = False
+
+    async def load(self) -> None:
+        """
+        Load the cache file. Later calls are no-ops.
+        """
+        if self._loaded:
+            return
+
+        self._loaded = True
+        if not Path(self.cache_file).exists():
+            return
+
+        try:
+            async with aiofiles.open(self.cache_file, mode='r') as f:
+                self.entries = OrderedDict(json.loads(await f.read()))
+        except (OSError, ValueError) as e:
+            logger.error(f'Failed to load product cache {self.cache_file}: {e}')
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Get the cached details for a product URL, or None if they're missing
+        or expired.
+        """
+        entry = self.entries.get(url)
+        if entry is None:
+            return None
+
+        if time.time() - entry['cached_at'] > self.ttl:
+            del self.entries[url]
+            self._dirty = True
+            return None
+
+        self.entries.move_to_end(url)
+        return entry['details']
+
+    def set(self, url: str, details: Dict) -> None:
+        self.entries[url] = {'details': details, 'cached_at': time.time()}
+        self.entries.move_to_end(url)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        self._dirty = True
+
+    async def save(self) -> None:
+        """
+        Write the cache file if there are unsaved changes.
+        """
+        if not self._dirty:
+            return
+
+        self._dirty = False
+        temp_file = self.cache_file + '.tmp'
+        async with aiofiles.open(temp_file, mode='w') as f:
+            await f.write(json.dumps(self.entries))
+
+        os.replace(temp_file, self.cache_file)
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict
+from urllib.parse import urlsplit
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average, with bursts of up to burst
+    requests. Waiters are served in the order they arrive. clock returns
+    the current time in seconds.
+    """
+    def __init__(
+        self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how many seconds to wait before using it.
+        Tokens can go negative, which queues later callers behind earlier
+        ones.
+        """
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class HostRateLimiter:
+    """
+    One token bucket per host, shared by every scraper. Hosts are limited
+    to HOST_RATE_LIMITS[host] requests per second, or
+    DEFAULT_HOST_RATE_LIMIT, with bursts of HOST_RATE_BURST.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, host: str) -> TokenBucket:
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(
+                config.get('HOST_RATE_LIMITS', {}).get(
+                    host, config.get('DEFAULT_HOST_RATE_LIMIT', 1)
+                ),
+                config.get('HOST_RATE_BURST', 4)
+            )
+        return self.buckets[host]
+
+    async def acquire(self, url: str) -> None:
+        """
+        Wait until a request to the URL's host is allowed.
+        """
+        if not self.enabled:
+            return
+
+        host = urlsplit(url).netloc
+        delay = self.bucket(host).reserve()
+        if delay > 0:
+            logger.info(f'Rate limiting {host} for {delay:.1f}s')
+            await asyncio.sleep(delay)
+
+rate_limiter = HostRateLimiter(config.get('HOST_RATE_LIMIT_ENABLED', True))
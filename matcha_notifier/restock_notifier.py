@@ -1,12 +1,14 @@
 import asyncio
 import logging
+import time
 from datetime import datetime
 from discord import Color, DMChannel, Embed, Forbidden, TextChannel
 from discord.ext.commands import Bot
 from matcha_notifier.enums import Brand, Website
+from matcha_notifier.metrics import diff_seconds, notify_seconds
 from matcha_notifier.models import ItemStock
 from matcha_notifier.stock_data import StockData
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Set, Union
 from views.paginator_view import PaginatorView
 from yaml import safe_load
 from zoneinfo import ZoneInfo
@@ -27,35 +29,81 @@ class RestockNotifier:
     async def send_alerts(
         self,
         all_items: Dict[Website, Dict[str, ItemStock]],
-        stock_data: StockData
+        stock_data: StockData,
+        poll_queue: asyncio.Queue
     ) -> None:
         """
-        Notify users on any newly restocked items
+        Notify users on any newly restocked items. Only websites that
+        published a poll on poll_queue since the last check are diffed.
         """
         while True:
-            state = await stock_data.load_state()
-            new_instock_items, new_state = stock_data.get_stock_changes(
-                all_items, state
-            )
+            websites = await self._get_polled_websites(poll_queue)
+            try:
+                await self._check_stock_changes(
+                    set(websites), all_items, stock_data
+                )
+            finally:
+                for _ in websites:
+                    poll_queue.task_done()
+
+    async def _get_polled_websites(self, poll_queue: asyncio.Queue) -> List[Website]:
+        """
+        Wait for the next published poll, then drain any others that are
+        already queued so a burst of polls is diffed once.
+        """
+        websites = [await poll_queue.get()]
+        while not poll_queue.empty():
+            websites.append(poll_queue.get_nowait())
+
+        return websites
 
-            # Send alerts if there are new instock items
-            if config['ENABLE_NOTIFICATIONS_FLAG'] is True:
-                is_notified = await self.notify_all_new_restocks(new_instock_items)
-            else:
-                is_notified = False
+    async def _check_stock_changes(
+        self,
+        websites: Set[Website],
+        all_items: Dict[Website, Dict[str, ItemStock]],
+        stock_data: StockData
+    ) -> None:
+        """
+        Diff the latest poll of each website against the stock state, alert
+        on new instock items and apply the changes.
+        """
+        polled_items = {
+            website: all_items[website] for website in websites
+            if website in all_items
+        }
 
-            # If there are any changes, save the new state
-            if new_state != state:
-                # If there are no new instock items or if notifications were sent,
-                # save the state
-                if not new_instock_items or is_notified:
-                    await stock_data.save_state(new_state)
+        start = time.perf_counter()
+        events = stock_data.diff(polled_items)
+        new_instock_items = stock_data.get_instock_changes(events)
+        diff_seconds.observe(time.perf_counter() - start)
 
-            if new_instock_items:
-                logger.info('NEW INSTOCK ITEMS')
-                logger.info(new_instock_items)
+        # Send alerts if there are new instock items
+        if config['ENABLE_NOTIFICATIONS_FLAG'] is True:
+            is_notified = await self.notify_all_new_restocks(new_instock_items)
+        else:
+            is_notified = False
+
+        # If there are no new instock items or if notifications were sent,
+        # apply the changes. Otherwise the changes of the websites in the
+        # failed alert are detected again on their next poll, which is
+        # republished even if the page hasn't changed. The other websites in
+        # the batch weren't part of the alert, so their changes still apply.
+        if not new_instock_items or is_notified:
+            stock_data.apply_events(events)
+            stock_data.unnotified.difference_update(polled_items)
+        else:
+            stock_data.apply_events([
+                event for event in events
+                if event.website not in new_instock_items
+            ])
+            stock_data.unnotified.difference_update(
+                polled_items.keys() - new_instock_items.keys()
+            )
+            stock_data.unnotified.update(new_instock_items)
 
-            await asyncio.sleep(5)
+        if new_instock_items:
+            logger.info('NEW INSTOCK ITEMS')
+            logger.info(new_instock_items)
 
     async def notify_all_new_restocks(
         self, instock_items: Dict[Website, Dict]
@@ -82,12 +130,15 @@ class RestockNotifier:
             view = PaginatorView(self.channel.id, embeds, timeout=120.0)
             logger.info('Sending restock notification')
 
+            start = time.perf_counter()
             try:
                 await self.channel.send(embed=embeds[0], view=view)
                 logger.info('Restock notification sent')
             except Exception as e:
+                notify_seconds.observe(time.perf_counter() - start, result='failed')
                 logger.error(f'Failed to send restock notification: {e}')
                 return False
+            notify_seconds.observe(time.perf_counter() - start, result='sent')
             
         return True
 
@@ -1,12 +1,18 @@
 import asyncio
 import logging
-from aiohttp import ClientSession
 from discord.ext.commands import Bot
 from discord.utils import get as discord_get
 from matcha_notifier.enums import Website
+from matcha_notifier.http_client import create_session
+from matcha_notifier.loop_monitor import loop_monitor
+from matcha_notifier.metrics import poll_queue_depth, start_metrics_server
+from matcha_notifier.parse_pool import parse_pool
+from matcha_notifier.poll_scheduler import PollScheduler
+from matcha_notifier.stock_scheduler import StockScheduler
 from matcha_notifier.stock_task import StockTask
 from matcha_notifier.restock_notifier import RestockNotifier
 from matcha_notifier.stock_data import StockData
+from matcha_notifier.unknown_brands import unknown_brands
 from source_clients import *
 from yaml import safe_load
 
@@ -52,37 +58,68 @@ POLLING_INTERVAL_EXCEPTIONS = {
 }
 
 async def run(bot: Bot) -> bool:
-    async with ClientSession() as session:
+    parse_pool.start()
+    metrics_server = await start_metrics_server()
+    loop_monitor.start()
+    async with create_session() as session:
         stock_data = StockData()
+        await stock_data.load_state()
+        bot.stock_data = stock_data     # Shared with slash commands
         all_items = {}
+        poll_queue = None
 
-        # Create a polling task for each scraper
-        for website, scraper_class in SOURCE_MAPPER.items():
-            scraper = scraper_class(session)
-            polling_interval = config.get(
-                POLLING_INTERVAL_EXCEPTIONS.get(website),
-                config.get('DEFAULT_POLL_INTERVAL', 60)
+        poll_scheduler = None
+        if config.get('ADAPTIVE_POLLING_ENABLED', False):
+            poll_scheduler = PollScheduler(
+                config.get('POLL_SCHEDULE_FILE', 'poll_schedule.json'),
+                config.get('ADAPTIVE_POLL_PRIOR', 24)
             )
-            task = StockTask(
-                website, scraper, polling_interval, all_items,
-                stock_data
-            )
-            asyncio.create_task(task.run())
+            await poll_scheduler.load()
+            poll_scheduler.known.update(stock_data.state)
+            stock_data.listeners.append(poll_scheduler.observe)
 
         restock_channel = discord_get(bot.get_all_channels(), name='restock-alerts')
         if restock_channel:
             logger.info('restock-alerts channel connected')
 
+            # Completed polls are published here and consumed by the notifier
+            poll_queue = asyncio.Queue()
+            poll_queue_depth.set_function(poll_queue.qsize)
             notifier = RestockNotifier(bot, restock_channel)
             asyncio.create_task(
-                notifier.send_alerts(all_items, stock_data)
+                notifier.send_alerts(all_items, stock_data, poll_queue)
             )
         else:
             logger.warning(
                 'Failed to notify on restocks - restock-alerts channel not found'
             )
 
-        await asyncio.Event().wait()  # Keep the session alive
+        # Create a polling task for each scraper, all run by one scheduler
+        stock_scheduler = StockScheduler()
+        bot.stock_scheduler = stock_scheduler   # Next poll times per website
+        for website, scraper_class in SOURCE_MAPPER.items():
+            scraper = scraper_class(session)
+            polling_interval = config.get(
+                POLLING_INTERVAL_EXCEPTIONS.get(website),
+                config.get('DEFAULT_POLL_INTERVAL', 60)
+            )
+            task = StockTask(
+                website, scraper, polling_interval, all_items,
+                stock_data, poll_queue, poll_scheduler
+            )
+            stock_scheduler.add(task)
+        stock_scheduler.start()
+
+        try:
+            await asyncio.Event().wait()  # Keep the session alive
+        finally:
+            await stock_scheduler.stop()
+            await loop_monitor.stop()
+            await stock_data.close()
+            await unknown_brands.close()
+            parse_pool.close()
+            if metrics_server is not None:
+                await metrics_server.cleanup()
 
 if __name__ == '__main__':
    asyncio.run(run())
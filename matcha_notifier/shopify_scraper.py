@@ -0,0 +1,108 @@
+import logging
+from abc import abstractmethod
+from matcha_notifier.base_scraper import NOT_MODIFIED, BaseScraper
+from matcha_notifier.models import ItemStock
+from typing import Dict, List, Optional, Union
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class ShopifyScraper(BaseScraper):
+    """
+    Base class for Shopify storefronts. Products are read from the
+    collection's products.json feed, which lists every variant with its
+    availability, and scrape_html() is only used when the feed can't be
+    fetched or SHOPIFY_JSON_ENABLED is off.
+    """
+    PRODUCTS_PER_PAGE = 250     # The most Shopify returns per page
+    MAX_PAGES = 10
+
+    def __init__(self):
+        super().__init__()
+        # Products from each products.json page, reused when it's unchanged
+        self.json_pages: Dict[str, List[Dict]] = {}
+
+    @property
+    def products_json_url(self) -> str:
+        return f'{self.catalog_url}/products.json'
+
+    async def scrape(self) -> Dict[str, ItemStock]:
+        if config.get('SHOPIFY_JSON_ENABLED', True):
+            products = await self.fetch_products_json()
+            if products is NOT_MODIFIED:
+                return self.page_items.get(self.products_json_url, {})
+
+            if products is not None:
+                all_items = await self.parse_products_json(products)
+                self.page_items[self.products_json_url] = all_items
+                return all_items
+
+            logger.warning(
+                f'products.json unavailable for {self.catalog_url}, '
+                'falling back to HTML'
+            )
+
+        return await self.scrape_html()
+
+    @abstractmethod
+    async def scrape_html(self) -> Dict[str, ItemStock]:
+        """
+        Scrape the rendered collection page.
+        """
+        pass
+
+    @abstractmethod
+    async def parse_product_json(self, product: Dict) -> Optional[ItemStock]:
+        """
+        Map a products.json product to an ItemStock, or None to skip it.
+        """
+        pass
+
+    async def fetch_products_json(self) -> Union[List[Dict], None, object]:
+        """
+        Fetch every page of the collection's products.json feed. Returns
+        None if any page can't be fetched, and NOT_MODIFIED if no page has
+        changed since the last fetch.
+        """
+        products = []
+        modified = False
+        for page in range(1, self.MAX_PAGES + 1):
+            url = (
+                f'{self.products_json_url}'
+                f'?limit={self.PRODUCTS_PER_PAGE}&page={page}'
+            )
+            data = await self.fetch_json(url, self.session, conditional=True)
+            if data is NOT_MODIFIED and url in self.json_pages:
+                page_products = self.json_pages[url]
+            elif isinstance(data, dict) and isinstance(data.get('products'), list):
+                page_products = data['products']
+                self.json_pages[url] = page_products
+                modified = True
+            else:
+                return None
+
+            products.extend(page_products)
+            if len(page_products) < self.PRODUCTS_PER_PAGE:
+                break
+
+        if not modified and self.products_json_url in self.page_items:
+            return NOT_MODIFIED
+        return products
+
+    async def parse_products_json(self, products: List[Dict]) -> Dict[str, ItemStock]:
+        all_items = {}
+        for product in products:
+            item_stock = await self.parse_product_json(product)
+            if item_stock is not None:
+                all_items[item_stock.item.id] = item_stock
+        return all_items
+
+    def is_available(self, product: Dict) -> bool:
+        """
+        Return True if any of the product's variants can be bought.
+        """
+        return any(v.get('available') for v in product.get('variants', []))
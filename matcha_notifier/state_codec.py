@@ -0,0 +1,208 @@
+import struct
+import zlib
+from matcha_notifier.enums import Brand, StockChange, StockStatus, Website
+from matcha_notifier.models import Item, ItemStock, StockEvent
+from typing import Callable, Dict, List, Tuple
+
+
+# File layout, little-endian:
+#   magic b'MTST', uint16 version
+#   uint32 byte length of the string table, then the table: every distinct
+#   string, UTF-8 encoded and NUL-separated
+#   uint32 record count, then one fixed-size record per item: string table
+#   indexes of the website, item ID, brand, name, URL and stock status, and
+#   the as_of timestamp as a double
+MAGIC = b'MTST'
+VERSION = 1
+
+# Journal layout, little-endian:
+#   magic b'MTJL', uint16 version
+#   then one record per stock event: uint32 payload length, uint32 CRC-32
+#   of the payload, and the payload: the website, item ID, change, brand,
+#   name, URL and stock status, UTF-8 encoded and NUL-separated, followed
+#   by the as_of timestamp as a double
+JOURNAL_MAGIC = b'MTJL'
+JOURNAL_VERSION = 1
+
+_HEADER = struct.Struct('<4sH')
+_COUNT = struct.Struct('<I')
+_RECORD = struct.Struct('<6Id')
+_EVENT_HEADER = struct.Struct('<II')
+_TIMESTAMP = struct.Struct('<d')
+
+def encode_state(state: Dict[Website, Dict[str, ItemStock]]) -> bytes:
+    """
+    Encode the stock state in the current binary format.
+    """
+    strings: Dict[str, int] = {}
+    def index(value: str) -> int:
+        i = strings.get(value)
+        if i is None:
+            if '\0' in value:
+                raise ValueError(f'Can\'t encode a string with a NUL: {value!r}')
+            i = strings[value] = len(strings)
+        return i
+
+    records = bytearray()
+    count = 0
+    for website, items in state.items():
+        website_index = index(website.value)
+        for item_id, item_stock in items.items():
+            records += _RECORD.pack(
+                website_index,
+                index(item_id),
+                index(item_stock.item.brand.value),
+                index(item_stock.item.name),
+                index(item_stock.url),
+                index(item_stock.stock_status.value),
+                item_stock.timestamp
+            )
+            count += 1
+
+    table = '\0'.join(strings).encode()
+    return b''.join((
+        _HEADER.pack(MAGIC, VERSION),
+        _COUNT.pack(len(table)), table,
+        _COUNT.pack(count), records
+    ))
+
+def decode_state(data: bytes) -> Dict[Website, Dict[str, ItemStock]]:
+    """
+    Decode a stock state written by any known format version. Raises
+    ValueError if data isn't a state file or its version is unknown.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError('Truncated state file')
+
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a binary state file')
+    decoder = _DECODERS.get(version)
+    if decoder is None:
+        raise ValueError(f'Unsupported state file version: {version}')
+
+    try:
+        return decoder(data, _HEADER.size)
+    except struct.error as e:
+        raise ValueError(f'Truncated state file: {e}')
+
+def _decode_v1(data: bytes, offset: int) -> Dict[Website, Dict[str, ItemStock]]:
+    (table_size,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    table = data[offset:offset + table_size]
+    strings: List[str] = table.decode().split('\0') if table_size else []
+    offset += table_size
+
+    (count,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    end = offset + count * _RECORD.size
+    if end != len(data):
+        raise ValueError('State file size doesn\'t match its record count')
+
+    # Each distinct enum value is only converted once
+    websites = _EnumCache(Website, strings)
+    brands = _EnumCache(Brand, strings)
+    statuses = _EnumCache(StockStatus, strings)
+
+    state: Dict[Website, Dict[str, ItemStock]] = {}
+    for site, item_id, brand, name, url, status, timestamp in _RECORD.iter_unpack(
+        data[offset:end]
+    ):
+        item_id = strings[item_id]
+        state.setdefault(websites[site], {})[item_id] = ItemStock(
+            item=Item(id=item_id, brand=brands[brand], name=strings[name]),
+            url=strings[url],
+            stock_status=statuses[status],
+            as_of=timestamp
+        )
+    return state
+
+class _EnumCache(dict):
+    def __init__(self, enum: Callable, strings: List[str]):
+        super().__init__()
+        self.enum = enum
+        self.strings = strings
+
+    def __missing__(self, index: int):
+        value = self[index] = self.enum(self.strings[index])
+        return value
+
+_DECODERS = {1: _decode_v1}
+
+def journal_header() -> bytes:
+    return _HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION)
+
+def encode_events(events: List[StockEvent]) -> bytes:
+    """
+    Encode stock events as journal records.
+    """
+    records = []
+    for event in events:
+        item_stock = event.item_stock
+        fields = (
+            event.website.value, event.item_id, event.change.value,
+            item_stock.item.brand.value, item_stock.item.name, item_stock.url,
+            item_stock.stock_status.value
+        )
+        if any('\0' in field for field in fields):
+            raise ValueError(f'Can\'t encode a string with a NUL: {fields!r}')
+
+        payload = '\0'.join(fields).encode() + _TIMESTAMP.pack(item_stock.timestamp)
+        records.append(_EVENT_HEADER.pack(len(payload), zlib.crc32(payload)))
+        records.append(payload)
+    return b''.join(records)
+
+def decode_journal(data: bytes) -> Tuple[List[StockEvent], int]:
+    """
+    Decode the stock events in a journal. Decoding stops at the first
+    incomplete or corrupt record, such as one cut short by a crash, so the
+    events before it are returned with the length of the valid data.
+    Raises ValueError if data isn't a journal or its version is unknown.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError('Truncated journal')
+
+    magic, version = _HEADER.unpack_from(data)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError('Not a stock event journal')
+    if version != JOURNAL_VERSION:
+        raise ValueError(f'Unsupported journal version: {version}')
+
+    events = []
+    offset = _HEADER.size
+    while offset + _EVENT_HEADER.size <= len(data):
+        size, crc = _EVENT_HEADER.unpack_from(data, offset)
+        start = offset + _EVENT_HEADER.size
+        payload = data[start:start + size]
+        if len(payload) != size or zlib.crc32(payload) != crc:
+            break
+
+        try:
+            events.append(_decode_event(payload))
+        except ValueError:
+            break
+        offset = start + size
+
+    return events, offset
+
+def _decode_event(payload: bytes) -> StockEvent:
+    if len(payload) < _TIMESTAMP.size:
+        raise ValueError('Malformed journal record')
+
+    fields = payload[:-_TIMESTAMP.size].decode().split('\0')
+    if len(fields) != 7:
+        raise ValueError('Malformed journal record')
+
+    website, item_id, change, brand, name, url, stock_status = fields
+    (timestamp,) = _TIMESTAMP.unpack_from(payload, len(payload) - _TIMESTAMP.size)
+    return StockEvent(
+        Website(website),
+        item_id,
+        StockChange(change),
+        ItemStock(
+            item=Item(id=item_id, brand=Brand(brand), name=name),
+            url=url,
+            stock_status=StockStatus(stock_status),
+            as_of=timestamp
+        )
+    )
@@ -0,0 +1,405 @@
+import aiofiles
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from matcha_notifier.enums import Brand, StockStatus, Website
+from matcha_notifier.models import Item, ItemStock, StockEvent
+from matcha_notifier.state_codec import (
+    decode_journal, decode_state, encode_events, encode_state, journal_header
+)
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class StateStore(ABC):
+    """
+    Persists the stock state held by StockData.
+    """
+    @abstractmethod
+    async def load(self) -> Dict[Website, Dict[str, ItemStock]]:
+        """
+        Load the full stock state.
+        """
+        pass
+
+    @abstractmethod
+    async def save(
+        self,
+        state: Dict[Website, Dict[str, ItemStock]],
+        events: List[StockEvent]
+    ) -> None:
+        """
+        Persist the stock state. events are the changes applied to state
+        since the last save.
+        """
+        pass
+
+    async def close(self) -> None:
+        pass
+
+class JsonStateStore(StateStore):
+    """
+    Stores the whole state in a single JSON file that's rewritten on save.
+    """
+    def __init__(self, state_file: str = 'state.json'):
+        self.state_file = state_file
+
+    async def load(self) -> Dict[Website, Dict[str, ItemStock]]:
+        if not Path(self.state_file).exists():
+            return {}
+
+        async with aiofiles.open(self.state_file, mode='r') as f:
+            content = await f.read()
+            website_items = json.loads(content)
+
+        # Convert website_items to data models when applicable
+        state = {}
+        for website, items in website_items.items():
+            state[Website(website)] = {}
+            for item_id, data in items.items():
+                state[Website(website)][item_id] = ItemStock.from_dict(data)
+        return state
+
+    async def save(
+        self,
+        state: Dict[Website, Dict[str, ItemStock]],
+        events: List[StockEvent]
+    ) -> None:
+        temp_state = {}
+        for website, items in state.items():
+            temp_state[website.value] = {k: v.to_dict() for k, v in items.items()}
+
+        text = json.dumps(temp_state, indent=2)
+
+        # Write to a temporary file first to avoid data loss
+        temp_file = self.state_file + '.tmp'
+        async with aiofiles.open(temp_file, mode='w') as f:
+            await f.write(text)
+
+        os.replace(temp_file, self.state_file)  # Atomically replace state file
+
+class BinaryStateStore(StateStore):
+    """
+    Stores the whole state in a versioned binary file (see state_codec)
+    that's rewritten on save. If the binary file doesn't exist yet, the
+    JSON state file is imported and written in the binary format.
+    """
+    def __init__(self, state_file: str = 'state.bin', json_file: str = 'state.json'):
+        self.state_file = state_file
+        self.json_file = json_file
+
+    async def load(self) -> Dict[Website, Dict[str, ItemStock]]:
+        if not Path(self.state_file).exists():
+            return await self.migrate_json()
+
+        async with aiofiles.open(self.state_file, mode='rb') as f:
+            return decode_state(await f.read())
+
+    async def save(
+        self,
+        state: Dict[Website, Dict[str, ItemStock]],
+        events: List[StockEvent]
+    ) -> None:
+        data = encode_state(state)
+
+        # Write to a temporary file first to avoid data loss
+        temp_file = self.state_file + '.tmp'
+        async with aiofiles.open(temp_file, mode='wb') as f:
+            await f.write(data)
+
+        os.replace(temp_file, self.state_file)
+
+    async def migrate_json(self) -> Dict[Website, Dict[str, ItemStock]]:
+        """
+        Import the JSON state file, if there is one, and save it in the
+        binary format. Returns the imported state.
+        """
+        state = await JsonStateStore(self.json_file).load()
+        if Path(self.json_file).exists():
+            await self.save(state, [])
+            count = sum(len(items) for items in state.values())
+            logger.info(f'Migrated {count} items from {self.json_file} to {self.state_file}')
+        return state
+
+class JournaledStateStore(StateStore):
+    """
+    Wraps a snapshot store so that saves append the changed items to a
+    journal instead of rewriting the whole state. Loading reads the last
+    snapshot and replays the journal over it. Once the journal grows past
+    max_size bytes, a save writes a new snapshot and starts a new journal.
+
+    Records are checksummed, so a record cut short by a crash is dropped on
+    load. A compaction interrupted before the journal is removed is safe
+    too, since replaying the journal over the new snapshot changes nothing.
+    """
+    def __init__(
+        self,
+        snapshot: StateStore,
+        journal_file: str = 'state.journal',
+        max_size: int = 1024 * 1024
+    ):
+        self.snapshot = snapshot
+        self.journal_file = journal_file
+        self.max_size = max_size
+        self._size: Optional[int] = None    # Bytes in the journal
+
+    async def load(self) -> Dict[Website, Dict[str, ItemStock]]:
+        state = await self.snapshot.load()
+        self._size = 0
+        if not Path(self.journal_file).exists():
+            return state
+
+        async with aiofiles.open(self.journal_file, mode='rb') as f:
+            data = await f.read()
+
+        try:
+            events, size = decode_journal(data)
+        except ValueError as e:
+            # Keep the unreadable journal aside rather than appending to it
+            logger.error(f'Ignoring unreadable journal {self.journal_file}: {e}')
+            os.replace(self.journal_file, self.journal_file + '.corrupt')
+            return state
+
+        if size < len(data):
+            logger.warning(
+                f'Dropping {len(data) - size} bytes of incomplete records '
+                f'from {self.journal_file}'
+            )
+            os.truncate(self.journal_file, size)
+
+        for event in events:
+            state.setdefault(event.website, {})[event.item_id] = event.item_stock
+        self._size = size
+        logger.info(f'Replayed {len(events)} stock events from {self.journal_file}')
+        return state
+
+    async def save(
+        self,
+        state: Dict[Website, Dict[str, ItemStock]],
+        events: List[StockEvent]
+    ) -> None:
+        if self._size is None:
+            path = Path(self.journal_file)
+            self._size = path.stat().st_size if path.exists() else 0
+
+        data = encode_events(events)
+        if self._size == 0:
+            data = journal_header() + data
+
+        async with aiofiles.open(self.journal_file, mode='ab') as f:
+            await f.write(data)
+        self._size += len(data)
+
+        if self._size >= self.max_size:
+            await self.compact(state)
+
+    async def compact(self, state: Dict[Website, Dict[str, ItemStock]]) -> None:
+        """
+        Write state as the new snapshot and start a new journal.
+        """
+        await self.snapshot.save(state, [])
+        if Path(self.journal_file).exists():
+            os.remove(self.journal_file)
+        logger.info(f'Compacted {self._size} bytes of {self.journal_file} into a snapshot')
+        self._size = 0
+
+    async def close(self) -> None:
+        await self.snapshot.close()
+
+class SqliteStateStore(StateStore):
+    """
+    Stores one row per item in an SQLite database, keyed by (website,
+    item_id) and indexed by stock status. Saves only upsert the items that
+    changed. The first load imports an existing JSON state file.
+    """
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_file: str = 'state.db', json_file: str = 'state.json'):
+        self.db_file = db_file
+        self.json_file = json_file
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()   # Queries run in worker threads
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS items (
+                    website TEXT NOT NULL,
+                    item_id TEXT NOT NULL,
+                    brand TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    stock_status TEXT NOT NULL,
+                    as_of TEXT NOT NULL,
+                    PRIMARY KEY (website, item_id)
+                )
+            ''')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS items_stock_status '
+                'ON items (website, stock_status)'
+            )
+            conn.commit()
+            self._conn = conn
+
+        return self._conn
+
+    async def load(self) -> Dict[Website, Dict[str, ItemStock]]:
+        if await self._needs_migration():
+            await self.migrate_json()
+
+        rows = await asyncio.to_thread(self._query, 'SELECT * FROM items')
+        state = {}
+        for row in rows:
+            item_stock = self._from_row(row)
+            state.setdefault(Website(row[0]), {})[row[1]] = item_stock
+        return state
+
+    async def save(
+        self,
+        state: Dict[Website, Dict[str, ItemStock]],
+        events: List[StockEvent]
+    ) -> None:
+        rows = [
+            self._to_row(event.website, event.item_id, event.item_stock)
+            for event in events
+        ]
+        await asyncio.to_thread(self._upsert, rows)
+
+    async def migrate_json(self) -> int:
+        """
+        Import the JSON state file. Returns the number of imported items.
+        """
+        state = await JsonStateStore(self.json_file).load()
+        rows = [
+            self._to_row(website, item_id, item_stock)
+            for website, items in state.items()
+            for item_id, item_stock in items.items()
+        ]
+        await asyncio.to_thread(self._upsert, rows, self.SCHEMA_VERSION)
+        logger.info(f'Migrated {len(rows)} items from {self.json_file} to {self.db_file}')
+        return len(rows)
+
+    async def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def _needs_migration(self) -> bool:
+        rows = await asyncio.to_thread(self._query, 'PRAGMA user_version')
+        if rows[0][0] >= self.SCHEMA_VERSION:
+            return False
+
+        if Path(self.json_file).exists():
+            return True
+
+        # Nothing to migrate, so mark the database as up to date
+        await asyncio.to_thread(self._upsert, [], self.SCHEMA_VERSION)
+        return False
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _upsert(self, rows: List[Tuple], user_version: Optional[int] = None) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:  # Commit all rows in one transaction
+                conn.executemany('''
+                    INSERT INTO items (
+                        website, item_id, brand, name, url, stock_status, as_of
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (website, item_id) DO UPDATE SET
+                        brand = excluded.brand,
+                        name = excluded.name,
+                        url = excluded.url,
+                        stock_status = excluded.stock_status,
+                        as_of = excluded.as_of
+                ''', rows)
+                if user_version is not None:
+                    conn.execute(f'PRAGMA user_version = {int(user_version)}')
+
+    def _to_row(self, website: Website, item_id: str, item_stock: ItemStock) -> Tuple:
+        return (
+            website.value,
+            item_id,
+            item_stock.item.brand.value,
+            item_stock.item.name,
+            item_stock.url,
+            item_stock.stock_status.value,
+            item_stock.as_of
+        )
+
+    def _from_row(self, row: Tuple) -> ItemStock:
+        _, item_id, brand, name, url, stock_status, as_of = row
+        return ItemStock(
+            item=Item(id=item_id, brand=Brand(brand), name=name),
+            url=url,
+            stock_status=StockStatus(stock_status),
+            as_of=as_of
+        )
+
+def create_state_store() -> StateStore:
+    """
+    Create the state store selected by STATE_BACKEND in config.yaml,
+    journaled if STATE_JOURNAL_ENABLED is set.
+    """
+    backend = config.get('STATE_BACKEND', 'json')
+    state_file = config.get('STATE_FILE', 'state.json')
+    if backend == 'json':
+        store = JsonStateStore(state_file)
+    elif backend == 'binary':
+        store = BinaryStateStore(config.get('STATE_BIN_FILE', 'state.bin'), state_file)
+    elif backend == 'sqlite':
+        # SQLite already writes only the changed rows
+        return SqliteStateStore(config.get('STATE_DB_FILE', 'state.db'), state_file)
+    else:
+        raise ValueError(f'Unknown STATE_BACKEND: {backend}')
+
+    if not config.get('STATE_JOURNAL_ENABLED', False):
+        return store
+    return JournaledStateStore(
+        store,
+        config.get('STATE_JOURNAL_FILE', 'state.journal'),
+        config.get('STATE_JOURNAL_MAX_SIZE', 1024 * 1024)
+    )
+
+async def export_json(out_file: str) -> int:
+    """
+    Write the configured store's state to out_file in the JSON state
+    format. Returns the number of exported items.
+    """
+    store = create_state_store()
+    try:
+        state = await store.load()
+    finally:
+        await store.close()
+
+    await JsonStateStore(out_file).save(state, [])
+    return sum(len(items) for items in state.values())
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect the stock state store.')
+    parser.add_argument(
+        '--export-json', metavar='FILE', required=True,
+        help='write the state to FILE as JSON, for debugging'
+    )
+    args = parser.parse_args()
+    count = asyncio.run(export_json(args.export_json))
+    print(f'Exported {count} items to {args.export_json}')
@@ -1,104 +1,185 @@
-import aiofiles
-import json
-import os
-from copy import deepcopy
-from matcha_notifier.enums import StockStatus, Website
-from matcha_notifier.models import ItemStock
-from pathlib import Path
-from typing import Dict, Tuple
+import asyncio
+import logging
+from matcha_notifier.enums import StockChange, StockStatus, Website
+from matcha_notifier.models import ItemStock, StockEvent
+from matcha_notifier.state_store import StateStore, create_state_store
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from yaml import safe_load
 
 
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
 class StockData:
-    def __init__(self):
-        self.state_file = 'state.json'
+    """
+    Holds the live stock state in memory. The state store is only read on the
+    first load_state call and is written behind, STATE_FLUSH_DELAY seconds
+    after the first unsaved change, so bursts of changes share one write.
+    """
+    def __init__(self, store: Optional[StateStore] = None):
+        self.store = store or create_state_store()
+        self.state: Dict[Website, Dict[str, ItemStock]] = {}
+        self.flush_delay = config.get('STATE_FLUSH_DELAY', 5)
+        self._loaded = False
+        self._dirty = False
+        self._pending_events: List[StockEvent] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # Called with each batch of applied events
+        self.listeners: List[Callable[[List[StockEvent]], None]] = []
+        # Websites with new instock items whose alert hasn't been sent yet
+        self.unnotified: Set[Website] = set()
 
     def get_stock_changes(
             self,
             all_items: Dict[Website, Dict[str, ItemStock]],
             state: Dict[Website, Dict[str, ItemStock]]
-    ) -> Tuple[Dict[Website, ItemStock], Dict[Website, Dict[str, ItemStock]]]:
+    ) -> Tuple[Dict[Website, Dict[str, ItemStock]], Dict[Website, Dict[str, ItemStock]]]:
+        """
+        Detect item stock changes and apply them to state in place. Returns
+        new/restocked items and the updated state.
         """
-        Detect item stock changes and returns new/restocked items and the new state.
+        events = self.diff(all_items, state)
+        self._apply_events(events, state)
+        return (self.get_instock_changes(events), state)
+
+    def diff(
+        self,
+        all_items: Dict[Website, Dict[str, ItemStock]],
+        state: Optional[Dict[Website, Dict[str, ItemStock]]] = None
+    ) -> List[StockEvent]:
+        """
+        Compare polled items against the state without copying or changing
+        it. Only the websites in all_items are walked.
         """
-        all_new_instock_items = {}
-        new_state = deepcopy(state) # Create a copy to avoid modifying the original state
+        if state is None:
+            state = self.state
+
+        events = []
         for site, items in all_items.items():
-            instock_items = {}
-
-            if site not in new_state:    # New site
-                new_state[site] = {}
-
-            for item, data in items.items():
-                if item not in new_state[site]:    # New item
-                    new_state[site][item] = data
-                    if data.stock_status == StockStatus.INSTOCK:
-                        instock_items[item] = data
-                elif (
-                    new_state[site][item].stock_status == StockStatus.OUT_OF_STOCK
-                    and data.stock_status == StockStatus.INSTOCK
-                ):
-                    # Item was out of stock but instock now
-                    new_state[site][item].stock_status = StockStatus.INSTOCK
-                    instock_items[item] = data
-                elif (
-                    new_state[site][item].stock_status == StockStatus.INSTOCK
-                    and data.stock_status == StockStatus.OUT_OF_STOCK
-                ):
-                    # Item was instock but out of stock now
-                    new_state[site][item].stock_status = StockStatus.OUT_OF_STOCK
-                else: 
-                    # Item is still in stock
-                    pass
+            site_state = state.get(site, {})
+            for item_id, data in items.items():
+                current = site_state.get(item_id)
+                if current is None:     # New item
+                    change = StockChange.NEW
+                elif current.stock_status == data.stock_status:
+                    continue
+                elif data.stock_status == StockStatus.INSTOCK:
+                    change = StockChange.RESTOCKED
+                else:
+                    change = StockChange.SOLD_OUT
 
-            if instock_items:
-                all_new_instock_items[site] = deepcopy(instock_items)
+                events.append(StockEvent(site, item_id, change, data))
 
-        return (all_new_instock_items, new_state)
+        return events
 
-    async def load_state(self) -> Dict[str, Dict[str, ItemStock]]:
+    def apply_events(self, events: List[StockEvent]) -> None:
         """
-        Load state file
+        Apply stock events to the in-memory state and schedule a write of the
+        state file.
         """
-        if Path(self.state_file).exists():
-            async with aiofiles.open(self.state_file, mode='r') as f:
-                content = await f.read()
-                website_items = json.loads(content)
+        if not events:
+            return
 
-            # Convert website_items to data models when applicable
-            state = {}
-            for website, items in website_items.items():
-                state[Website(website)] = {}
-                for item_id, data in items.items():
-                    state[Website(website)][item_id] = ItemStock.from_dict(data)
-            return state
-        return {}
+        self._apply_events(events, self.state)
+        for listener in self.listeners:
+            listener(events)
+        self._pending_events.extend(events)
+        self._loaded = True
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def _apply_events(
+        self,
+        events: List[StockEvent],
+        state: Dict[Website, Dict[str, ItemStock]]
+    ) -> None:
+        for event in events:
+            state.setdefault(event.website, {})[event.item_id] = event.item_stock
+
+    def get_instock_changes(
+        self, events: List[StockEvent]
+    ) -> Dict[Website, Dict[str, ItemStock]]:
+        """
+        Group new and restocked items that are in stock by website.
+        """
+        instock_items = {}
+        for event in events:
+            if event.item_stock.stock_status != StockStatus.INSTOCK:
+                continue
+
+            instock_items.setdefault(event.website, {})[event.item_id] = (
+                event.item_stock
+            )
+
+        return instock_items
+
+    async def load_state(self) -> Dict[Website, Dict[str, ItemStock]]:
+        """
+        Load the state store into memory. Later calls return the in-memory
+        state.
+        """
+        if not self._loaded:
+            self.state = await self.store.load()
+            self._loaded = True
 
-    async def save_state(self, new_state: Dict[Website, Dict[str, ItemStock]]) -> None:
+        return self.state
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f'Failed to save stock state: {e}')
+
+    async def flush(self) -> None:
         """
-        Update state file with product stock changes
+        Update the state store with product stock changes
         """
-        if not new_state:
+        if not self._dirty:
             return
 
-        temp_state = {}
-        for website, items in new_state.items():
-            temp_state[website.value] = {k: v.to_dict() for k, v in items.items()}
+        events = self._pending_events
+        self._dirty = False
+        self._pending_events = []
+        try:
+            await self.store.save(self.state, events)
+        except Exception:
+            # Keep the changes so the next flush retries them
+            self._pending_events = events + self._pending_events
+            self._dirty = True
+            raise
 
-        text = json.dumps(temp_state, indent=2)
-        
-        # Write to a temporary file first to avoid data loss
-        temp_file = self.state_file + '.tmp'
-        async with aiofiles.open(temp_file, mode='w') as f:
-            await f.write(text)
+    async def close(self) -> None:
+        """
+        Cancel any scheduled write and write outstanding changes now.
+        """
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
 
-        os.replace(temp_file, self.state_file)  # Atomically replace state file
+        self._flush_task = None
+        await self.flush()
+        await self.store.close()
 
     def get_website_instock_items(
-        self, website: Website, state: Dict[Website, Dict[str, ItemStock]]
+        self,
+        website: Website,
+        state: Optional[Dict[Website, Dict[str, ItemStock]]] = None
     ) -> Dict[str, ItemStock]:
         """
         Get all in-stock items for a specific website.
         """
+        if state is None:
+            state = self.state
+
         instock_items = {website: {}}
         if website in state:
             for k, v in state[website].items():
@@ -110,14 +191,13 @@ class StockData:
 
         return {}
     
-    async def get_all_instock_items(self) -> Dict[Website, Dict[str, ItemStock]]:
+    def get_all_instock_items(self) -> Dict[Website, Dict[str, ItemStock]]:
         """
         Get all in-stock items across all websites.
         """
-        state = await self.load_state()
         all_instock_items = {}
-        for website in state:
-            instock_items = self.get_website_instock_items(website, state)
+        for website in self.state:
+            instock_items = self.get_website_instock_items(website)
             if instock_items:
                 all_instock_items.update(instock_items)
         return all_instock_items
@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import random
+import time
+from matcha_notifier.enums import Website
+from matcha_notifier.stock_task import StockTask
+from typing import Dict, List, Optional
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class StockScheduler:
+    """
+    Runs the polls of every StockTask. Start times are staggered by
+    POLL_START_STAGGER seconds so the websites aren't all polled at once,
+    and each wait between polls is randomized by up to POLL_JITTER (a
+    fraction of the interval) so they don't fall back into step. A
+    website's polls never overlap. Requests themselves are rate limited
+    per host by rate_limiter. Websites polled less often than connections
+    are kept alive get a connection warmed up just before each poll.
+    """
+    def __init__(self):
+        self.stagger = config.get('POLL_START_STAGGER', 5)
+        self.jitter = config.get('POLL_JITTER', 0.1)
+        # Waits longer than the keep-alive outlive the pooled connection, so
+        # the website's connection is warmed up this long before its poll
+        self.warm_up_lead = config.get('HTTP_WARM_UP_LEAD', 2)
+        self.keepalive = config.get('HTTP_KEEPALIVE_TIMEOUT', 75)
+        self.tasks: List[StockTask] = []
+        # When each website is next polled, as a POSIX timestamp
+        self.next_runs: Dict[Website, float] = {}
+        self._runners: List[asyncio.Task] = []
+
+    def add(self, task: StockTask) -> None:
+        self.tasks.append(task)
+
+    def start(self) -> None:
+        for i, task in enumerate(self.tasks):
+            self._runners.append(
+                asyncio.create_task(self._run_task(task, i * self.stagger))
+            )
+
+    async def stop(self) -> None:
+        for runner in self._runners:
+            runner.cancel()
+        await asyncio.gather(*self._runners, return_exceptions=True)
+        self._runners = []
+
+    def next_run(self, website: Website) -> Optional[float]:
+        return self.next_runs.get(website)
+
+    async def _run_task(self, task: StockTask, delay: float) -> None:
+        while True:
+            self.next_runs[task.website] = time.time() + delay
+            if self.warm_up_lead > 0 and delay > self.keepalive:
+                await asyncio.sleep(delay - self.warm_up_lead)
+                await task.warm_up()
+                await asyncio.sleep(self.warm_up_lead)
+            elif delay > 0:
+                await asyncio.sleep(delay)
+
+            await task.poll_once()
+            delay = self.jittered(task.next_interval())
+
+    def jittered(self, interval: float) -> float:
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
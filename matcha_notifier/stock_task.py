@@ -1,10 +1,13 @@
 import asyncio
 import logging
+import time
 from matcha_notifier.enums import Website
+from matcha_notifier.metrics import poll_items, poll_seconds
 from matcha_notifier.models import ItemStock
+from matcha_notifier.poll_scheduler import PollScheduler
 from matcha_notifier.scraper import Scraper
 from matcha_notifier.stock_data import StockData
-from typing import Dict
+from typing import Dict, Optional
 
 
 logger = logging.getLogger(__name__)
@@ -12,31 +15,78 @@ logger = logging.getLogger(__name__)
 class StockTask:
     def __init__(
         self, website: Website, scraper: Scraper, interval: int,
-        all_items: Dict[Website, Dict[str, ItemStock]], stock_data: StockData
+        all_items: Dict[Website, Dict[str, ItemStock]], stock_data: StockData,
+        poll_queue: Optional[asyncio.Queue] = None,
+        scheduler: Optional[PollScheduler] = None
     ):
         self.website = website
         self.scraper = scraper
         self.interval = interval
         self.all_items = all_items
         self.stock_data = stock_data
+        self.poll_queue = poll_queue
+        self.scheduler = scheduler
 
-    async def run(self):
-        while True:
-            all_items = await self.poll()
+    async def poll_once(self) -> None:
+        """
+        Poll the website and publish the result. StockScheduler decides
+        when.
+        """
+        all_items = await self.poll()
+        # Unchanged pages give back the last poll's items, which have
+        # already been published
+        if all_items is not self.all_items.get(self.website):
             self.all_items[self.website] = all_items
+            await self.publish(all_items)
+        elif self.website in self.stock_data.unnotified:
+            # The last alert for this website failed to send, so diff it again
+            await self.publish(all_items)
+
+    async def warm_up(self) -> None:
+        """
+        Get a connection to the website ready for the next poll.
+        """
+        await self.scraper.warm_up()
+
+    def next_interval(self) -> float:
+        """
+        Get how long to wait before the next poll: the configured interval,
+        or the scheduler's pick around it.
+        """
+        if self.scheduler is None:
+            return self.interval
+
+        interval = self.scheduler.next_interval(self.website, self.interval)
+        if interval != self.interval:
+            logger.debug(f'Next {self.website.value} poll in {interval:.0f}s')
+        return interval
+
+    async def publish(self, all_items: Dict[str, ItemStock]) -> None:
+        """
+        Let the notifier know this website has a new poll result to diff.
+        Empty results (failed or blocked polls) carry no stock changes, so
+        they aren't published.
+        """
+        if self.poll_queue is None or not all_items:
+            return
 
-            await asyncio.sleep(self.interval)
+        await self.poll_queue.put(self.website)
 
     async def poll(self) -> Dict[Website, Dict]:
         """
         Poll the website for stock data at a specified interval.
         """
         logger.info(f'Start polling {self.website.value} for stock data')
+        site = self.website.name.lower()
+        start = time.perf_counter()
         try:
             all_items = await self.scraper.scrape()
             logger.info(f'Completed polling for {self.website.value}')
+            poll_items.set(len(all_items), site=site)
 
             return all_items
         except Exception as e:
             logger.error(f"Error while polling website: {e}")
-            return {}
\ No newline at end of file
+            return {}
+        finally:
+            poll_seconds.observe(time.perf_counter() - start, site=site)
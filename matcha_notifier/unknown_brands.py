@@ -0,0 +1,178 @@
+import aiofiles
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+from yaml import safe_load
+
+
+logger = logging.getLogger(__name__)
+
+with open('config.yaml') as f:
+    config = safe_load(f)
+
+class UnknownBrandRegistry:
+    """
+    Records makers that didn't match a Brand, for the whole process. The
+    file is read once and names are deduplicated in memory. Changes are
+    written in batches, at most once every UNKNOWN_BRANDS_FLUSH_INTERVAL
+    seconds: a change made sooner after the last write is written behind
+    once the interval is up. Outstanding changes are written on close().
+
+    Each line of the file is a name, when it was first and last seen and
+    how many times it was seen, separated by tabs. Lines holding only a
+    name are read too, and malformed lines are skipped.
+    """
+    def __init__(self, brands_file: str, flush_interval: float = 60):
+        self.brands_file = brands_file
+        self.flush_interval = flush_interval
+        self.entries: Dict[str, Dict] = {}
+        self._loaded = False
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def load(self) -> None:
+        """
+        Read the brands file into memory. Later calls are no-ops.
+        """
+        if self._loaded:
+            return
+
+        self._loaded = True
+        if not Path(self.brands_file).exists():
+            return
+
+        try:
+            async with aiofiles.open(self.brands_file, mode='r') as f:
+                content = await f.read()
+        except OSError as e:
+            logger.error(f'Failed to load unknown brands {self.brands_file}: {e}')
+            return
+
+        for line in content.splitlines():
+            fields = line.strip().split('\t')
+            if not fields[0]:
+                continue
+
+            entry = {'first_seen': None, 'last_seen': None, 'hits': 0}
+            if len(fields) == 4:
+                try:
+                    entry = {
+                        'first_seen': _parse_time(fields[1]),
+                        'last_seen': _parse_time(fields[2]),
+                        'hits': int(fields[3] or 0),
+                    }
+                except ValueError as e:
+                    logger.warning(f'Skipped malformed unknown brand line {line!r}: {e}')
+                    continue
+            self._merge(fields[0], entry)
+
+    def _merge(self, name: str, entry: Dict) -> None:
+        # Makers recorded while the file was being read are merged with it
+        current = self.entries.get(name)
+        if current is None:
+            self.entries[name] = entry
+            return
+
+        first_seen = [t for t in (current['first_seen'], entry['first_seen']) if t]
+        current['first_seen'] = min(first_seen, default=None)
+        last_seen = [t for t in (current['last_seen'], entry['last_seen']) if t]
+        current['last_seen'] = max(last_seen, default=None)
+        current['hits'] += entry['hits']
+
+    async def record(self, name: str) -> None:
+        """
+        Count a sighting of an unknown maker.
+        """
+        await self.load()
+        now = time.time()
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = {'first_seen': now, 'last_seen': now, 'hits': 0}
+            self.entries[name] = entry
+            logger.warning(f'Unknown brand logged: {name}')
+        elif entry['first_seen'] is None:
+            entry['first_seen'] = now
+
+        entry['last_seen'] = now
+        entry['hits'] += 1
+        self._dirty = True
+
+        since_flush = time.monotonic() - self._last_flush
+        if since_flush >= self.flush_interval:
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f'Failed to save unknown brands: {e}')
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(
+                self._flush_later(self.flush_interval - since_flush)
+            )
+
+    async def _flush_later(self, delay: float) -> None:
+        try:
+            await asyncio.sleep(delay)
+            await self.flush()
+        except asyncio.CancelledError:
+            raise
+        except OSError as e:
+            logger.error(f'Failed to save unknown brands: {e}')
+
+    async def flush(self) -> None:
+        """
+        Rewrite the brands file if there are unsaved changes.
+        """
+        self._last_flush = time.monotonic()
+        if not self._dirty:
+            return
+
+        self._dirty = False
+        lines = [
+            '\t'.join((
+                name,
+                _format_time(entry['first_seen']),
+                _format_time(entry['last_seen']),
+                str(entry['hits']),
+            ))
+            for name, entry in sorted(self.entries.items())
+        ]
+        temp_file = self.brands_file + '.tmp'
+        try:
+            async with aiofiles.open(temp_file, mode='w') as f:
+                await f.write(''.join(line + '\n' for line in lines))
+
+            os.replace(temp_file, self.brands_file)
+        except OSError:
+            self._dirty = True
+            raise
+
+    async def close(self) -> None:
+        """
+        Cancel any scheduled write and write outstanding changes now.
+        """
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+
+        self._flush_task = None
+        await self.flush()
+
+def _format_time(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return ''
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
+
+def _parse_time(value: str) -> Optional[float]:
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+unknown_brands = UnknownBrandRegistry(
+    config.get('UNKNOWN_BRANDS_FILE', 'unknown_brands.txt'),
+    flush_interval=config.get('UNKNOWN_BRANDS_FLUSH_INTERVAL', 60)
+)
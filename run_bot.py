@@ -8,10 +8,12 @@ from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
-intents = Intents.default()
-intents.members = True
-bot = MatchaBot(command_prefix='/', intents=intents)
+# Guarded so parse pool worker processes can import this module safely
+if __name__ == '__main__':
+    intents = Intents.default()
+    intents.members = True
+    bot = MatchaBot(command_prefix='/', intents=intents)
 
-load_dotenv()
-register_commands(bot)
-bot.run(os.getenv('DISCORD_BOT_TOKEN'))
+    load_dotenv()
+    register_commands(bot)
+    bot.run(os.getenv('DISCORD_BOT_TOKEN'))
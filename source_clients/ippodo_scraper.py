@@ -1,85 +1,105 @@
-import json
 import logging
-import quickjs
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup
-from matcha_notifier.enums import Brand, StockStatus
+from matcha_notifier.enums import Brand, StockStatus, Website
 from matcha_notifier.models import Item, ItemStock
-from matcha_notifier.base_scraper import BaseScraper
-from typing import Dict
+from matcha_notifier.base_scraper import NOT_MODIFIED
+from matcha_notifier.js_literal import extract_js_literal
+from matcha_notifier.shopify_scraper import ShopifyScraper
+from typing import Dict, List, Optional
 
 
 logger = logging.getLogger(__name__)
 
-class IppodoScraper(BaseScraper):
+class IppodoScraper(ShopifyScraper):
     def __init__(self, session: ClientSession):
         self.session = session
+        self.website = Website.IPPODO
         self.catalog_url = 'https://ippodotea.com/collections/matcha'
         self.product_url = 'https://ippodotea.com'
         super().__init__()
 
-    async def scrape(self):
-        text = await self.fetch_url(self.catalog_url, self.session)
+    async def scrape_html(self) -> Dict[str, ItemStock]:
+        text = await self.fetch_url(
+            self.catalog_url, self.session, conditional=True
+        )
+        if text is NOT_MODIFIED:
+            return self.page_items.get(self.catalog_url, {})
         if not text:
             return {}
 
         all_items = await self.parse_products(text)
+        self.store_page_items(self.catalog_url, all_items)
         return all_items
 
+    async def parse_product_json(self, product: Dict) -> Optional[ItemStock]:
+        name = product['title']
+        variants = product.get('variants', [])
+        if not self.is_matcha_powder(name) or not variants:
+            return None
+
+        # Items are keyed by SKU, as in the page's collection JSON
+        item_id = variants[0].get('sku') or str(product['id'])
+        stock_status = (
+            StockStatus.INSTOCK if self.is_available(product)
+            else StockStatus.OUT_OF_STOCK
+        )
+
+        item = Item(
+            id=item_id,
+            brand=Brand.IPPODO,
+            name=name,
+        )
+        return ItemStock(
+            item=item,
+            url=f"{self.product_url}/products/{product['handle']}",
+            as_of=self.get_as_of(),
+            stock_status=stock_status
+        )
+
     async def parse_products(self, text: str) -> Dict[str, ItemStock]:
-        soup = BeautifulSoup(text, 'html.parser')
-        script_tags = soup.find_all('script')
-        script_tag = next((s for s in script_tags
-                   if "collection_json" in s.get_text()), None)
-        
-        if not script_tag:
+        try:
+            records = await self.parse_in_pool(
+                parse_collection, text, self.product_url
+            )
+        except ValueError as e:
+            logger.error(f'Failed to decode collection JSON for Ippodo: {e}')
+            return {}
+
+        if records is None:
             logger.error('No collection JSON found in the page for Ippodo')
             return {}
 
-        products = self._extract_collection_json(script_tag.text)
         all_items = {}
-
-        for product in products:
-            item_id = product['sku']
-            name = product['title']
-            if not self.is_matcha_powder(name):
+        for record in records:
+            if not self.is_matcha_powder(record['name']):
                 continue
 
-            url = self.product_url + product['url']
-            stock_status = (
-                StockStatus.OUT_OF_STOCK if product['soldOut'] is True
-                else StockStatus.INSTOCK
-            )
-
-            item = Item(
-                id=item_id,
-                brand=Brand.IPPODO,
-                name=name,
-            )
-            all_items[item_id] = ItemStock(
-                item=item,
-                url=url,
-                as_of=self.get_as_of(),
-                stock_status=stock_status
-            )
+            all_items[record['id']] = self.to_item_stock(record, Brand.IPPODO)
 
         return all_items
-    
-    def _extract_collection_json(self, js_text: str) -> dict:
-        """
-        Ippodo hardcodes the collection JSON in JavaScript in a script tag.
-        Since Python does not have a built-in JavaScript interpreter,
-        we use the quickjs library to evaluate the JavaScript and extract the
-        JSON.
-        """
-        # Create a sandbox to run JavaScript
-        ctx = quickjs.Context()
-        ctx.eval(js_text)   # Execute the JavaScript code
 
-        # Now read the variable value; quickjs converts to Python types
-        result = ctx.eval("collection_json")
-        if not isinstance(result, dict):
-            # Sometimes the site wraps differently; as a fallback, try returning JSON string:
-            result = ctx.eval("JSON.stringify(collection_json)")
-            result = json.loads(result)
-        return result['product']
+def parse_collection(
+    backend: str, text: str, product_url: str
+) -> Optional[List[Dict[str, str]]]:
+    """
+    Parse the item records from the page's collection JSON, or return None
+    if it's missing. Runs in the parse pool.
+    """
+    # Ippodo hardcodes the collection JSON as a JavaScript literal in a
+    # script tag, so it's decoded straight from the page text
+    collection_json = extract_js_literal(text, 'collection_json')
+    if not collection_json:
+        return None
+
+    return [
+        {
+            'id': product['sku'],
+            'name': product['title'],
+            'url': product_url + product['url'],
+            'stock_status': (
+                StockStatus.OUT_OF_STOCK if product['soldOut'] is True
+                else StockStatus.INSTOCK
+            ).value,
+        }
+        for product in collection_json['product']
+    ]
@@ -1,59 +1,77 @@
 import ast
 import logging
-import re
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup
-from matcha_notifier.base_scraper import BaseScraper
-from matcha_notifier.enums import Brand, StockStatus
-from matcha_notifier.models import Item, ItemStock
-from typing import Dict
+from matcha_notifier.base_scraper import NOT_MODIFIED, BaseScraper
+from matcha_notifier.enums import Brand, StockStatus, Website
+from matcha_notifier.html_parser import ParseOnly, get_parser
+from matcha_notifier.models import ItemStock
+from typing import Dict, List
 
 
 logger = logging.getLogger(__name__)
 
 class MarukyuKoyamaenScraper(BaseScraper):
+    SELECTORS = {
+        'product': '.product.product-type-variable',
+        'link': 'a',
+    }
+    # Only the product cards are parsed from the catalog page (bs4 backends)
+    CATALOG_PARSE_ONLY = ParseOnly('li', {'class': 'product'})
+
     def __init__(self, session: ClientSession):
         self.session = session
+        self.website = Website.MARUKYU_KOYAMAEN
         self.catalog_url = 'https://www.marukyu-koyamaen.co.jp/english/shop/products/catalog/matcha'
         self.product_url = 'https://www.marukyu-koyamaen.co.jp/english/shop/products/'
         super().__init__()      # Must be called after setting catalog_url
 
     async def scrape(self) -> Dict[str, ItemStock]:
 
-        text = await self.fetch_url(self.catalog_url, self.session)
+        text = await self.fetch_url(
+            self.catalog_url, self.session, conditional=True
+        )
+        if text is NOT_MODIFIED:
+            return self.page_items.get(self.catalog_url, {})
         if not text:
             return {}
     
-        all_items = self.parse_products(text)
+        all_items = await self.parse_products(text)
+        self.store_page_items(self.catalog_url, all_items)
         return all_items
 
-    def parse_products(self, text: str) -> Dict[str, ItemStock]:
+    async def parse_products(self, text: str) -> Dict[str, ItemStock]:
         """
-        Parse product data from the HTML soup and return a dictionary of ItemStock.
+        Parse product data from the catalog page and return a dictionary of ItemStock.
         """
-        soup = BeautifulSoup(text, 'html.parser')
-        products = soup.find_all(class_=re.compile('product product-type-variable'))
+        records = await self.parse_in_pool(parse_catalog, text)
         all_items = {}      # Stores data on all matcha products
-        for product in products:
-            item_data = ast.literal_eval(product.a['data-item'])
-            item_id = item_data['item_id']
-            url = product.a['href']
-            if 'outofstock' in product['class']:
-                stock_status = StockStatus.OUT_OF_STOCK
-            else:
-                stock_status = StockStatus.INSTOCK
-
-            item = Item(
-                id=item_id,
-                brand=Brand.MARUKYU_KOYAMAEN,
-                name=item_data['item_name']
-            )
-
-            all_items[item_id] = ItemStock(
-                item=item,
-                url=url,
-                as_of=self.get_as_of(),
-                stock_status=stock_status
+        for record in records:
+            all_items[record['id']] = self.to_item_stock(
+                record, Brand.MARUKYU_KOYAMAEN
             )
         
         return all_items
+
+def parse_catalog(backend: str, text: str) -> List[Dict[str, str]]:
+    """
+    Parse the item records from the catalog page. Runs in the parse pool.
+    """
+    page = get_parser(backend, MarukyuKoyamaenScraper.SELECTORS).parse(
+        text, MarukyuKoyamaenScraper.CATALOG_PARSE_ONLY
+    )
+    records = []
+    for product in page.select('product'):
+        link = product.select_one('link')
+        item_data = ast.literal_eval(link.attr('data-item'))
+        if 'outofstock' in product.classes():
+            stock_status = StockStatus.OUT_OF_STOCK
+        else:
+            stock_status = StockStatus.INSTOCK
+
+        records.append({
+            'id': item_data['item_id'],
+            'name': item_data['item_name'],
+            'url': link.attr('href'),
+            'stock_status': stock_status.value,
+        })
+    return records
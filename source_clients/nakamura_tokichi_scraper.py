@@ -1,86 +1,143 @@
+import asyncio
 import logging
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup, element
-from matcha_notifier.base_scraper import BaseScraper
-from matcha_notifier.enums import Brand, StockStatus
+from matcha_notifier.base_scraper import NOT_MODIFIED
+from matcha_notifier.enums import Brand, StockStatus, Website
+from matcha_notifier.html_parser import HTMLNode, get_parser
 from matcha_notifier.models import Item, ItemStock
-from typing import Dict
+from matcha_notifier.shopify_scraper import ShopifyScraper
+from typing import Dict, List, Optional, Tuple
 
 
 logger = logging.getLogger(__name__)
 
-class NakamuraTokichiScraper(BaseScraper):
+class NakamuraTokichiScraper(ShopifyScraper):
+    SELECTORS = {
+        'product': '.card-wrapper',
+        'card_info': '.card__information',
+        'link': 'a',
+        'sold_out': '.price--sold-out',
+        'page_link': '.pagination__item[aria-label^="Page"]',
+    }
+
     def __init__(self, session: ClientSession):
         self.session = session
+        self.website = Website.NAKAMURA_TOKICHI
         self.catalog_url = 'https://global.tokichi.jp/collections/matcha'
         self.product_url = 'https://global.tokichi.jp'
+        self.total_pages = 1
         super().__init__()  # Must be called after setting catalog_url
 
-    async def scrape(self) -> Dict[str, ItemStock]:
-        text = await self.fetch_url(self.catalog_url, self.session)
+    async def scrape_html(self) -> Dict[str, ItemStock]:
+        text = await self.fetch_url(
+            self.catalog_url, self.session, conditional=True
+        )
         if not text:
             return {}
 
-        soup = BeautifulSoup(text, 'html.parser')
-        all_items = self.parse_products(text, soup)
-
-        # Handle pagination if necessary
-        total_pages = self.get_total_pages(text, soup)
-        for page in range(2, total_pages + 1):
-            page_url = f"{self.catalog_url}?page={page}"
-            text = await self.fetch_url(page_url, self.session)
-            if not text:
-                continue
+        if text is NOT_MODIFIED:
+            all_items = dict(self.page_items.get(self.catalog_url, {}))
+        else:
+            all_items, page_numbers = await self.parse_products(text)
+            self.store_page_items(self.catalog_url, dict(all_items))
+            self.total_pages = self.get_total_pages(page_numbers)
 
-            soup = BeautifulSoup(text, 'html.parser')
-            all_items.update(self.parse_products(text, soup))
+        # Handle pagination if necessary. The remaining pages are fetched
+        # concurrently and each is parsed as soon as it arrives, then merged
+        # in page order.
+        page_urls = [
+            f"{self.catalog_url}?page={page}"
+            for page in range(2, self.total_pages + 1)
+        ]
+        pages = await asyncio.gather(
+            *(self._scrape_page(page_url) for page_url in page_urls)
+        )
+        for page_items in pages:
+            all_items.update(page_items)
         return all_items
 
-    def parse_products(self, text: str, soup: BeautifulSoup) -> Dict[str, ItemStock]:
-        products = soup.select('.card-wrapper')
-        all_items = {}
-        
-        for product in products:
-            card_info = product.select('.card__information')
-            card_image = card_info[0]
-            item_id = self._extract_item_id(card_image)
-            url = self.product_url + card_image.a['href']
-            name = card_image.text.strip()
-            if not name:
-                continue
-
-            oos = product.select('.price--sold-out')
-            stock_status = StockStatus.OUT_OF_STOCK if oos else StockStatus.INSTOCK
-
-            item = Item(
-                id=item_id,
-                brand=Brand.NAKAMURA_TOKICHI,
-                name=name,
-            )
-            all_items[item_id] = ItemStock(
-                item=item,
-                url=url,
-                stock_status=stock_status,
-                as_of=self.get_as_of()
-            )
-        return all_items
-    
-    def _extract_item_id(self, card_image: element.Tag) -> str:
+    async def _scrape_page(self, page_url: str) -> Dict[str, ItemStock]:
+        text = await self.fetch_limited(page_url, self.session, conditional=True)
+        if text is NOT_MODIFIED:
+            return self.page_items.get(page_url, {})
+        if not text:
+            return {}
+
+        page_items, _ = await self.parse_products(text)
+        self.store_page_items(page_url, page_items)
+        return page_items
+
+    async def parse_product_json(self, product: Dict) -> Optional[ItemStock]:
+        name = product['title'].strip()
+        if not name:
+            return None
+
+        item_id = str(product['id'])
+        stock_status = (
+            StockStatus.INSTOCK if self.is_available(product)
+            else StockStatus.OUT_OF_STOCK
+        )
+
+        item = Item(
+            id=item_id,
+            brand=Brand.NAKAMURA_TOKICHI,
+            name=name,
+        )
+        return ItemStock(
+            item=item,
+            url=f"{self.product_url}/products/{product['handle']}",
+            stock_status=stock_status,
+            as_of=self.get_as_of()
+        )
+
+    async def parse_products(self, text: str) -> Tuple[Dict[str, ItemStock], List[int]]:
         """
-        Extract the item ID from the card image element
+        Parse a catalog page's items and the page numbers it links to.
         """
-        # item_id in format 'StandardCardNoMediaLink-template--19535516958972__product-grid-9001332932860'
-        item_id = card_image.a['id']
-        return item_id.split('-')[-1]
-        
-    def get_total_pages(self, text: str, soup: BeautifulSoup) -> int:
-        page_links = soup.select('.pagination__item[aria-label^="Page"]')
-        if not page_links:
-            return 1
-        
-        page_numbers = []
-        for link in page_links:
-            page_num = int(link.text.strip())
-            page_numbers.append(page_num)
+        records, page_numbers = await self.parse_in_pool(
+            parse_page, text, self.product_url
+        )
+        all_items = {
+            record['id']: self.to_item_stock(record, Brand.NAKAMURA_TOKICHI)
+            for record in records
+        }
+        return all_items, page_numbers
 
+    def get_total_pages(self, page_numbers: List[int]) -> int:
         return max(page_numbers) if page_numbers else 1
+
+def parse_page(
+    backend: str, text: str, product_url: str
+) -> Tuple[List[Dict[str, str]], List[int]]:
+    """
+    Parse the item records and pagination links from a catalog page. Runs
+    in the parse pool.
+    """
+    page = get_parser(backend, NakamuraTokichiScraper.SELECTORS).parse(text)
+    records = []
+    for product in page.select('product'):
+        card_info = product.select_one('card_info')
+        link = card_info.select_one('link')
+        name = card_info.text().strip()
+        if not name:
+            continue
+
+        oos = product.select_one('sold_out')
+        stock_status = StockStatus.OUT_OF_STOCK if oos else StockStatus.INSTOCK
+        records.append({
+            'id': _extract_item_id(link),
+            'name': name,
+            'url': product_url + link.attr('href'),
+            'stock_status': stock_status.value,
+        })
+
+    page_numbers = [int(link.text().strip()) for link in page.select('page_link')]
+    return records, page_numbers
+
+def _extract_item_id(link: HTMLNode) -> str:
+    """
+    Extract the item ID from the product card's link
+    """
+    # item_id in format 'StandardCardNoMediaLink-template--19535516958972__product-grid-9001332932860'
+    item_id = link.attr('id')
+    return item_id.split('-')[-1]
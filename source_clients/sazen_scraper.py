@@ -1,73 +1,166 @@
+import asyncio
 import logging
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup, element
-from matcha_notifier.base_scraper import BaseScraper
-from matcha_notifier.enums import Brand, StockStatus
-from matcha_notifier.models import Item, ItemStock
-from typing import Dict
+from matcha_notifier.base_scraper import NOT_MODIFIED, BaseScraper
+from matcha_notifier.enums import Brand, StockStatus, Website
+from matcha_notifier.html_parser import ParseOnly, get_parser
+from matcha_notifier.models import ItemStock
+from matcha_notifier.product_cache import ProductCache
+from typing import Dict, List, Optional, Tuple
+from yaml import safe_load
 
 
 logger = logging.getLogger(__name__)
 
+with open('config.yaml') as f:
+    config = safe_load(f)
+
 class SazenScraper(BaseScraper):
+    SELECTORS = {
+        # Ignore the bestsellers section
+        'product': '.product:not(.bestseller)',
+        'link': 'a',
+        'product_info': 'div#product-info',
+        'detail': 'p',
+        'detail_label': 'span',
+    }
+    # Only the product cards and the product pages' info panel are parsed by
+    # the BeautifulSoup backends; selectolax ignores these
+    CATALOG_PARSE_ONLY = ParseOnly('div', {'class': 'product'})
+    PRODUCT_PARSE_ONLY = ParseOnly('div', {'id': 'product-info'})
+
     def __init__(self, session: ClientSession):
         self.session = session
+        self.website = Website.SAZEN
         self.catalog_url = 'https://www.sazentea.com/en/products/c22-ceremonial-grade-matcha'
         self.product_url = 'https://www.sazentea.com'
+        self.product_cache = ProductCache(
+            config.get('SAZEN_PRODUCT_CACHE_FILE', 'sazen_product_cache.json')
+        )
         super().__init__()
 
     async def scrape(self) -> Dict[str, ItemStock]:
-        text = await self.fetch_url(self.catalog_url, self.session)
+        text = await self.fetch_url(
+            self.catalog_url, self.session, conditional=True
+        )
+        if text is NOT_MODIFIED:
+            return self.page_items.get(self.catalog_url, {})
         if not text:
             return {}
 
-        all_items = await self.parse_products(text)
+        all_items, is_complete = await self.parse_products(text)
+        if is_complete:
+            self.store_page_items(self.catalog_url, all_items)
+        else:
+            # Some product pages failed, so don't let the next poll find
+            # the catalog unchanged and skip them
+            self.pending_fetches.pop(self.catalog_url, None)
         return all_items
 
-    async def parse_products(self, text: str) -> Dict[str, ItemStock]:
-        soup = BeautifulSoup(text, 'html.parser')
-        products = soup.find_all(class_='product')
+    async def parse_products(self, text: str) -> Tuple[Dict[str, ItemStock], bool]:
+        """
+        Parse the catalog's products, fetching the details of products that
+        aren't cached. Also returns whether every product's details were
+        found.
+        """
+        products = await self.parse_in_pool(parse_catalog, text, self.product_url)
+        await self.product_cache.load()
+        is_complete = await self._cache_product_details(products)
         all_items = {}
 
         for product in products:
-            # Ignore the bestsellers section
-            if 'bestseller' in product['class']:
+            details = self.product_cache.get(product['url'])
+            if details is None:     # Product page couldn't be parsed
                 continue
 
-            name = product['data-name']
-            url = self.product_url + product.a['href']
-            stock_status = StockStatus.INSTOCK
+            record = {
+                'id': details['item_id'],
+                'name': product['name'],
+                'url': product['url'],
+                'stock_status': StockStatus.INSTOCK.value,
+            }
+            all_items[record['id']] = self.to_item_stock(
+                record, Brand(details['brand'])
+            )
+
+        await self.product_cache.save()
+        return all_items, is_complete
+
+    async def _cache_product_details(self, products: List[Dict[str, str]]) -> bool:
+        """
+        Fetch the product pages that aren't cached yet and cache their item
+        ID and brand, which don't change for a product. Returns False if
+        any product page couldn't be fetched or parsed.
+        """
+        uncached = [
+            product for product in products
+            if self.product_cache.get(product['url']) is None
+        ]
+        product_pages = await self.fetch_all(
+            [product['url'] for product in uncached], self.session
+        )
+        # Product pages are parsed in parallel when the parse pool has
+        # several workers
+        page_details = await asyncio.gather(*(
+            self.parse_in_pool(parse_product_page, product_page)
+            for product_page in product_pages
+        ))
 
-            product_page = await self.fetch_url(url, self.session)
-            product_soup = BeautifulSoup(product_page, 'html.parser')
-            product_info = product_soup.select_one('div#product-info')
-            if not product_info:
+        is_complete = True
+        for product, details in zip(uncached, page_details):
+            name, url = product['name'], product['url']
+            if details is None:
                 logger.error(f'Product info not found for {name} at {url}')
+                is_complete = False
+                continue
+
+            if 'Item code' not in details or 'Maker' not in details:
+                logger.error(f'Item code or maker not found for {name} at {url}')
+                is_complete = False
                 continue
 
-            item_id = self._parse_item_id(product_info)
-            brand = await self._parse_brand(product_info)
+            brand = await self.match_to_brand(details['Maker'])
+            self.product_cache.set(url, {
+                'item_id': details['Item code'],
+                'brand': brand.value,
+            })
+        return is_complete
 
-            item = Item(
-                id=item_id,
-                brand=brand,
-                name=name,
-            )
-            all_items[item_id] = ItemStock(
-                item=item,
-                url=url,
-                as_of=self.get_as_of(),
-                stock_status=stock_status
-            )
+def parse_catalog(backend: str, text: str, product_url: str) -> List[Dict[str, str]]:
+    """
+    Parse the name and URL of each product on the catalog page. Runs in the
+    parse pool.
+    """
+    page = get_parser(backend, SazenScraper.SELECTORS).parse(
+        text, SazenScraper.CATALOG_PARSE_ONLY
+    )
+    return [
+        {
+            'name': product.attr('data-name'),
+            'url': product_url + product.select_one('link').attr('href'),
+        }
+        for product in page.select('product')
+    ]
 
-        return all_items
-    
-    def _parse_item_id(self, product_info: element.Tag) -> str:
-        item_code_tag = product_info.find('span', string='Item code:')
-        item_id = item_code_tag.next_sibling.strip()
-        return item_id
-    
-    async def _parse_brand(self, product_info: element.Tag) -> Brand:
-        brand_tag = product_info.find('span', string='Maker:')
-        brand = await self.match_to_brand(brand_tag.next_sibling.strip())
-        return brand
\ No newline at end of file
+def parse_product_page(backend: str, text: str) -> Optional[Dict[str, str]]:
+    """
+    Parse the labelled details in a product page's info, such as
+    'Item code: CMC007', into a dictionary of label to value. Returns None
+    if the page has no product info. Runs in the parse pool.
+    """
+    product_info = get_parser(backend, SazenScraper.SELECTORS).parse(
+        text, SazenScraper.PRODUCT_PARSE_ONLY
+    ).select_one('product_info')
+    if product_info is None:
+        return None
+
+    details = {}
+    for detail in product_info.select('detail'):
+        label = detail.select_one('detail_label')
+        if label is None:
+            continue
+
+        label_text = label.text().strip()
+        value = detail.text().strip()[len(label_text):].strip()
+        details[label_text.rstrip(':')] = value
+    return details
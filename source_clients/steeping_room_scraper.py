@@ -1,81 +1,91 @@
 import logging
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup, element
-from matcha_notifier.base_scraper import BaseScraper
-from matcha_notifier.enums import Brand, StockStatus
+from matcha_notifier.base_scraper import NOT_MODIFIED
+from matcha_notifier.enums import Brand, StockStatus, Website
+from matcha_notifier.html_parser import HTMLNode, ParseOnly, get_parser
 from matcha_notifier.models import Item, ItemStock
-from typing import Dict, Tuple
+from matcha_notifier.shopify_scraper import ShopifyScraper
+from typing import Dict, List, Optional, Tuple
 
 
 logger = logging.getLogger(__name__)
 
-class SteepingRoomScraper(BaseScraper):
+class SteepingRoomScraper(ShopifyScraper):
+    SELECTORS = {
+        'product': '.thumbnail',
+        # In format of 'product-9092534599903'
+        'product_id': 'div:has(> div.product-wrap)',
+        'link': '.product_image a',
+        'sold_out': '.product-info__caption .sold_out',
+    }
+    # With the BeautifulSoup backends, only the product grid cards are
+    # parsed from the catalog page
+    CATALOG_PARSE_ONLY = ParseOnly('div', {'class': 'thumbnail'})
+
     def __init__(self, session: ClientSession):
         self.session = session
+        self.website = Website.STEEPING_ROOM
         self.catalog_url = 'https://www.thesteepingroom.com/collections/matcha-tea'
         self.product_url = 'https://www.thesteepingroom.com/'
         super().__init__()      # Must be called after setting catalog_url
         
-    async def scrape(self) -> Dict[str, ItemStock]:
-        text = await self.fetch_url(self.catalog_url, self.session)
+    async def scrape_html(self) -> Dict[str, ItemStock]:
+        text = await self.fetch_url(
+            self.catalog_url, self.session, conditional=True
+        )
+        if text is NOT_MODIFIED:
+            return self.page_items.get(self.catalog_url, {})
         if not text:
             return {}
 
         all_items = await self.parse_products(text)
+        self.store_page_items(self.catalog_url, all_items)
         return all_items
     
-    async def parse_products(self, text: str) -> Dict[str, ItemStock]:
-        soup = BeautifulSoup(text, 'html.parser')
-        products = soup.find_all(
-            lambda tag: (
-                any(cls.startswith('product-') for cls in tag.get('class', []))
-                and tag.find('div', class_='product-wrap', recursive=False) is not None
-            )
+    async def parse_product_json(self, product: Dict) -> Optional[ItemStock]:
+        # Same URL as the collection page's '/products/{item}' hrefs
+        url = self.product_url + f"/products/{product['handle']}"
+        name, brand = await self.name_brand_parser(url)
+        # name and brand are empty strings if it isn't matcha powder
+        if name == '' and brand == '':
+            return None
+
+        item_id = str(product['id'])
+        stock_status = (
+            StockStatus.INSTOCK if self.is_available(product)
+            else StockStatus.OUT_OF_STOCK
+        )
+
+        item = Item(
+            id=item_id,
+            brand=brand,
+            name=name
         )
+        return ItemStock(
+            item=item,
+            url=url,
+            as_of=self.get_as_of(),
+            stock_status=stock_status
+        )
+
+    async def parse_products(self, text: str) -> Dict[str, ItemStock]:
+        records = await self.parse_in_pool(parse_catalog, text, self.product_url)
         all_items = {}
-        for product in products:
-            item_id = self._extract_item_id(product)
-            item_data = product.find('div', class_='relative product_image')
-            # href in format of '/products/{item}'
-            url = self.product_url + item_data.a['href']
-            name, brand = await self.name_brand_parser(url)
+        for record in records:
+            name, brand = await self.name_brand_parser(record['url'])
             # name and brand are empty strings if it isn't matcha powder
             if name == '' and brand == '':
                 continue
-            
-            stock_data = product.next_sibling.next_sibling.find(class_='sold_out')
-        
-            if not stock_data:
-                logger.warning(f'No stock data found for item {item_id}: {url}')
+
+            if record['stock_status'] is None:
+                logger.warning(f'No stock data found for item {record["id"]}: {record["url"]}')
                 continue
-        
-            if stock_data and stock_data.text.strip().lower() == 'sold out':
-                stock_status = StockStatus.OUT_OF_STOCK
-            else:
-                stock_status = StockStatus.INSTOCK
-
-            item = Item(
-                id=item_id,
-                brand=brand,
-                name=name
-            )
-            
-            all_items[item_id] = ItemStock(
-                item=item,
-                url=url,
-                as_of=self.get_as_of(),
-                stock_status=stock_status
+
+            all_items[record['id']] = self.to_item_stock(
+                {**record, 'name': name}, brand
             )
         
         return all_items
-    
-    def _extract_item_id(self, product: element.Tag) -> str:
-        """
-        Parses out item ID
-        """
-        # item id in format of 'product-9092534599903'
-        item_id_offset = len('product-')
-        return product['class'][0][item_id_offset:]
 
     async def name_brand_parser(self, url: str) -> Tuple[str, str]:
         """
@@ -107,3 +117,38 @@ class SteepingRoomScraper(BaseScraper):
             brand = Brand.UNKNOWN
 
         return name, brand
+
+def parse_catalog(backend: str, text: str, product_url: str) -> List[Dict[str, str]]:
+    """
+    Parse the ID, URL and stock status of each product on the catalog page.
+    The stock status is None if the product has no stock label. Runs in the
+    parse pool.
+    """
+    page = get_parser(backend, SteepingRoomScraper.SELECTORS).parse(
+        text, SteepingRoomScraper.CATALOG_PARSE_ONLY
+    )
+    records = []
+    for product in page.select('product'):
+        stock_data = product.select_one('sold_out')
+        if stock_data is None:
+            stock_status = None
+        elif stock_data.text().strip().lower() == 'sold out':
+            stock_status = StockStatus.OUT_OF_STOCK.value
+        else:
+            stock_status = StockStatus.INSTOCK.value
+
+        records.append({
+            'id': _extract_item_id(product),
+            # href in format of '/products/{item}'
+            'url': product_url + product.select_one('link').attr('href'),
+            'stock_status': stock_status,
+        })
+    return records
+
+def _extract_item_id(product: HTMLNode) -> str:
+    """
+    Parses out item ID
+    """
+    # item id in format of 'product-9092534599903'
+    item_id_offset = len('product-')
+    return product.select_one('product_id').classes()[0][item_id_offset:]
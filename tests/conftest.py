@@ -1,8 +1,20 @@
 import logging
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from contextlib import asynccontextmanager
+from matcha_notifier import metrics
+from matcha_notifier.circuit_breaker import circuit_breakers
+from matcha_notifier.loop_monitor import loop_monitor
+from matcha_notifier.parse_pool import parse_pool
+from matcha_notifier.product_cache import ProductCache
+from matcha_notifier.rate_limiter import rate_limiter
+from matcha_notifier.state_store import JsonStateStore
 from matcha_notifier.stock_data import StockData
+from matcha_notifier.unknown_brands import unknown_brands
 from pathlib import Path
 from tests.constants import TEST_STATE_FILE
+from typing import Dict
 
 
 @pytest.hookimpl(tryfirst=True)
@@ -35,12 +47,74 @@ def mock_stock_data_init(monkeypatch):
     This allows tests to run without affecting the actual state file.
     """
     original_init = StockData.__init__
-    def mock_init(self):
-        original_init(self)
-        self.state_file = TEST_STATE_FILE
+    def mock_init(self, store=None):
+        original_init(self, store or JsonStateStore(TEST_STATE_FILE))
 
     monkeypatch.setattr('matcha_notifier.stock_data.StockData.__init__', mock_init)
 
+@pytest.fixture(autouse=True)
+def mock_product_cache_init(monkeypatch, tmp_path):
+    """
+    Mocks the ProductCache class's __init__ method to keep cache files in a
+    temporary directory, so cached product details don't leak across tests.
+    """
+    original_init = ProductCache.__init__
+    def mock_init(self, cache_file):
+        original_init(self, str(tmp_path / Path(cache_file).name))
+
+    monkeypatch.setattr('matcha_notifier.product_cache.ProductCache.__init__', mock_init)
+
+@pytest.fixture(autouse=True)
+def inline_parse_pool(monkeypatch):
+    """
+    Parses pages inline instead of in worker processes, so tests that start
+    run() don't spawn processes.
+    """
+    monkeypatch.setattr(parse_pool, 'kind', 'inline')
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    """
+    Turns off per-host rate limiting, which would sleep between fetches of
+    fixture pages and never refill under freezegun.
+    """
+    monkeypatch.setattr(rate_limiter, 'enabled', False)
+
+@pytest.fixture(autouse=True)
+def no_metrics_server(monkeypatch):
+    """
+    Keeps run() from serving metrics on a real port.
+    """
+    monkeypatch.setitem(metrics.config, 'METRICS_ENABLED', False)
+
+@pytest.fixture(autouse=True)
+def no_loop_monitor(monkeypatch):
+    """
+    Keeps run() from starting the loop lag monitor, whose sleeps would be
+    counted by tests that mock asyncio.sleep.
+    """
+    monkeypatch.setattr(loop_monitor, 'enabled', False)
+
+@pytest.fixture(autouse=True)
+def fresh_circuit_breakers(monkeypatch):
+    """
+    Gives each test closed circuits, so failed fetches in one test don't
+    block requests in another.
+    """
+    monkeypatch.setattr(circuit_breakers, 'breakers', {})
+
+@pytest.fixture(autouse=True)
+def fresh_unknown_brands(monkeypatch, tmp_path):
+    """
+    Gives each test an empty unknown brand registry saved in a temporary
+    directory.
+    """
+    monkeypatch.setattr(unknown_brands, 'brands_file', str(tmp_path / 'unknown_brands.txt'))
+    monkeypatch.setattr(unknown_brands, 'entries', {})
+    monkeypatch.setattr(unknown_brands, '_loaded', False)
+    monkeypatch.setattr(unknown_brands, '_dirty', False)
+    monkeypatch.setattr(unknown_brands, '_flush_task', None)
+
 @pytest.fixture
 def mock_response():
     """
@@ -51,6 +125,7 @@ def mock_response():
             self.content = content
             self.status = status
             self.history = history
+            self.headers = {}
             self.raise_for_status = lambda: None
 
         async def __aenter__(self):
@@ -59,6 +134,9 @@ def mock_response():
         async def __aexit__(self, exc_type, exc, tb):
             pass
 
+        async def read(self):
+            return self.content.encode()
+
         async def text(self):
             return self.content
 
@@ -82,4 +160,37 @@ def mock_session():
         def get(self, *args, **kwargs):
             pass
 
-    return MockSession
\ No newline at end of file
+    return MockSession
+
+@pytest.fixture
+def stand_in_server():
+    """
+    Serves fixture files from a local aiohttp server in place of a store.
+    Routes map a path, optionally with its query string, to a file in
+    tests/fixtures; anything else is a 404.
+    """
+    @asynccontextmanager
+    async def serve(routes: Dict[str, str]):
+        async def handler(request: web.Request) -> web.Response:
+            fixture = routes.get(request.path_qs) or routes.get(request.path)
+            if fixture is None:
+                raise web.HTTPNotFound()
+
+            content_type = (
+                'application/json' if fixture.endswith('.json') else 'text/html'
+            )
+            return web.Response(
+                text=Path('tests/fixtures', fixture).read_text(),
+                content_type=content_type
+            )
+
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            yield server
+        finally:
+            await server.close()
+
+    return serve
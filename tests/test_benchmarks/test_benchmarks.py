@@ -0,0 +1,47 @@
+import pytest
+from benchmarks.bench_stock import make_states
+from benchmarks.harness import compare, load_results, measure, save_results
+from matcha_notifier.stock_data import StockData
+
+
+@pytest.mark.asyncio
+async def test_measure():
+    runs = []
+    async def run(value):
+        runs.append(value)
+        return [0] * 10_000
+
+    result = await measure(run, setup=lambda: len(runs), repeat=3)
+
+    # A warm-up run, the timed runs and the memory run
+    assert runs == [0, 1, 2, 3, 4]
+    assert result['repeat'] == 3
+    assert 0 <= result['min_ms'] <= result['median_ms'] <= result['max_ms']
+    assert result['peak_kib'] >= 10_000 * 8 / 1024
+
+def test_make_states():
+    state, polled = make_states(1_000)
+    events = StockData().diff(polled, state)
+
+    assert sum(len(items) for items in state.values()) == 990
+    assert sum(len(items) for items in polled.values()) == 990
+    # 10 new and 100 changed; gone items aren't reported by the diff
+    assert len(events) == 110
+
+def test_compare(tmp_path):
+    baseline = {
+        'fast': {'median_ms': 10.0, 'peak_kib': 100.0},
+        'noisy': {'median_ms': 0.001, 'peak_kib': 1.0},
+        'removed': {'median_ms': 1.0, 'peak_kib': 1.0},
+    }
+    results = {
+        'fast': {'median_ms': 13.0, 'peak_kib': 110.0},
+        'noisy': {'median_ms': 0.01, 'peak_kib': 2.0},
+        'added': {'median_ms': 1.0, 'peak_kib': 1.0},
+    }
+    save_results(baseline, str(tmp_path / 'baseline.json'))
+
+    regressions = compare(load_results(str(tmp_path / 'baseline.json')), results, 1.2)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith('fast: median_ms 10.00 -> 13.00')
@@ -39,12 +39,20 @@ async def test_bot_run_success(
             raise StopLoop
         
     monkeypatch.setattr('matcha_notifier.run.asyncio.sleep', mock_sleep)
-    monkeypatch.setattr('matcha_notifier.run.asyncio.Event.wait', AsyncMock())
+    event_wait = asyncio.Event.wait
+    # run() stops its polls once Event.wait returns, so it waits for them
+    # to be broken out of using mock_sleep instead
+    async def wait_for_polls(self):
+        await asyncio.wait([
+            t for t in asyncio.all_tasks()
+            if t.get_coro().__qualname__ == 'StockScheduler._run_task'
+        ])
+    monkeypatch.setattr('matcha_notifier.run.asyncio.Event.wait', wait_for_polls)
 
     mock_bot.get_all_channels = Mock(return_value=[])
     mock_response.content = mk_request
     mock_session.get = lambda *args, **kwargs: mock_response
-    monkeypatch.setattr('matcha_notifier.run.ClientSession', mock_session)
+    monkeypatch.setattr('matcha_notifier.run.create_session', mock_session)
     mock_notify_all_new_restocks = AsyncMock(return_value=True)
     monkeypatch.setattr(
         'matcha_notifier.run.RestockNotifier.notify_all_new_restocks',
@@ -59,18 +67,30 @@ async def test_bot_run_success(
     mock_discord_get.return_value = mock_channel
     monkeypatch.setattr('matcha_notifier.run.discord_get', mock_discord_get)
 
-    try:
-        await mock_bot.on_ready()
-        await asyncio.wait_for(mock_bot._run_task, timeout=4)
+    # Keep a handle on the poll queue to wait for published polls
+    poll_queues = []
+    class PollQueue(asyncio.Queue):
+        def __init__(self):
+            super().__init__()
+            poll_queues.append(self)
 
-        # Give any remaining tasks a chance to run (like send_alerts)
-        pending = [t for t in asyncio.all_tasks() if not t.done()]
-        for t in pending:
-            if t.get_coro().__name__ == 'send_alerts':
-                await asyncio.wait_for(t, timeout=1)
+    monkeypatch.setattr('matcha_notifier.run.asyncio.Queue', PollQueue)
 
-    except StopLoop:
-        pass
+    await mock_bot.on_ready()
+    await asyncio.wait_for(mock_bot._run_task, timeout=4)
+
+    # Give send_alerts a chance to handle every poll it published. Queue.join
+    # waits on an Event, so restore Event.wait first.
+    monkeypatch.setattr('matcha_notifier.run.asyncio.Event.wait', event_wait)
+    await poll_queues[0].join()
+
+    # send_alerts waits on the queue forever, so stop it with the test
+    for task in asyncio.all_tasks():
+        if task.get_coro().__qualname__ == 'RestockNotifier.send_alerts':
+            task.cancel()
+
+    # State is written behind, so write it out before reading the file
+    await mock_bot.stock_data.flush()
 
     test_state = 'test_state.json'
     if Path(test_state).exists():
@@ -1,5 +1,6 @@
 import bot.commands as commands
 import pytest
+from matcha_notifier.loop_monitor import LoopStall
 from matcha_notifier.enums import Website
 from matcha_notifier.stock_data import StockData
 from source_clients.marukyu_koyamaen_scraper import MarukyuKoyamaenScraper
@@ -19,7 +20,7 @@ async def test_commands_register():
     bot = Mock()
     commands.register_commands(bot)
     # Test how many times bot.slash command was called
-    assert bot.slash_command.call_count == 5
+    assert bot.slash_command.call_count == 6
     # Check if the command functions are registered
     funcs = bot.slash_command.call_args_list
     assert funcs[0][1]['name'] == 'subscribe-website'
@@ -27,6 +28,7 @@ async def test_commands_register():
     assert funcs[2][1]['name'] == 'subscribe-blend'
     assert funcs[3][1]['name'] == 'get-website-instock-items'
     assert funcs[4][1]['name'] == 'get-all-instock-items'
+    assert funcs[5][1]['name'] == 'loop-lag'
 
 @pytest.mark.asyncio
 async def test_get_website_instock_items(monkeypatch, mk_request):
@@ -37,11 +39,11 @@ async def test_get_website_instock_items(monkeypatch, mk_request):
     ctx.channel = AsyncMock()
     ctx.channel.send = AsyncMock()
     scraper = MarukyuKoyamaenScraper(session=AsyncMock())
-    all_items = {Website.MARUKYU_KOYAMAEN: scraper.parse_products(mk_request)}
+    all_items = {Website.MARUKYU_KOYAMAEN: await scraper.parse_products(mk_request)}
     sd = StockData()
     _, new_state = sd.get_stock_changes(all_items, {})
-    sd.load_state = AsyncMock(return_value=new_state)
-    monkeypatch.setattr('bot.commands.StockData', lambda: sd)
+    sd.state = new_state
+    ctx.bot.stock_data = sd
     
     await commands.get_website_instock_items(ctx, website='Marukyu Koyamaen')
     
@@ -50,3 +52,35 @@ async def test_get_website_instock_items(monkeypatch, mk_request):
     assert 'Marukyu Koyamaen Hojicha Mix' in embed.description
     assert 'Marukyu Koyamaen Matcha Mix' in embed.description
     assert ctx.channel.send.call_count == 1
+
+@pytest.mark.asyncio
+async def test_get_loop_lag(monkeypatch):
+    monkeypatch.setenv('DISCORD_OWNER_ID', '42')
+    monitor = commands.loop_monitor
+    monkeypatch.setattr(monitor, 'samples', type(monitor.samples)([0.001, 0.002, 0.4]))
+    monkeypatch.setattr(monitor, 'stalls', type(monitor.stalls)([
+        LoopStall(1749722400.0, 0.4, 'poll (StockTask.poll)', '  File "x.py", line 1, in parse\n    parse()\n')
+    ]))
+    ctx = AsyncMock()
+    ctx.author.id = 42
+
+    await commands.get_loop_lag(ctx)
+
+    text = ctx.respond.call_args[0][0]
+    assert 'median 2.0ms' in text
+    assert 'max 400.0ms' in text
+    assert '2025-06-12 10:00:00 UTC, 400ms in poll (StockTask.poll)' in text
+    assert 'in parse' in text
+    assert ctx.respond.call_args[1]['ephemeral'] is True
+
+@pytest.mark.asyncio
+async def test_get_loop_lag_owner_only(monkeypatch):
+    monkeypatch.setenv('DISCORD_OWNER_ID', '42')
+    ctx = AsyncMock()
+    ctx.author.id = 7
+
+    await commands.get_loop_lag(ctx)
+
+    ctx.respond.assert_awaited_once_with(
+        'Only the bot owner can use this command.', ephemeral=True
+    )
@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+from aiohttp import ClientResponseError, ClientSession, web
+from aiohttp.test_utils import TestServer
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from matcha_notifier import base_scraper
+from matcha_notifier.base_scraper import parse_retry_after
+from matcha_notifier.circuit_breaker import circuit_breakers
+from matcha_notifier.enums import CircuitState
+from source_clients.marukyu_koyamaen_scraper import MarukyuKoyamaenScraper
+from typing import List
+from unittest.mock import Mock
+from urllib.parse import urlsplit
+
+
+@asynccontextmanager
+async def serve(responses: List[web.Response]):
+    """
+    Serves the responses in order, one per request.
+    """
+    requests = []
+    async def handler(request: web.Request) -> web.Response:
+        requests.append(request.path)
+        return responses[len(requests) - 1]
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield server, requests
+    finally:
+        await server.close()
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setitem(base_scraper.config, 'FETCH_RETRIES', 2)
+    monkeypatch.setitem(base_scraper.config, 'RETRY_BACKOFF_BASE', 0.01)
+
+@pytest.mark.asyncio
+async def test_fetch_url_retries_transient_errors(fast_retries):
+    responses = [
+        web.Response(status=503),
+        web.Response(status=429, headers={'Retry-After': '0'}),
+        web.Response(text='ok'),
+    ]
+    async with serve(responses) as (server, requests), ClientSession() as session:
+        scraper = MarukyuKoyamaenScraper(session)
+        text = await scraper.fetch_url(str(server.make_url('/page')), session)
+
+    assert text == 'ok'
+    assert len(requests) == 3
+
+@pytest.mark.asyncio
+async def test_fetch_url_gives_up_after_retries(fast_retries):
+    responses = [web.Response(status=502) for _ in range(3)]
+    async with serve(responses) as (server, requests), ClientSession() as session:
+        url = str(server.make_url('/page'))
+        scraper = MarukyuKoyamaenScraper(session)
+        text = await scraper.fetch_url(url, session)
+
+    assert text == ''
+    assert len(requests) == 3
+    assert circuit_breakers.breaker(urlsplit(url).netloc).failures == 1
+
+@pytest.mark.asyncio
+async def test_fetch_url_does_not_retry_client_errors(fast_retries):
+    async with serve([web.Response(status=404)]) as (server, requests), \
+            ClientSession() as session:
+        url = str(server.make_url('/page'))
+        scraper = MarukyuKoyamaenScraper(session)
+        text = await scraper.fetch_url(url, session)
+
+    assert text == ''
+    assert len(requests) == 1
+    # The host is up, so its circuit stays closed
+    assert circuit_breakers.breaker(urlsplit(url).netloc).failures == 0
+
+@pytest.mark.asyncio
+async def test_fetch_url_skips_hosts_with_open_circuits(monkeypatch):
+    monkeypatch.setitem(base_scraper.config, 'FETCH_RETRIES', 0)
+    async with serve([web.Response(status=500)]) as (server, requests), \
+            ClientSession() as session:
+        url = str(server.make_url('/page'))
+        breaker = circuit_breakers.breaker(urlsplit(url).netloc)
+        breaker.failure_threshold = 1
+        scraper = MarukyuKoyamaenScraper(session)
+
+        assert await scraper.fetch_url(url, session) == ''
+        assert breaker.state == CircuitState.OPEN
+        assert await scraper.fetch_json(url, session) is None
+
+    assert len(requests) == 1
+
+def test_retry_delay_backs_off_with_jitter(monkeypatch):
+    monkeypatch.setitem(base_scraper.config, 'FETCH_RETRIES', 5)
+    monkeypatch.setitem(base_scraper.config, 'RETRY_BACKOFF_BASE', 1)
+    monkeypatch.setitem(base_scraper.config, 'RETRY_MAX_DELAY', 30)
+    scraper = MarukyuKoyamaenScraper(Mock())
+    error = ClientResponseError(Mock(), (), status=503)
+
+    for attempt, backoff in enumerate([1, 2, 4, 8, 16]):
+        assert backoff / 2 <= scraper.retry_delay(error, attempt) <= backoff
+    assert scraper.retry_delay(error, 5) is None
+    assert scraper.retry_delay(ClientResponseError(Mock(), (), status=403), 0) is None
+
+def test_retry_delay_honours_retry_after(monkeypatch):
+    monkeypatch.setitem(base_scraper.config, 'RETRY_MAX_DELAY', 30)
+    scraper = MarukyuKoyamaenScraper(Mock())
+    def rate_limited(retry_after: str) -> ClientResponseError:
+        return ClientResponseError(
+            Mock(), (), status=429, headers={'Retry-After': retry_after}
+        )
+
+    assert scraper.retry_delay(rate_limited('12'), 0) == 12
+    # Too long to wait within one poll
+    assert scraper.retry_delay(rate_limited('120'), 0) is None
+
+def test_parse_retry_after():
+    assert parse_retry_after('5') == 5
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+
+    when = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 85 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 90
+    assert parse_retry_after('Mon, 01 Jan 2024 00:00:00 GMT') == 0
+
+@pytest.mark.asyncio
+async def test_fetch_url_propagates_cancellation():
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(10)
+        return web.Response(text='late')
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        async with ClientSession() as session:
+            scraper = MarukyuKoyamaenScraper(session)
+            for fetch in (scraper.fetch_url, scraper.fetch_json):
+                task = asyncio.create_task(
+                    fetch(str(server.make_url('/page')), session)
+                )
+                await asyncio.sleep(0.1)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+    finally:
+        await server.close()
+
+@pytest.mark.asyncio
+async def test_fetch_url_releases_probe_after_redirect_loop():
+    responses = [
+        web.Response(status=302, headers={'Location': '/page'})
+        for _ in range(20)
+    ]
+    async with serve(responses) as (server, requests), ClientSession() as session:
+        url = str(server.make_url('/page'))
+        breaker = circuit_breakers.breaker(urlsplit(url).netloc)
+        breaker.failure_threshold = 1
+        breaker.reset_timeout = 0
+        breaker.record_failure()
+        scraper = MarukyuKoyamaenScraper(session)
+
+        assert await scraper.fetch_url(url, session) == ''
+
+    # The probe neither succeeded nor failed, so another may be sent
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow()
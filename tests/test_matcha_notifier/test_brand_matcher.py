@@ -0,0 +1,39 @@
+import pytest
+from matcha_notifier.brand_matcher import BrandMatcher
+from matcha_notifier.enums import Brand
+
+
+@pytest.fixture
+def matcher():
+    return BrandMatcher(aliases={'Yamamasa': 'Yamamasa Koyamaen'})
+
+@pytest.mark.parametrize('maker, expected', [
+    ('Hekisuien', Brand.HEKISUIEN),
+    ('Marukyu Koyamaen Co., Ltd.', Brand.MARUKYU_KOYAMAEN),
+    ('by MARUKYU-KOYAMAEN', Brand.MARUKYU_KOYAMAEN),
+    ('Ippodo Tea Co.', Brand.IPPODO),
+    ('Yamamasa', Brand.YAMAMASA_KOYAMAEN),
+    ('Yamamasa Koyamaen', Brand.YAMAMASA_KOYAMAEN),
+    ('Master Tea Farmer Tsuji Kiyoharu', None),
+    ('', None),
+])
+def test_brand_matcher(matcher, maker, expected):
+    assert matcher.match(maker) == expected
+
+def test_brand_matcher_prefers_longest_match():
+    # 'Koyamaen' alone would also match the later, longer name
+    matcher = BrandMatcher(aliases={'Koyamaen': 'Marukyu Koyamaen'})
+
+    assert matcher.match('Koyamaen, a.k.a. Yamamasa Koyamaen') == Brand.YAMAMASA_KOYAMAEN
+
+def test_brand_matcher_memoizes(matcher):
+    matcher.match('Hokoen')
+    matcher.match('Hokoen')
+
+    info = matcher.match.cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+
+def test_brand_matcher_unknown_alias():
+    with pytest.raises(ValueError):
+        BrandMatcher(aliases={'Foo': 'Not A Brand'})
@@ -0,0 +1,73 @@
+from matcha_notifier.circuit_breaker import CircuitBreaker, HostCircuitBreakers
+from matcha_notifier.enums import CircuitState
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_circuit_opens_after_failures_in_a_row():
+    breaker = CircuitBreaker('example.com', failure_threshold=3, reset_timeout=60, clock=Clock())
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+
+def test_circuit_probes_once_after_reset_timeout():
+    clock = Clock()
+    breaker = CircuitBreaker('example.com', failure_threshold=1, reset_timeout=60, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 59
+    assert not breaker.allow()
+    clock.now = 60
+    assert breaker.allow()
+    assert breaker.state == CircuitState.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.allow()
+
+def test_circuit_reopens_when_probe_fails():
+    clock = Clock()
+    breaker = CircuitBreaker('example.com', failure_threshold=3, reset_timeout=60, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+
+    clock.now = 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow()
+
+    clock.now = 120
+    assert breaker.allow()
+
+def test_released_probe_lets_another_through():
+    clock = Clock()
+    breaker = CircuitBreaker('example.com', failure_threshold=1, reset_timeout=60, clock=clock)
+    breaker.record_failure()
+    clock.now = 60
+    assert breaker.allow()
+
+    breaker.release()
+    assert breaker.allow()
+
+def test_host_circuit_breakers_disabled():
+    breakers = HostCircuitBreakers(enabled=False)
+    for _ in range(10):
+        breakers.record_failure('example.com')
+
+    assert breakers.allow('example.com')
+    assert breakers.breakers == {}
@@ -0,0 +1,78 @@
+import pytest
+from freezegun import freeze_time
+from matcha_notifier.html_parser import ParseOnly, SoupParser, create_parser
+from unittest.mock import Mock
+from source_clients.marukyu_koyamaen_scraper import MarukyuKoyamaenScraper
+from source_clients.sazen_scraper import SazenScraper, parse_product_page
+
+
+@pytest.fixture
+def mk_request():
+    with open('tests/fixtures/marukyu_koyamaen_fixture.html') as f:
+        return f.read()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml', 'selectolax'])
+@freeze_time('2025-06-12 17:00:00')
+async def test_parser_backends_agree(mk_request, backend):
+    if backend == 'lxml':
+        pytest.importorskip('lxml')
+    scraper = MarukyuKoyamaenScraper(Mock())
+    expected = await scraper.parse_products(mk_request)
+
+    scraper.html_parser = create_parser(backend, MarukyuKoyamaenScraper.SELECTORS)
+    assert await scraper.parse_products(mk_request) == expected
+
+@pytest.mark.parametrize('backend', ['html.parser', 'lxml', 'selectolax'])
+def test_parser_parses_only_matching_elements(backend):
+    if backend == 'lxml':
+        pytest.importorskip('lxml')
+    with open('tests/fixtures/sazen_matcha_unsui_page_fixture.html') as f:
+        text = f.read()
+
+    parser = create_parser(backend, SazenScraper.SELECTORS)
+    page = parser.parse(text, SazenScraper.PRODUCT_PARSE_ONLY)
+
+    product_info = page.select_one('product_info')
+    assert product_info.select('detail_label')[0].text() == 'Item code:'
+    assert parse_product_page(backend, text)['Maker'] == 'Maruyasu'
+    if backend == 'selectolax':
+        # lexbor ignores only and parses the whole page
+        assert page.select_one('link') is not None
+    else:
+        # Nothing outside div#product-info is parsed
+        assert page.select_one('link') is None
+
+def test_lexbor_parser_ignores_tags_in_scripts_and_attributes():
+    text = (
+        '<script>var html = "<div class=\\"card\\">";</script>'
+        '<div data-template=\'<div class="card">\'>'
+        '<div class="card"><a href="/a">A</a></div>'
+        '</div>'
+    )
+    parser = create_parser('selectolax', {'card': 'div.card', 'link': 'a'})
+    page = parser.parse(text, ParseOnly('div', {'class': 'card'}))
+
+    assert [card.select_one('link').attr('href') for card in page.select('card')] == ['/a']
+
+def test_parser_node_api():
+    parser = create_parser('selectolax', {'item': 'li.item', 'link': 'a'})
+    page = parser.parse(
+        '<ul><li class="item sold-out"><a href="/a">A</a></li>'
+        '<li class="item"><a href="/b">B <b>2</b></a></li></ul>'
+    )
+    items = page.select('item')
+    assert [item.classes() for item in items] == [['item', 'sold-out'], ['item']]
+    assert items[1].select_one('link').attr('href') == '/b'
+    assert items[1].text() == 'B 2'
+    assert page.select_one('link').attr('title') is None
+
+def test_create_parser_falls_back_to_html_parser(monkeypatch):
+    monkeypatch.setattr('matcha_notifier.html_parser.LexborHTMLParser', None)
+    parser = create_parser('selectolax', {})
+    assert isinstance(parser, SoupParser)
+    assert parser.name == 'html.parser'
+
+    assert isinstance(create_parser('html.parser', {}), SoupParser)
+    with pytest.raises(ValueError):
+        create_parser('html5lib', {})
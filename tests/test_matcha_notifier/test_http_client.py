@@ -0,0 +1,69 @@
+import pytest
+from aiohttp import ClientTimeout
+from matcha_notifier import http_client
+from matcha_notifier.circuit_breaker import circuit_breakers
+from matcha_notifier.enums import Website
+from matcha_notifier.http_client import (
+    accept_encoding, create_session, get_timeout, warm_up
+)
+from source_clients.sazen_scraper import SazenScraper
+from urllib.parse import urlsplit
+
+
+@pytest.mark.asyncio
+async def test_create_session(monkeypatch):
+    monkeypatch.setitem(http_client.config, 'MAX_CONCURRENT_REQUESTS_PER_HOST', 3)
+    monkeypatch.setitem(http_client.config, 'HTTP_DNS_CACHE_TTL', 120)
+    monkeypatch.setitem(http_client.config, 'HTTP_TIMEOUT', 7)
+
+    async with create_session() as session:
+        assert session.connector.limit_per_host == 3
+        assert session.connector.use_dns_cache
+        assert session.connector._cached_hosts._ttl == 120
+        assert session.timeout.total == 7
+        assert session.headers['Accept-Encoding'] == accept_encoding()
+
+def test_accept_encoding(monkeypatch):
+    monkeypatch.setattr(http_client, 'brotli', None)
+    assert accept_encoding() == 'gzip, deflate'
+
+    monkeypatch.setattr(http_client, 'brotli', object())
+    assert accept_encoding() == 'gzip, deflate, br'
+
+def test_get_timeout(monkeypatch):
+    monkeypatch.setitem(http_client.config, 'HTTP_TIMEOUT', 10)
+    monkeypatch.setitem(http_client.config, 'SAZEN_HTTP_TIMEOUT', 20)
+    monkeypatch.delitem(http_client.config, 'IPPODO_HTTP_TIMEOUT', raising=False)
+
+    assert get_timeout(Website.SAZEN).total == 20
+    assert get_timeout(Website.IPPODO).total == 10
+
+@pytest.mark.asyncio
+async def test_fetch_url_uses_website_timeout(monkeypatch, mock_session, mock_response):
+    monkeypatch.setitem(http_client.config, 'SAZEN_HTTP_TIMEOUT', 20)
+    timeouts = []
+    def mock_get(*args, **kwargs):
+        timeouts.append(kwargs['timeout'])
+        return mock_response
+    mock_session.get = mock_get
+    scraper = SazenScraper(mock_session)
+
+    await scraper.fetch_url(scraper.catalog_url, mock_session)
+    await scraper.fetch_url(scraper.catalog_url, mock_session, ClientTimeout(total=3))
+
+    assert [timeout.total for timeout in timeouts] == [20, 3]
+
+@pytest.mark.asyncio
+async def test_warm_up(stand_in_server):
+    async with stand_in_server({}) as server, create_session() as session:
+        url = str(server.make_url('/'))
+        await warm_up(session, url)
+        assert len(session.connector._conns) == 1
+
+        # Hosts that are failing are left alone
+        await session.connector.close()
+        breaker = circuit_breakers.breaker(urlsplit(url).netloc)
+        breaker.failure_threshold = 1
+        breaker.record_failure()
+        await warm_up(session, url)
+        assert len(session.connector._conns) == 0
@@ -0,0 +1,51 @@
+import json
+import quickjs
+from bs4 import BeautifulSoup
+from matcha_notifier.js_literal import JSContextPool, extract_js_literal
+
+
+def test_extract_js_literal_matches_quickjs():
+    with open('tests/fixtures/ippodo_fixture.html') as f:
+        text = f.read()
+
+    soup = BeautifulSoup(text, 'html.parser')
+    script = next(s for s in soup.find_all('script') if 'collection_json' in s.get_text())
+    ctx = quickjs.Context()
+    ctx.eval(script.text)
+    expected = json.loads(ctx.eval('JSON.stringify(collection_json)'))
+
+    assert extract_js_literal(text, 'collection_json') == expected
+
+def test_extract_js_literal_converts_js_syntax():
+    text = r'''
+        if (items == null) {}
+        var items = {
+            "name": `Kanza \`20g\``,   // Template string
+            'tags': ['it\'s', `abc`,],
+            /* Trailing comma */ "price": 64.0,
+        };
+    '''
+    assert extract_js_literal(text, 'items') == {
+        'name': 'Kanza `20g`', 'tags': ["it's", 'abc'], 'price': 64.0
+    }
+    assert extract_js_literal(text, 'cart') is None
+
+def test_extract_js_literal_falls_back_to_quickjs(monkeypatch):
+    pool = JSContextPool(size=1, memory_limit=1024 * 1024, time_limit=1)
+    monkeypatch.setattr('matcha_notifier.js_literal.js_pool', pool)
+
+    text = 'var items = {"size": `${10 * 2}g`};'
+    assert extract_js_literal(text, 'items') == {'size': '20g'}
+    assert extract_js_literal(text, 'items') == {'size': '20g'}
+
+    # The context is reused rather than created per evaluation
+    assert len(pool._idle) == 1
+
+def test_extract_js_literal_decodes_hex_and_unicode_escapes():
+    text = r"var items = {'n': 'caf\xe9', 't': `\u{1F375} \ud83c\udf75 é`};"
+    assert extract_js_literal(text, 'items') == {'n': 'café', 't': '🍵 🍵 é'}
+
+def test_extract_js_literal_evaluates_unsupported_escapes():
+    # Legacy octal escapes are left to quickjs
+    text = r"var items = {'n': 'caf\351'};"
+    assert extract_js_literal(text, 'items') == {'n': 'café'}
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+import time
+from matcha_notifier.loop_monitor import LoopLagMonitor
+
+
+def block_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+async def parse_without_awaiting() -> None:
+    block_loop(0.3)
+
+@pytest.mark.asyncio
+async def test_loop_monitor_catches_stalls():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        await asyncio.create_task(parse_without_awaiting(), name='slow_parse')
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert 0.2 <= stall.duration <= 0.5
+    assert stall.task == 'slow_parse (parse_without_awaiting)'
+    # The stack shows where the loop was stuck
+    assert 'block_loop' in stall.stack
+    assert monitor.summary()['max'] == pytest.approx(stall.duration)
+
+@pytest.mark.asyncio
+async def test_loop_monitor_ignores_short_lag():
+    monitor = LoopLagMonitor(interval=0.01, threshold=0.1)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_loop(0.03)
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert monitor.stalls == type(monitor.stalls)()
+    assert monitor.summary()['samples'] > 0
+
+@pytest.mark.asyncio
+async def test_loop_monitor_disabled():
+    monitor = LoopLagMonitor(enabled=False)
+    monitor.start()
+    await monitor.stop()
+
+    assert monitor.summary() == {'samples': 0}
@@ -0,0 +1,81 @@
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from matcha_notifier import metrics
+from matcha_notifier.metrics import (
+    MetricsRegistry, create_metrics_app, fetch_bytes, fetch_seconds,
+    start_metrics_server
+)
+from source_clients.marukyu_koyamaen_scraper import MarukyuKoyamaenScraper
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    errors = registry.counter('errors_total', 'Errors.', ['site', 'type'])
+    depth = registry.gauge('queue_depth', 'Queue depth.')
+    errors.inc(site='sazen', type='TimeoutError')
+    errors.inc(2, site='sazen', type='TimeoutError')
+    errors.inc(site='ippodo "tea"\n', type='ClientError')
+    depth.set_function(lambda: 3)
+
+    assert errors.get(site='sazen', type='TimeoutError') == 3
+    assert registry.render() == (
+        '# HELP errors_total Errors.\n'
+        '# TYPE errors_total counter\n'
+        'errors_total{site="sazen",type="TimeoutError"} 3\n'
+        'errors_total{site="ippodo \\"tea\\"\\n",type="ClientError"} 1\n'
+        '# HELP queue_depth Queue depth.\n'
+        '# TYPE queue_depth gauge\n'
+        'queue_depth 3\n'
+    )
+
+def test_histogram_render():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency.', ['site'], buckets=[0.1, 1])
+    for value in (0.05, 0.1, 0.5, 2):
+        latency.observe(value, site='sazen')
+
+    assert latency.count(site='sazen') == 4
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{site="sazen",le="0.1"} 2',
+        'latency_seconds_bucket{site="sazen",le="1"} 3',
+        'latency_seconds_bucket{site="sazen",le="+Inf"} 4',
+        'latency_seconds_sum{site="sazen"} 2.65',
+        'latency_seconds_count{site="sazen"} 4',
+    ]
+
+def test_metric_labels_are_checked():
+    registry = MetricsRegistry()
+    errors = registry.counter('errors_total', 'Errors.', ['site'])
+
+    with pytest.raises(ValueError):
+        errors.inc(type='TimeoutError')
+    with pytest.raises(ValueError):
+        registry.counter('errors_total', 'Errors.')
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    async with TestClient(TestServer(create_metrics_app())) as client:
+        resp = await client.get('/metrics')
+        text = await resp.text()
+
+    assert resp.status == 200
+    assert resp.content_type == 'text/plain'
+    assert '# TYPE matcha_fetch_seconds histogram' in text
+
+@pytest.mark.asyncio
+async def test_metrics_server_disabled(monkeypatch):
+    monkeypatch.setitem(metrics.config, 'METRICS_ENABLED', False)
+    assert await start_metrics_server() is None
+
+@pytest.mark.asyncio
+async def test_fetch_url_records_metrics(mock_session, mock_response):
+    mock_response.content = 'x' * 100
+    mock_session.get = lambda *args, **kwargs: mock_response
+    scraper = MarukyuKoyamaenScraper(mock_session)
+    fetches = fetch_seconds.count(site='marukyu_koyamaen')
+    downloaded = fetch_bytes.get(site='marukyu_koyamaen')
+
+    await scraper.fetch_url(scraper.catalog_url, mock_session)
+
+    assert fetch_seconds.count(site='marukyu_koyamaen') == fetches + 1
+    assert fetch_bytes.get(site='marukyu_koyamaen') == downloaded + 100
@@ -0,0 +1,46 @@
+import dataclasses
+import pytest
+from matcha_notifier.enums import Brand, StockStatus
+from matcha_notifier.models import Item, ItemStock
+
+
+@pytest.fixture
+def item_stock_dict():
+    return {
+        'item': {'id': '1G28200C6', 'brand': 'Marukyu Koyamaen', 'name': 'Wako'},
+        'url': 'https://www.marukyu-koyamaen.co.jp/english/shop/products/1g28200c6',
+        'stock_status': 'instock',
+        'as_of': '2025-06-12 03:00:00,123'
+    }
+
+def test_item_stock_round_trip(item_stock_dict):
+    item_stock = ItemStock.from_dict(item_stock_dict)
+
+    assert item_stock.item == Item('1G28200C6', Brand.MARUKYU_KOYAMAEN, 'Wako')
+    assert item_stock.stock_status == StockStatus.INSTOCK
+    assert item_stock.as_of == '2025-06-12 03:00:00,123'
+    assert item_stock.to_dict() == item_stock_dict
+
+def test_item_stock_timestamp(item_stock_dict):
+    item_stock = ItemStock.from_dict(item_stock_dict)
+
+    # 03:00 PDT is 10:00 UTC
+    assert item_stock.timestamp == 1749722400.123
+    assert ItemStock(
+        item_stock.item, item_stock.url, item_stock.stock_status, 1749722400.123
+    ) == item_stock
+
+def test_models_are_slotted_and_frozen(item_stock_dict):
+    item_stock = ItemStock.from_dict(item_stock_dict)
+
+    assert not hasattr(item_stock, '__dict__')
+    assert not hasattr(item_stock.item, '__dict__')
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        item_stock.stock_status = StockStatus.OUT_OF_STOCK
+
+def test_model_strings_are_interned(item_stock_dict):
+    first = ItemStock.from_dict(item_stock_dict)
+    second = ItemStock.from_dict(dict(item_stock_dict, item=dict(item_stock_dict['item'])))
+
+    assert first.url is second.url
+    assert first.item.name is second.item.name
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+import time
+from matcha_notifier.parse_pool import ParsePool
+from source_clients.marukyu_koyamaen_scraper import parse_catalog
+
+
+@pytest.fixture
+def mk_request():
+    with open('tests/fixtures/marukyu_koyamaen_fixture.html') as f:
+        return f.read()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('kind', ['process', 'thread', 'inline'])
+async def test_parse_pool_runs_parse_functions(mk_request, kind):
+    pool = ParsePool(kind=kind, size=2, timeout=30)
+    inline_records = await pool.run(parse_catalog, 'selectolax', mk_request)
+
+    pool.start()
+    try:
+        records = await asyncio.gather(
+            pool.run(parse_catalog, 'selectolax', mk_request),
+            pool.run(parse_catalog, 'html.parser', mk_request)
+        )
+    finally:
+        pool.close()
+
+    assert len(inline_records) == 51
+    assert records == [inline_records, inline_records]
+
+@pytest.mark.asyncio
+async def test_parse_pool_times_out():
+    pool = ParsePool(kind='thread', size=1, timeout=0.05)
+    pool.start()
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 0.5)
+    finally:
+        pool.close()
+
+def test_parse_pool_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        ParsePool(kind='fork')
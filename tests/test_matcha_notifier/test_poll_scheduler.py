@@ -0,0 +1,74 @@
+import pytest
+from datetime import datetime, timezone
+from matcha_notifier.enums import Brand, StockChange, StockStatus, Website
+from matcha_notifier.models import Item, ItemStock, StockEvent
+from matcha_notifier.poll_scheduler import HOURS_PER_WEEK, PollScheduler, hour_of_week
+
+
+# Monday 10:00 UTC
+MONDAY_10AM = datetime(2025, 6, 16, 10, tzinfo=timezone.utc).timestamp()
+
+def make_event(change: StockChange, stock_status: StockStatus, timestamp: float) -> StockEvent:
+    item_stock = ItemStock(
+        item=Item(id='6009', brand=Brand.HEKISUIEN, name='Kin no Uzu'),
+        url='https://www.sazentea.com/en/products/p6009',
+        stock_status=stock_status,
+        as_of=timestamp
+    )
+    return StockEvent(Website.SAZEN, '6009', change, item_stock)
+
+def test_hour_of_week():
+    assert hour_of_week(MONDAY_10AM) == 10
+    assert hour_of_week(MONDAY_10AM - 11 * 3600) == HOURS_PER_WEEK - 1
+
+def test_next_interval_without_history():
+    scheduler = PollScheduler()
+
+    assert scheduler.next_interval(Website.SAZEN, 600, now=MONDAY_10AM) == 600
+
+def test_next_interval_follows_restock_hours():
+    scheduler = PollScheduler()
+    counts = [0] * HOURS_PER_WEEK
+    counts[10] = 100
+    scheduler.counts[Website.IPPODO] = counts
+
+    # Tighter in and around the restock hour, relaxed elsewhere, within
+    # MIN_POLL_INTERVAL and MAX_POLL_INTERVAL
+    assert scheduler.next_interval(Website.IPPODO, 300, now=MONDAY_10AM) == 30
+    assert scheduler.next_interval(Website.IPPODO, 300, now=MONDAY_10AM + 3600) == 30
+    assert scheduler.next_interval(Website.IPPODO, 300, now=MONDAY_10AM + 5 * 3600) == 900
+
+def test_next_interval_with_little_history():
+    scheduler = PollScheduler()
+    counts = [0] * HOURS_PER_WEEK
+    counts[10] = 1
+    scheduler.counts[Website.IPPODO] = counts
+
+    # One restock moves the interval, but not to the bounds
+    assert 30 < scheduler.next_interval(Website.IPPODO, 300, now=MONDAY_10AM) < 300
+    assert 300 < scheduler.next_interval(Website.IPPODO, 300, now=MONDAY_10AM + 5 * 3600) < 900
+
+@pytest.mark.asyncio
+async def test_observe_counts_restocks(tmp_path):
+    schedule_file = str(tmp_path / 'poll_schedule.json')
+    scheduler = PollScheduler(schedule_file)
+
+    # The first poll of a website only finds new items
+    scheduler.observe([make_event(StockChange.NEW, StockStatus.INSTOCK, MONDAY_10AM)])
+    assert scheduler.counts == {}
+
+    scheduler.observe([make_event(StockChange.SOLD_OUT, StockStatus.OUT_OF_STOCK, MONDAY_10AM)])
+    assert scheduler.counts == {}
+
+    # Several items restocking in one poll count once
+    scheduler.observe([
+        make_event(StockChange.RESTOCKED, StockStatus.INSTOCK, MONDAY_10AM),
+        make_event(StockChange.NEW, StockStatus.INSTOCK, MONDAY_10AM),
+    ])
+    assert scheduler.counts[Website.SAZEN][10] == 1
+    assert sum(scheduler.counts[Website.SAZEN]) == 1
+
+    await scheduler._save_task
+    loaded = PollScheduler(schedule_file)
+    await loaded.load()
+    assert loaded.counts == scheduler.counts
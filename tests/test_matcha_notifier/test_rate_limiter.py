@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from matcha_notifier.rate_limiter import HostRateLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_token_bucket_allows_bursts():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # Later callers queue up behind each other
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+
+def test_token_bucket_refills():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    for _ in range(3):
+        bucket.reserve()
+
+    clock.now = 1.0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+
+    # Refills stop at the burst size
+    clock.now = 100.0
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0, 0.5]
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_limits_per_host(monkeypatch):
+    delays = []
+    async def mock_sleep(seconds):
+        delays.append(seconds)
+    monkeypatch.setattr(asyncio, 'sleep', mock_sleep)
+
+    limiter = HostRateLimiter()
+    clock = Clock()
+    limiter.buckets['a.example.com'] = TokenBucket(rate=1, burst=1, clock=clock)
+    limiter.buckets['b.example.com'] = TokenBucket(rate=1, burst=1, clock=clock)
+
+    await limiter.acquire('https://a.example.com/one')
+    await limiter.acquire('https://b.example.com/one')
+    assert delays == []
+
+    await limiter.acquire('https://a.example.com/two')
+    assert delays == [1.0]
+
+@pytest.mark.asyncio
+async def test_host_rate_limiter_disabled(monkeypatch):
+    limiter = HostRateLimiter(enabled=False)
+
+    for _ in range(20):
+        await limiter.acquire('https://a.example.com/')
+
+    assert limiter.buckets == {}
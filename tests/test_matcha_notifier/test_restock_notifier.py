@@ -1,8 +1,10 @@
+import asyncio
 import pytest
 from matcha_notifier.enums import Brand, StockStatus, Website
 from matcha_notifier.models import Item, ItemStock
 from matcha_notifier.restock_notifier import RestockNotifier
 from matcha_notifier.stock_data import StockData
+from matcha_notifier.stock_task import StockTask
 from source_clients.marukyu_koyamaen_scraper import MarukyuKoyamaenScraper
 from unittest.mock import AsyncMock, Mock
 
@@ -62,3 +64,98 @@ async def test_no_new_restocks():
     resp = await notifier.notify_all_new_restocks(instock_items)
 
     assert resp is False
+
+@pytest.mark.asyncio
+async def test_get_polled_websites_drains_queue():
+    notifier = RestockNotifier(Bot(), Mock())
+    poll_queue = asyncio.Queue()
+    await poll_queue.put(Website.SAZEN)
+    await poll_queue.put(Website.IPPODO)
+    await poll_queue.put(Website.SAZEN)
+
+    websites = await notifier._get_polled_websites(poll_queue)
+
+    assert websites == [Website.SAZEN, Website.IPPODO, Website.SAZEN]
+    assert poll_queue.empty()
+
+@pytest.mark.asyncio
+async def test_failed_notify_is_retried_on_unchanged_poll():
+    items = {
+        'mk-1': ItemStock(
+            item=Item(id='mk-1', brand=Brand.MARUKYU_KOYAMAEN, name='Aoarashi'),
+            url='https://www.marukyu-koyamaen.co.jp/english/shop/products/mk-1',
+            stock_status=StockStatus.INSTOCK,
+            as_of='2025-06-12 03:00:00,000'
+        )
+    }
+    scraper = Mock()
+    # Unchanged pages give back the same items object
+    scraper.scrape = AsyncMock(return_value=items)
+    stock_data = StockData()
+    all_items = {}
+    poll_queue = asyncio.Queue()
+    task = StockTask(
+        Website.MARUKYU_KOYAMAEN, scraper, 60, all_items, stock_data, poll_queue
+    )
+    notifier = RestockNotifier(Bot(), Mock())
+    notifier.notify_all_new_restocks = AsyncMock(return_value=False)
+
+    await task.poll_once()
+    websites = await notifier._get_polled_websites(poll_queue)
+    await notifier._check_stock_changes(set(websites), all_items, stock_data)
+
+    assert stock_data.state == {}
+    assert stock_data.unnotified == {Website.MARUKYU_KOYAMAEN}
+
+    # The page hasn't changed, but the failed alert is retried
+    notifier.notify_all_new_restocks = AsyncMock(return_value=True)
+    await task.poll_once()
+    websites = await notifier._get_polled_websites(poll_queue)
+    await notifier._check_stock_changes(set(websites), all_items, stock_data)
+
+    notifier.notify_all_new_restocks.assert_awaited_once()
+    assert 'mk-1' in stock_data.state[Website.MARUKYU_KOYAMAEN]
+    assert stock_data.unnotified == set()
+
+    # Once sent, unchanged polls aren't republished
+    await task.poll_once()
+    assert poll_queue.empty()
+
+@pytest.mark.asyncio
+async def test_failed_notify_applies_other_websites_in_batch():
+    def item_stock(website_url: str, item_id: str, status: StockStatus) -> ItemStock:
+        return ItemStock(
+            item=Item(id=item_id, brand=Brand.UNKNOWN, name=item_id),
+            url=f'{website_url}/{item_id}',
+            stock_status=status,
+            as_of='2025-06-12 03:00:00,000'
+        )
+
+    stock_data = StockData()
+    stock_data.state = {
+        Website.SAZEN: {
+            'b': item_stock('https://www.sazentea.com', 'b', StockStatus.INSTOCK)
+        }
+    }
+    all_items = {
+        Website.SAZEN: {
+            'b': item_stock('https://www.sazentea.com', 'b', StockStatus.OUT_OF_STOCK)
+        },
+        Website.IPPODO: {
+            'a': item_stock('https://ippodotea.com', 'a', StockStatus.INSTOCK)
+        },
+    }
+    notifier = RestockNotifier(Bot(), Mock())
+    notifier.notify_all_new_restocks = AsyncMock(return_value=False)
+
+    await notifier._check_stock_changes(
+        {Website.SAZEN, Website.IPPODO}, all_items, stock_data
+    )
+
+    # Sazen wasn't in the failed alert, so its sellout is applied
+    assert (
+        stock_data.state[Website.SAZEN]['b'].stock_status
+        == StockStatus.OUT_OF_STOCK
+    )
+    assert Website.IPPODO not in stock_data.state
+    assert stock_data.unnotified == {Website.IPPODO}
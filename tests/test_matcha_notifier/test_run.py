@@ -42,12 +42,20 @@ async def test_run(monkeypatch, mock_session, mock_response, mk_request, caplog)
 
     # Patch out sleep and Event.wait
     monkeypatch.setattr('matcha_notifier.run.asyncio.sleep', mock_sleep)
-    monkeypatch.setattr('matcha_notifier.run.asyncio.Event.wait', AsyncMock())
+    event_wait = asyncio.Event.wait
+    # run() stops its polls once Event.wait returns, so it waits for them
+    # to be broken out of using mock_sleep instead
+    async def wait_for_polls(self):
+        await asyncio.wait([
+            t for t in asyncio.all_tasks()
+            if t.get_coro().__qualname__ == 'StockScheduler._run_task'
+        ])
+    monkeypatch.setattr('matcha_notifier.run.asyncio.Event.wait', wait_for_polls)
 
     # Patch network call
     mock_response.content = mk_request
     mock_session.get = lambda *args, **kwargs: mock_response
-    monkeypatch.setattr('matcha_notifier.run.ClientSession', mock_session)
+    monkeypatch.setattr('matcha_notifier.run.create_session', mock_session)
 
     # Patch Discord
     mock_channel = Mock()
@@ -61,21 +69,32 @@ async def test_run(monkeypatch, mock_session, mock_response, mk_request, caplog)
         Website.MARUKYU_KOYAMAEN: MarukyuKoyamaenScraper
     })
 
+    # Keep a handle on the poll queue to wait for published polls
+    poll_queues = []
+    class PollQueue(asyncio.Queue):
+        def __init__(self):
+            super().__init__()
+            poll_queues.append(self)
+
+    monkeypatch.setattr('matcha_notifier.run.asyncio.Queue', PollQueue)
+
     # Bot
     discord_bot = Bot()
 
-    # Run main loop and break out using mock_sleep
-    try:
-        await run(discord_bot)
+    await run(discord_bot)
 
-        # Give any remaining tasks a chance to run (like send_alerts)
-        pending = [t for t in asyncio.all_tasks() if not t.done()]
-        for t in pending:
-            if t.get_coro().__name__ == 'send_alerts':
-                await asyncio.wait_for(t, timeout=1)
+    # Give send_alerts a chance to handle every poll it published. Queue.join
+    # waits on an Event, so restore Event.wait first.
+    monkeypatch.setattr('matcha_notifier.run.asyncio.Event.wait', event_wait)
+    await poll_queues[0].join()
 
-    except StopLoop:
-        pass
+    # send_alerts waits on the queue forever, so stop it with the test
+    for task in asyncio.all_tasks():
+        if task.get_coro().__qualname__ == 'RestockNotifier.send_alerts':
+            task.cancel()
+
+    # State is written behind, so write it out before reading the file
+    await discord_bot.stock_data.flush()
 
     # Check log output
     assert 'restock-alerts channel connected' in caplog.text
@@ -137,7 +156,7 @@ async def test_restock_channel_not_found(
 ):
     mock_response.content = mk_request
     mock_session.get = lambda *args, **kwargs: mock_response
-    monkeypatch.setattr('matcha_notifier.run.ClientSession', mock_session)
+    monkeypatch.setattr('matcha_notifier.run.create_session', mock_session)
     mock_discord_get = Mock()
     mock_discord_get.return_value = []
     monkeypatch.setattr('matcha_notifier.run.discord_get', mock_discord_get)
@@ -0,0 +1,218 @@
+import json
+import pytest
+import sqlite3
+from matcha_notifier.enums import Brand, StockChange, StockStatus, Website
+from matcha_notifier.models import Item, ItemStock, StockEvent
+from matcha_notifier.state_codec import (
+    MAGIC, decode_journal, decode_state, encode_events, encode_state, journal_header
+)
+from matcha_notifier.state_store import (
+    BinaryStateStore, JournaledStateStore, JsonStateStore, SqliteStateStore,
+    export_json
+)
+
+
+def make_item_stock(item_id: str, name: str, stock_status: StockStatus) -> ItemStock:
+    return ItemStock(
+        item=Item(
+            id=item_id,
+            brand=Brand.MARUKYU_KOYAMAEN,
+            name=name
+        ),
+        as_of='2025-06-12 03:00:00,000',
+        url=f'https://example.com/{item_id.lower()}',
+        stock_status=stock_status
+    )
+
+@pytest.mark.asyncio
+async def test_sqlite_store_migrates_json_state(tmp_path):
+    json_file = str(tmp_path / 'state.json')
+    state = {
+        Website.MARUKYU_KOYAMAEN: {
+            '1G28200C6': make_item_stock('1G28200C6', 'Hojicha Mix', StockStatus.INSTOCK),
+            '1G9D000CC': make_item_stock('1G9D000CC', 'Matcha Mix', StockStatus.OUT_OF_STOCK)
+        }
+    }
+    await JsonStateStore(json_file).save(state, [])
+
+    store = SqliteStateStore(str(tmp_path / 'state.db'), json_file)
+    loaded = await store.load()
+    await store.close()
+
+    assert loaded == state
+
+    # The JSON state is only imported once
+    with open(json_file, 'w') as f:
+        json.dump({}, f)
+    store = SqliteStateStore(str(tmp_path / 'state.db'), json_file)
+    assert await store.load() == state
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_sqlite_store_upserts_changed_items(tmp_path):
+    db_file = str(tmp_path / 'state.db')
+    store = SqliteStateStore(db_file, str(tmp_path / 'state.json'))
+    assert await store.load() == {}
+
+    hojicha = make_item_stock('1G28200C6', 'Hojicha Mix', StockStatus.OUT_OF_STOCK)
+    matcha = make_item_stock('1G9D000CC', 'Matcha Mix', StockStatus.INSTOCK)
+    await store.save({}, [
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1G28200C6', StockChange.NEW, hojicha),
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1G9D000CC', StockChange.NEW, matcha)
+    ])
+
+    restocked = make_item_stock('1G28200C6', 'Hojicha Mix', StockStatus.INSTOCK)
+    await store.save({}, [
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1G28200C6', StockChange.RESTOCKED, restocked)
+    ])
+
+    assert await store.load() == {
+        Website.MARUKYU_KOYAMAEN: {'1G28200C6': restocked, '1G9D000CC': matcha}
+    }
+    await store.close()
+
+    conn = sqlite3.connect(db_file)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 2
+    conn.close()
+
+@pytest.fixture
+def state():
+    return {
+        Website.MARUKYU_KOYAMAEN: {
+            '1G28200C6': make_item_stock('1G28200C6', 'Hojicha Mix', StockStatus.INSTOCK),
+            '1G9D000CC': make_item_stock('1G9D000CC', 'Matcha Mix', StockStatus.OUT_OF_STOCK)
+        },
+        Website.SAZEN: {
+            '6009': make_item_stock('6009', 'Kin no Uzu', StockStatus.INSTOCK)
+        }
+    }
+
+def test_state_codec_round_trip(state):
+    data = encode_state(state)
+
+    assert data.startswith(MAGIC)
+    assert decode_state(data) == state
+    assert decode_state(encode_state({})) == {}
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'{"Marukyu Koyamaen": {}}',
+    MAGIC + b'\x63\x00',                    # Unknown version
+    encode_state({Website.SAZEN: {}})[:-1],  # Truncated
+])
+def test_state_codec_rejects_bad_data(data):
+    with pytest.raises(ValueError):
+        decode_state(data)
+
+@pytest.mark.asyncio
+async def test_binary_store_migrates_json_state(tmp_path, state):
+    json_file = str(tmp_path / 'state.json')
+    bin_file = tmp_path / 'state.bin'
+    await JsonStateStore(json_file).save(state, [])
+
+    store = BinaryStateStore(str(bin_file), json_file)
+    assert await store.load() == state
+    assert bin_file.exists()
+
+    # Later loads read the binary file
+    with open(json_file, 'w') as f:
+        json.dump({}, f)
+    assert await BinaryStateStore(str(bin_file), json_file).load() == state
+
+@pytest.mark.asyncio
+async def test_binary_store_saves_state(tmp_path, state):
+    store = BinaryStateStore(str(tmp_path / 'state.bin'), str(tmp_path / 'state.json'))
+    assert await store.load() == {}
+
+    await store.save(state, [])
+
+    assert await store.load() == state
+
+@pytest.mark.asyncio
+async def test_export_json(monkeypatch, tmp_path, state):
+    store = BinaryStateStore(str(tmp_path / 'state.bin'), str(tmp_path / 'state.json'))
+    await store.save(state, [])
+    monkeypatch.setattr('matcha_notifier.state_store.create_state_store', lambda: store)
+
+    out_file = str(tmp_path / 'export.json')
+    assert await export_json(out_file) == 3
+    assert await JsonStateStore(out_file).load() == state
+
+def test_journal_codec_round_trip():
+    events = [
+        StockEvent(Website.SAZEN, '6009', StockChange.NEW,
+                   make_item_stock('6009', 'Kin no Uzu', StockStatus.INSTOCK)),
+        StockEvent(Website.SAZEN, '6009', StockChange.SOLD_OUT,
+                   make_item_stock('6009', 'Kin no Uzu', StockStatus.OUT_OF_STOCK)),
+    ]
+    data = journal_header() + encode_events(events)
+
+    assert decode_journal(data) == (events, len(data))
+
+    # A record cut short is dropped along with anything after it
+    assert decode_journal(data[:-3]) == (events[:1], len(data) - len(encode_events(events[1:])))
+
+@pytest.mark.asyncio
+async def test_journaled_store_appends_changes(tmp_path, state):
+    snapshot_file = tmp_path / 'state.bin'
+    journal_file = tmp_path / 'state.journal'
+    snapshot = BinaryStateStore(str(snapshot_file), str(tmp_path / 'state.json'))
+    store = JournaledStateStore(snapshot, str(journal_file))
+    assert await store.load() == {}
+
+    await store.save(state, [
+        StockEvent(website, item_id, StockChange.NEW, item_stock)
+        for website, items in state.items()
+        for item_id, item_stock in items.items()
+    ])
+    sold_out = make_item_stock('6009', 'Kin no Uzu', StockStatus.OUT_OF_STOCK)
+    state[Website.SAZEN]['6009'] = sold_out
+    await store.save(state, [
+        StockEvent(Website.SAZEN, '6009', StockChange.SOLD_OUT, sold_out)
+    ])
+
+    # Only the journal was written
+    assert not snapshot_file.exists()
+    assert len(decode_journal(journal_file.read_bytes())[0]) == 4
+
+    store = JournaledStateStore(snapshot, str(journal_file))
+    assert await store.load() == state
+
+@pytest.mark.asyncio
+async def test_journaled_store_compacts(tmp_path, state):
+    snapshot_file = tmp_path / 'state.bin'
+    journal_file = tmp_path / 'state.journal'
+    snapshot = BinaryStateStore(str(snapshot_file), str(tmp_path / 'state.json'))
+    store = JournaledStateStore(snapshot, str(journal_file), max_size=1)
+    await store.load()
+
+    hojicha = state[Website.MARUKYU_KOYAMAEN]['1G28200C6']
+    await store.save(state, [
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1G28200C6', StockChange.NEW, hojicha)
+    ])
+
+    assert not journal_file.exists()
+    assert await snapshot.load() == state
+    assert await JournaledStateStore(snapshot, str(journal_file)).load() == state
+
+@pytest.mark.asyncio
+async def test_journaled_store_recovers_torn_write(tmp_path, state):
+    journal_file = tmp_path / 'state.journal'
+    snapshot = BinaryStateStore(str(tmp_path / 'state.bin'), str(tmp_path / 'state.json'))
+    await snapshot.save(state, [])
+
+    sold_out = make_item_stock('6009', 'Kin no Uzu', StockStatus.OUT_OF_STOCK)
+    restocked = make_item_stock('1G9D000CC', 'Matcha Mix', StockStatus.INSTOCK)
+    records = encode_events([
+        StockEvent(Website.SAZEN, '6009', StockChange.SOLD_OUT, sold_out),
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1G9D000CC', StockChange.RESTOCKED, restocked)
+    ])
+    journal_file.write_bytes(journal_header() + records[:-5])
+
+    loaded = await JournaledStateStore(snapshot, str(journal_file)).load()
+
+    assert loaded[Website.SAZEN]['6009'] == sold_out
+    assert loaded[Website.MARUKYU_KOYAMAEN]['1G9D000CC'].stock_status == StockStatus.OUT_OF_STOCK
+    # The torn record is cut off so later appends can be read
+    assert decode_journal(journal_file.read_bytes())[1] == journal_file.stat().st_size
@@ -1,7 +1,11 @@
+import json
 import logging
-from matcha_notifier.enums import Brand, StockStatus, Website
-from matcha_notifier.models import Item, ItemStock
+import pytest
+from matcha_notifier.enums import Brand, StockChange, StockStatus, Website
+from matcha_notifier.models import Item, ItemStock, StockEvent
 from matcha_notifier.stock_data import StockData
+from pathlib import Path
+from tests.constants import TEST_STATE_FILE
 from matcha_notifier.enums import StockStatus
 
 
@@ -418,4 +422,135 @@ def test_stock_data_get_website_instock_items():
             url='https://example.com/amazing-matcha-mix',
             stock_status=StockStatus.INSTOCK
         )
-    }
\ No newline at end of file
+    }
+
+def test_stock_data_diff_events():
+    stock_data = StockData()
+    state = {
+        Website.MARUKYU_KOYAMAEN: {
+            '1G28200C6': ItemStock(
+                item=Item(
+                    id='1G28200C6',
+                    brand=Brand.MARUKYU_KOYAMAEN,
+                    name='Hojicha Mix'
+                ),
+                as_of='2025-06-12 03:00:00,000',
+                url='https://example.com/hojicha-mix',
+                stock_status=StockStatus.INSTOCK
+            ),
+            '1G9D000CC-1GAD200C6': ItemStock(
+                item=Item(
+                    id='1G9D000CC-1GAD200C6',
+                    brand=Brand.MARUKYU_KOYAMAEN,
+                    name='Matcha Mix'
+                ),
+                as_of='2025-06-12 03:00:00,000',
+                url='https://example.com/matcha-mix',
+                stock_status=StockStatus.OUT_OF_STOCK
+            )
+        }
+    }
+    sold_out = ItemStock(
+        item=Item(
+            id='1G28200C6',
+            brand=Brand.MARUKYU_KOYAMAEN,
+            name='Hojicha Mix'
+        ),
+        as_of='2025-06-12 04:00:00,000',
+        url='https://example.com/hojicha-mix',
+        stock_status=StockStatus.OUT_OF_STOCK
+    )
+    restocked = ItemStock(
+        item=Item(
+            id='1G9D000CC-1GAD200C6',
+            brand=Brand.MARUKYU_KOYAMAEN,
+            name='Matcha Mix'
+        ),
+        as_of='2025-06-12 04:00:00,000',
+        url='https://example.com/matcha-mix',
+        stock_status=StockStatus.INSTOCK
+    )
+    new_item = ItemStock(
+        item=Item(
+            id='1385CTH25',
+            brand=Brand.MARUKYU_KOYAMAEN,
+            name='Amazing Matcha Mix'
+        ),
+        as_of='2025-06-12 04:00:00,000',
+        url='https://example.com/amazing-matcha-mix',
+        stock_status=StockStatus.OUT_OF_STOCK
+    )
+    all_items = {
+        Website.MARUKYU_KOYAMAEN: {
+            '1G28200C6': sold_out,
+            '1G9D000CC-1GAD200C6': restocked,
+            '1385CTH25': new_item
+        }
+    }
+
+    events = stock_data.diff(all_items, state)
+
+    assert events == [
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1G28200C6', StockChange.SOLD_OUT, sold_out),
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1G9D000CC-1GAD200C6', StockChange.RESTOCKED, restocked),
+        StockEvent(Website.MARUKYU_KOYAMAEN, '1385CTH25', StockChange.NEW, new_item)
+    ]
+    # Diffing leaves the state untouched
+    assert state[Website.MARUKYU_KOYAMAEN]['1G28200C6'].stock_status == StockStatus.INSTOCK
+    assert '1385CTH25' not in state[Website.MARUKYU_KOYAMAEN]
+    assert stock_data.get_instock_changes(events) == {
+        Website.MARUKYU_KOYAMAEN: {'1G9D000CC-1GAD200C6': restocked}
+    }
+
+@pytest.mark.asyncio
+async def test_stock_data_apply_events_writes_behind():
+    stock_data = StockData()
+    await stock_data.load_state()
+    all_items = {
+        Website.MARUKYU_KOYAMAEN: {
+            '1G28200C6': ItemStock(
+                item=Item(
+                    id='1G28200C6',
+                    brand=Brand.MARUKYU_KOYAMAEN,
+                    name='Hojicha Mix'
+                ),
+                as_of='2025-06-12 03:00:00,000',
+                url='https://example.com/hojicha-mix',
+                stock_status=StockStatus.INSTOCK
+            )
+        }
+    }
+
+    stock_data.apply_events(stock_data.diff(all_items))
+
+    # Reads are served from memory before the state file is written
+    assert stock_data.get_all_instock_items() == all_items
+    assert json.loads(Path(TEST_STATE_FILE).read_text()) == {}
+
+    await stock_data.close()
+
+    state = json.loads(Path(TEST_STATE_FILE).read_text())
+    assert state[Website.MARUKYU_KOYAMAEN.value]['1G28200C6']['stock_status'] == 'instock'
+
+@pytest.mark.asyncio
+async def test_stock_data_load_state_reads_file_once():
+    Path(TEST_STATE_FILE).write_text(json.dumps({
+        Website.MARUKYU_KOYAMAEN.value: {
+            '1G28200C6': {
+                'item': {
+                    'id': '1G28200C6',
+                    'brand': Brand.MARUKYU_KOYAMAEN.value,
+                    'name': 'Hojicha Mix'
+                },
+                'as_of': '2025-06-12 03:00:00,000',
+                'url': 'https://example.com/hojicha-mix',
+                'stock_status': 'outofstock'
+            }
+        }
+    }))
+    stock_data = StockData()
+    state = await stock_data.load_state()
+    Path(TEST_STATE_FILE).write_text('{}')
+
+    assert await stock_data.load_state() is state
+    assert state[Website.MARUKYU_KOYAMAEN]['1G28200C6'].stock_status == StockStatus.OUT_OF_STOCK
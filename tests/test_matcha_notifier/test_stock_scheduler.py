@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+import time
+from matcha_notifier.enums import Website
+from matcha_notifier.stock_scheduler import StockScheduler
+
+
+class FakeTask:
+    def __init__(self, website: Website, interval: float):
+        self.website = website
+        self.interval = interval
+        self.polls = 0
+        self.calls = []
+
+    async def poll_once(self) -> None:
+        self.polls += 1
+        self.calls.append('poll')
+
+    async def warm_up(self) -> None:
+        self.calls.append('warm_up')
+
+    def next_interval(self) -> float:
+        return self.interval
+
+@pytest.mark.asyncio
+async def test_stock_scheduler_staggers_and_jitters(monkeypatch):
+    yield_now = asyncio.sleep
+    delays = {}
+    # Record each runner's wait and then block, so every runner is caught
+    # at its first sleep
+    async def mock_sleep(seconds):
+        delays[asyncio.current_task()] = seconds
+        await asyncio.Event().wait()
+    monkeypatch.setattr(asyncio, 'sleep', mock_sleep)
+
+    scheduler = StockScheduler()
+    scheduler.stagger = 5
+    scheduler.jitter = 0.1
+    tasks = [
+        FakeTask(Website.IPPODO, 60),
+        FakeTask(Website.SAZEN, 600),
+        FakeTask(Website.STEEPING_ROOM, 60),
+    ]
+    for task in tasks:
+        scheduler.add(task)
+
+    start = time.time()
+    scheduler.start()
+    for _ in range(5):
+        await yield_now(0)
+
+    # The first website is polled at once, the others are staggered
+    assert [task.polls for task in tasks] == [1, 0, 0]
+    waits = [delays[runner] for runner in scheduler._runners]
+    assert 54 <= waits[0] <= 66
+    assert waits[1:] == [5, 10]
+
+    assert scheduler.next_run(Website.IPPODO) == pytest.approx(start + waits[0], abs=1)
+    assert scheduler.next_run(Website.SAZEN) == pytest.approx(start + 5, abs=1)
+    assert scheduler.next_run(Website.NAKAMURA_TOKICHI) is None
+
+    await scheduler.stop()
+    assert scheduler._runners == []
+
+def test_stock_scheduler_jitter_bounds():
+    scheduler = StockScheduler()
+    scheduler.jitter = 0.2
+
+    intervals = [scheduler.jittered(100) for _ in range(200)]
+
+    assert all(80 <= i <= 120 for i in intervals)
+    assert len(set(intervals)) > 1
+
+@pytest.mark.asyncio
+async def test_stock_scheduler_warms_up_before_long_waits(monkeypatch):
+    yield_now = asyncio.sleep
+    sleeps = []
+    async def mock_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) > 4:
+            await asyncio.Event().wait()
+    monkeypatch.setattr(asyncio, 'sleep', mock_sleep)
+
+    scheduler = StockScheduler()
+    scheduler.jitter = 0
+    scheduler.keepalive = 75
+    scheduler.warm_up_lead = 2
+    short, long = FakeTask(Website.IPPODO, 60), FakeTask(Website.SAZEN, 600)
+    scheduler.add(long)
+    scheduler.start()
+    for _ in range(5):
+        await yield_now(0)
+
+    # The connection is warmed up just before each poll after a long wait
+    assert long.calls == ['poll', 'warm_up', 'poll', 'warm_up', 'poll']
+    assert sleeps[:4] == [598, 2, 598, 2]
+    await scheduler.stop()
+
+    # Pooled connections outlive short waits
+    sleeps.clear()
+    scheduler.add(short)
+    scheduler.tasks.remove(long)
+    scheduler.start()
+    for _ in range(5):
+        await yield_now(0)
+
+    assert 'warm_up' not in short.calls
+    assert sleeps[:4] == [60, 60, 60, 60]
+    await scheduler.stop()
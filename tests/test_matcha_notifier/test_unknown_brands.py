@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+from freezegun import freeze_time
+from matcha_notifier.unknown_brands import UnknownBrandRegistry
+
+
+@pytest.mark.asyncio
+@freeze_time('2025-06-12 10:00:00')
+async def test_unknown_brands_batches_writes(tmp_path):
+    brands_file = tmp_path / 'unknown_brands.txt'
+    registry = UnknownBrandRegistry(str(brands_file), flush_interval=60)
+
+    await registry.record('Tsuji Kiyoharu')
+    await registry.record('Tsuji Kiyoharu')
+    await registry.record('Kyoto Tea Farm')
+
+    # Nothing is written until the flush interval passes or on close
+    assert not brands_file.exists()
+
+    await registry.close()
+    assert brands_file.read_text().splitlines() == [
+        'Kyoto Tea Farm\t2025-06-12T10:00:00+00:00\t2025-06-12T10:00:00+00:00\t1',
+        'Tsuji Kiyoharu\t2025-06-12T10:00:00+00:00\t2025-06-12T10:00:00+00:00\t2',
+    ]
+
+@pytest.mark.asyncio
+async def test_unknown_brands_flushes_after_interval(tmp_path):
+    brands_file = tmp_path / 'unknown_brands.txt'
+    registry = UnknownBrandRegistry(str(brands_file), flush_interval=0)
+
+    await registry.record('Tsuji Kiyoharu')
+
+    assert brands_file.read_text().startswith('Tsuji Kiyoharu\t')
+
+@pytest.mark.asyncio
+async def test_unknown_brands_loads_file_once(tmp_path):
+    brands_file = tmp_path / 'unknown_brands.txt'
+    # A legacy line holding only a name, and a line with stats
+    brands_file.write_text(
+        'Tsuji Kiyoharu\n'
+        'Kyoto Tea Farm\t2025-06-01T00:00:00+00:00\t2025-06-02T00:00:00+00:00\t5\n'
+    )
+    registry = UnknownBrandRegistry(str(brands_file))
+
+    with freeze_time('2025-06-12 10:00:00'):
+        await registry.record('Kyoto Tea Farm')
+        brands_file.unlink()    # Not read again
+        await registry.record('Tsuji Kiyoharu')
+        await registry.close()
+
+    assert brands_file.read_text().splitlines() == [
+        'Kyoto Tea Farm\t2025-06-01T00:00:00+00:00\t2025-06-12T10:00:00+00:00\t6',
+        'Tsuji Kiyoharu\t2025-06-12T10:00:00+00:00\t2025-06-12T10:00:00+00:00\t1',
+    ]
+
+@pytest.mark.asyncio
+async def test_unknown_brands_writes_behind(tmp_path):
+    brands_file = tmp_path / 'unknown_brands.txt'
+    registry = UnknownBrandRegistry(str(brands_file), flush_interval=0.05)
+
+    await registry.record('Tsuji Kiyoharu')
+    assert not brands_file.exists()
+
+    # Written once the interval is up, without another sighting
+    await asyncio.sleep(0.1)
+    assert brands_file.read_text().startswith('Tsuji Kiyoharu\t')
+    await registry.close()
+
+@pytest.mark.asyncio
+async def test_unknown_brands_merges_and_skips_malformed_lines(tmp_path):
+    brands_file = tmp_path / 'unknown_brands.txt'
+    brands_file.write_text(
+        'Kyoto Tea Farm\t2025-06-03T00:00:00+00:00\t2025-06-04T00:00:00+00:00\t2\n'
+        'Tsuji Kiyoharu\tyesterday\t\t1\n'
+        'Marukyu\t\t\tmany\n'
+        'Kyoto Tea Farm\t2025-06-01T00:00:00+00:00\t2025-06-02T00:00:00+00:00\t5\n'
+    )
+    registry = UnknownBrandRegistry(str(brands_file))
+
+    await registry.load()
+
+    assert list(registry.entries) == ['Kyoto Tea Farm']
+    entry = registry.entries['Kyoto Tea Farm']
+    assert entry['first_seen'] == datetime(2025, 6, 1, tzinfo=timezone.utc).timestamp()
+    assert entry['last_seen'] == datetime(2025, 6, 4, tzinfo=timezone.utc).timestamp()
+    assert entry['hits'] == 7
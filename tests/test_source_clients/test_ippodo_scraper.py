@@ -1,8 +1,8 @@
 import pytest
+from aiohttp import ClientSession
 from matcha_notifier.stock_data import StockData
-from matcha_notifier.enums import StockStatus, Website
+from matcha_notifier.enums import Brand, StockStatus, Website
 from source_clients.ippodo_scraper import IppodoScraper
-from unittest.mock import Mock
 
 
 @pytest.fixture
@@ -38,16 +38,40 @@ async def test_ippodo_scraper_collection_json_missing(
     """
     Test the case where the collection JSON is missing from the page.
     """
-    mock_response.content = ippodo_request
+    mock_response.content = '<html><script>const cart_json = {};</script></html>'
     mock_session.get = lambda *args, **kwargs: mock_response
     monkeypatch.setattr('source_clients.ippodo_scraper.ClientSession', mock_session)
-    soup = Mock()
-    soup.find_all.return_value = [] 
-    monkeypatch.setattr(
-        'source_clients.ippodo_scraper.BeautifulSoup', lambda *args, **kwargs:soup
-    )
 
     scraper = IppodoScraper(mock_session)
     result = await scraper.scrape()
 
     assert result == {}
+
+@pytest.mark.asyncio
+async def test_ippodo_scraper_products_json(stand_in_server):
+    routes = {'/collections/matcha/products.json': 'ippodo_products_fixture.json'}
+    async with stand_in_server(routes) as server, ClientSession() as session:
+        scraper = IppodoScraper(session)
+        scraper.catalog_url = str(server.make_url('/collections/matcha'))
+        result = await scraper.scrape()
+
+    # The gift card isn't matcha powder
+    assert len(result) == 3
+    assert result['4982833387014'].item.name == 'Kanza - 20g'
+    assert result['4982833387014'].item.brand == Brand.IPPODO
+    assert result['4982833387014'].stock_status == StockStatus.OUT_OF_STOCK
+    assert result['4982833387014'].url == 'https://ippodotea.com/products/kanza'
+    assert result['4982833125517'].stock_status == StockStatus.INSTOCK
+    # Only the second variant is available
+    assert result['4982833642298'].stock_status == StockStatus.INSTOCK
+
+@pytest.mark.asyncio
+async def test_ippodo_scraper_falls_back_to_html(stand_in_server):
+    routes = {'/collections/matcha': 'ippodo_fixture.html'}
+    async with stand_in_server(routes) as server, ClientSession() as session:
+        scraper = IppodoScraper(session)
+        scraper.catalog_url = str(server.make_url('/collections/matcha'))
+        result = await scraper.scrape()
+
+    assert len(result) == 24
+    assert result['4982833125517'].stock_status == StockStatus.INSTOCK
@@ -88,3 +88,55 @@ async def test_mk_scraper_request_fail(monkeypatch, mock_response, mock_session)
     resp = await scraper.scrape()
     
     assert resp == {}
+
+@pytest.mark.asyncio
+async def test_mk_scraper_not_modified(mock_session, mock_response, mk_request):
+    request_headers = []
+    def mock_get(*args, **kwargs):
+        request_headers.append(kwargs['headers'])
+        return mock_response
+
+    mock_response.content = mk_request
+    mock_response.headers = {'ETag': '"abc123"'}
+    mock_session.get = mock_get
+
+    scraper = MarukyuKoyamaenScraper(mock_session)
+    first = await scraper.scrape()
+    second = await scraper.scrape()
+
+    # The unchanged body is not parsed again
+    assert len(first) == 51
+    assert second is first
+    assert request_headers == [{}, {'If-None-Match': '"abc123"'}]
+
+    # A 304 response also reuses the last parsed items
+    mock_response.status = 304
+    assert await scraper.scrape() is first
+
+@pytest.mark.asyncio
+async def test_mk_scraper_reparses_after_failed_parse(
+    monkeypatch, mock_session, mock_response, mk_request
+):
+    request_headers = []
+    def mock_get(*args, **kwargs):
+        request_headers.append(kwargs['headers'])
+        return mock_response
+
+    mock_response.content = mk_request
+    mock_response.headers = {'ETag': '"abc123"'}
+    mock_session.get = mock_get
+
+    scraper = MarukyuKoyamaenScraper(mock_session)
+    parse_products = scraper.parse_products
+    async def timed_out_parse(text):
+        raise TimeoutError
+    monkeypatch.setattr(scraper, 'parse_products', timed_out_parse)
+
+    with pytest.raises(TimeoutError):
+        await scraper.scrape()
+
+    # The same body is parsed on the next poll, and no validators from the
+    # failed poll are sent
+    monkeypatch.setattr(scraper, 'parse_products', parse_products)
+    assert len(await scraper.scrape()) == 51
+    assert request_headers == [{}, {}]
@@ -1,4 +1,6 @@
+import asyncio
 import pytest
+from aiohttp import ClientSession
 from freezegun import freeze_time
 from matcha_notifier.enums import Brand, StockStatus
 from source_clients.nakamura_tokichi_scraper import NakamuraTokichiScraper
@@ -90,7 +92,7 @@ async def test_nk_scraper_1_page( monkeypatch, sr_p1_request,):
     )
     monkeypatch.setattr(
         'source_clients.nakamura_tokichi_scraper.NakamuraTokichiScraper.get_total_pages',
-        lambda self, text, soup: 1
+        lambda self, page_numbers: 1
     )
 
     scraper = NakamuraTokichiScraper(Mock())
@@ -102,4 +104,63 @@ async def test_nk_scraper_1_page( monkeypatch, sr_p1_request,):
     assert '8012517409020' not in all_items
     assert '8812217073916' not in all_items
     assert '8012517146876' not in all_items
-    
\ No newline at end of file
+    
+@pytest.mark.asyncio
+async def test_nk_scraper_fetches_pages_concurrently(
+    monkeypatch, sr_p1_request, sr_p2_request
+):
+    in_flight, max_in_flight = 0, 0
+    async def mock_fetch(self, url, session, **kwargs):
+        nonlocal in_flight, max_in_flight
+        if url == self.catalog_url:
+            return sr_p1_request
+
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # Finish earlier pages last to check the merge keeps page order
+        page = int(url.split('=')[-1])
+        await asyncio.sleep(0.01 * (5 - page))
+        in_flight -= 1
+        return sr_p2_request if page == 2 else '<html></html>'
+
+    monkeypatch.setattr(
+        'source_clients.nakamura_tokichi_scraper.NakamuraTokichiScraper.fetch_url',
+        mock_fetch
+    )
+    monkeypatch.setattr(
+        'source_clients.nakamura_tokichi_scraper.NakamuraTokichiScraper.get_total_pages',
+        lambda self, page_numbers: 4
+    )
+
+    scraper = NakamuraTokichiScraper(Mock())
+    all_items = await scraper.scrape()
+
+    assert max_in_flight == 3
+    assert len(all_items) == 20
+    assert list(all_items)[-1] == '8012517146876'
+
+@pytest.mark.asyncio
+async def test_nk_scraper_products_json(monkeypatch, stand_in_server):
+    monkeypatch.setattr(NakamuraTokichiScraper, 'PRODUCTS_PER_PAGE', 3)
+    routes = {
+        '/collections/matcha/products.json?limit=3&page=1':
+            'nakamura_tokichi_products_fixture.json',
+        '/collections/matcha/products.json?limit=3&page=2':
+            'shopify_empty_products_fixture.json'
+    }
+    async with stand_in_server(routes) as server, ClientSession() as session:
+        scraper = NakamuraTokichiScraper(session)
+        scraper.catalog_url = str(server.make_url('/collections/matcha'))
+        scraper.product_url = str(server.make_url('')).rstrip('/')
+        all_items = await scraper.scrape()
+
+        assert len(all_items) == 3
+        item_9001333031164 = all_items['9001333031164']
+        assert item_9001333031164.item.brand == Brand.NAKAMURA_TOKICHI
+        assert item_9001333031164.item.name == 'Matcha Premium Hatsu-Mukashi “No.2”, 20g Can'
+        assert item_9001333031164.url == f'{scraper.product_url}/products/bessei-hatsumukashi-matcha-uji-er'
+        assert item_9001333031164.stock_status == StockStatus.INSTOCK
+        assert all_items['8012517245180'].stock_status == StockStatus.OUT_OF_STOCK
+
+        # Unchanged pages reuse the items from the last scrape
+        assert await scraper.scrape() is all_items
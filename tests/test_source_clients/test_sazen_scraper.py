@@ -1,6 +1,9 @@
+import asyncio
 import pytest
 from freezegun import freeze_time
+from matcha_notifier.base_scraper import NOT_MODIFIED, config
 from matcha_notifier.enums import Brand, StockStatus
+from source_clients import sazen_scraper
 from source_clients.sazen_scraper import SazenScraper
 from unittest.mock import AsyncMock, Mock
 
@@ -67,3 +70,125 @@ async def test_sazen_scraper_instock_items(
     assert 'CMM001' in all_items
     assert 'MTG009' in all_items
     assert 'MTG005' in all_items
+
+@pytest.mark.asyncio
+async def test_sazen_scraper_fetches_product_pages_concurrently(
+    monkeypatch, sazen_requests: list[str]
+):
+    catalog_page, *product_pages = sazen_requests
+    product_urls = []
+    in_flight, max_in_flight = 0, 0
+    async def mock_fetch(self, url, session, **kwargs):
+        nonlocal in_flight, max_in_flight
+        if url == self.catalog_url:
+            return catalog_page
+
+        # Product pages are requested in catalog order
+        index = len(product_urls)
+        product_urls.append(url)
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # Finish later requests first to check results keep catalog order
+        await asyncio.sleep(0.01 * (len(product_pages) - index))
+        in_flight -= 1
+        return product_pages[index]
+
+    monkeypatch.setattr('source_clients.sazen_scraper.SazenScraper.fetch_url', mock_fetch)
+    monkeypatch.setitem(config, 'MAX_CONCURRENT_REQUESTS_PER_HOST', 3)
+
+    scraper = SazenScraper(Mock())
+    all_items = await scraper.scrape()
+
+    assert max_in_flight == 3
+    assert list(all_items) == [
+        'CMC007', 'MTG010', 'CMC133', 'CMC134', 'CMM001', 'MTG009', 'MTG005'
+    ]
+
+@pytest.mark.asyncio
+@freeze_time("2025-06-12 17:00:00", tz_offset=-7)
+async def test_sazen_scraper_caches_product_details(
+    monkeypatch, sazen_requests: list[str]
+):
+    catalog_page = sazen_requests[0]
+    mock_fetch = AsyncMock()
+    mock_fetch.side_effect = sazen_requests + [catalog_page]
+    monkeypatch.setattr('source_clients.sazen_scraper.SazenScraper.fetch_url', mock_fetch)
+
+    first = await SazenScraper(Mock()).scrape()
+
+    # A new scraper reads the saved cache, so only the catalog is fetched
+    second = await SazenScraper(Mock()).scrape()
+
+    assert mock_fetch.call_count == len(sazen_requests) + 1
+    assert second == first
+
+@pytest.mark.asyncio
+async def test_sazen_scraper_refetches_expired_product_details(
+    monkeypatch, sazen_requests: list[str]
+):
+    mock_fetch = AsyncMock()
+    mock_fetch.side_effect = sazen_requests + sazen_requests
+    monkeypatch.setattr('source_clients.sazen_scraper.SazenScraper.fetch_url', mock_fetch)
+
+    scraper = SazenScraper(Mock())
+    with freeze_time('2025-06-12 17:00:00') as frozen_time:
+        await scraper.scrape()
+        frozen_time.tick(scraper.product_cache.ttl + 1)
+        all_items = await scraper.scrape()
+
+    assert mock_fetch.call_count == 2 * len(sazen_requests)
+    assert len(all_items) == 7
+
+@pytest.mark.asyncio
+async def test_sazen_scraper_retries_failed_product_pages(
+    monkeypatch, sazen_requests: list[str]
+):
+    catalog_page, *product_pages = sazen_requests
+    products = sazen_scraper.parse_catalog(
+        'html.parser', catalog_page, 'https://www.sazentea.com'
+    )
+    pages = {
+        product['url']: page for product, page in zip(products, product_pages)
+    }
+    failed_url = products[0]['url']
+    fetched = []
+    async def mock_fetch(self, url, session, conditional=False, **kwargs):
+        if url == self.catalog_url:
+            # The catalog hasn't changed since its items were stored
+            if conditional and url in self.page_items:
+                return NOT_MODIFIED
+            return catalog_page
+
+        fetched.append(url)
+        # The first product page 404s once
+        if url == failed_url and fetched.count(url) == 1:
+            return ''
+        return pages[url]
+
+    monkeypatch.setattr('source_clients.sazen_scraper.SazenScraper.fetch_url', mock_fetch)
+
+    scraper = SazenScraper(Mock())
+    first = await scraper.scrape()
+
+    # The catalog isn't stored, so the next poll parses it again
+    assert len(first) == 6 and 'CMC007' not in first
+    assert scraper.catalog_url not in scraper.page_items
+    assert scraper.catalog_url not in scraper.pending_fetches
+
+    second = await scraper.scrape()
+
+    assert len(second) == 7
+    # Only the failed product page is fetched again
+    assert fetched.count(failed_url) == 2
+    assert len(fetched) == len(product_pages) + 1
+    assert scraper.page_items[scraper.catalog_url] is second
+    assert await scraper.scrape() is second
+
+def test_sazen_scraper_product_cache_file(monkeypatch, tmp_path):
+    monkeypatch.setitem(
+        sazen_scraper.config, 'SAZEN_PRODUCT_CACHE_FILE', 'cache/sazen.json'
+    )
+    scraper = SazenScraper(Mock())
+
+    # conftest keeps cache files in tmp_path
+    assert scraper.product_cache.cache_file == str(tmp_path / 'sazen.json')
@@ -1,5 +1,7 @@
 import pytest
+from aiohttp import ClientSession
 from freezegun import freeze_time
+from matcha_notifier import shopify_scraper
 from matcha_notifier.enums import Brand, StockStatus, Website
 from matcha_notifier.stock_data import StockData
 from source_clients.steeping_room_scraper import SteepingRoomScraper
@@ -61,3 +63,35 @@ async def test_sr_scraper_fuzzy_brand_matching(monkeypatch, mock_session, mock_r
     matcha = all_items['8820106690783']
     assert matcha.item.name == 'Ogurayama Matcha'
     assert matcha.item.brand == Brand.YAMAMASA_KOYAMAEN
+
+@pytest.mark.asyncio
+async def test_sr_scraper_products_json(stand_in_server):
+    routes = {'/collections/matcha-tea/products.json': 'steeping_room_products_fixture.json'}
+    async with stand_in_server(routes) as server, ClientSession() as session:
+        scraper = SteepingRoomScraper(session)
+        scraper.catalog_url = str(server.make_url('/collections/matcha-tea'))
+        all_items = await scraper.scrape()
+
+    # The whisk isn't matcha powder
+    assert len(all_items) == 3
+    assert all_items['9092534599903'].item.name == 'Yame Matcha Blend'
+    assert all_items['9092534599903'].item.brand == Brand.UNKNOWN
+    assert all_items['9092534599903'].stock_status == StockStatus.INSTOCK
+    assert all_items['8386781446367'].item.brand == Brand.MARUKYU_KOYAMAEN
+    assert all_items['8386781446367'].stock_status == StockStatus.OUT_OF_STOCK
+    assert all_items['8820106690783'].item.brand == Brand.YAMAMASA_KOYAMAEN
+    assert all_items['8820106690783'].stock_status == StockStatus.INSTOCK
+
+@pytest.mark.asyncio
+async def test_sr_scraper_products_json_disabled(monkeypatch, stand_in_server):
+    monkeypatch.setitem(shopify_scraper.config, 'SHOPIFY_JSON_ENABLED', False)
+    routes = {
+        '/collections/matcha-tea': 'steeping_room_fixture.html',
+        '/collections/matcha-tea/products.json': 'steeping_room_products_fixture.json'
+    }
+    async with stand_in_server(routes) as server, ClientSession() as session:
+        scraper = SteepingRoomScraper(session)
+        scraper.catalog_url = str(server.make_url('/collections/matcha-tea'))
+        all_items = await scraper.scrape()
+
+    assert len(all_items) == 37